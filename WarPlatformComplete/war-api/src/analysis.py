@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline assíncrono de análise de jogadas pelo LLM.
+
+``/analyze-move`` não chama mais o modelo dentro da requisição:
+
+1. a chave da análise é o hash canônico do tabuleiro (donos e tropas), da
+   última ação e do backend; se ``analysis:result:{chave}`` existe no Redis a
+   resposta sai na hora;
+2. senão a requisição vira um job (``analysis:job:{id}``) e volta com o id. Só
+   um job por chave fica em andamento (``analysis:inflight:{chave}``, SET NX
+   com validade): pedidos iguais de outros espectadores, em qualquer worker,
+   recebem o mesmo job;
+3. um pool limitado por worker chama o backend e grava o resultado no cache.
+
+A análise em stream (``transmitir``) passa pelas mesmas etapas: cache, job
+único por chave (o stream executa o job na própria requisição, e quem chega
+no meio espera o resultado) e as mesmas vagas de chamadas ao backend.
+
+Jobs novos (fora do cache) são limitados por cliente por minuto e pelo tamanho
+da fila do worker. O backend é plugável (``BACKENDS``): ``openai`` usa
+``chatbot_service`` com a avaliação de ``move_analyzer`` como prompt, e
+``local`` responde só com essa avaliação, sem rede nem chave.
+"""
+
+import hashlib
+import json
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.move_analyzer import resumo_texto
+from src.config import (
+    ANALISE_MAX_SIMULTANEAS, ANALISE_FILA_MAXIMA, ANALISE_LIMITE_POR_MINUTO, ANALISE_TTL_RESULTADO,
+    ANALISE_TTL_JOB, ANALISE_TIMEOUT
+)
+
+
+class LimiteAnalises(Exception):
+    """O cliente passou do limite de análises novas por minuto."""
+
+
+class FilaAnalisesCheia(Exception):
+    """O worker já tem ``ANALISE_FILA_MAXIMA`` análises esperando."""
+
+
+def chave_resultado(chave):
+    return f"analysis:result:{chave}"
+
+
+def chave_job(job_id):
+    return f"analysis:job:{job_id}"
+
+
+def chave_em_andamento(chave):
+    return f"analysis:inflight:{chave}"
+
+
+def chave_analise(game_state, last_action, backend):
+    """Hash canônico de (tabuleiro, última ação, backend)."""
+    h = hashlib.sha256()
+    h.update(backend.encode())
+    h.update(bytes(d + 1 for d in game_state.donos))
+    h.update(struct.pack(f"<{len(game_state.tropas)}I", *game_state.tropas))
+    h.update(json.dumps(last_action, sort_keys=True, separators=(",", ":")).encode())
+    return h.hexdigest()[:32]
+
+
+def _tabuleiro(sessao):
+    """Cópia de (donos, tropas) para o backend montar o prompt fora da requisição."""
+    return list(sessao.game_state.donos), list(sessao.game_state.tropas)
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+class BackendOpenAI:
+    """Análise pelo modelo da OpenAI, com a avaliação local como prompt (``chatbot_service``)."""
+
+    nome = "openai"
+
+    def analisar(self, avaliacao, tabuleiro):
+        from src.chatbot_service import build_summary_prompt, request_analysis
+        return request_analysis(build_summary_prompt(avaliacao, tabuleiro))
+
+    def transmitir(self, avaliacao, tabuleiro):
+        from src.chatbot_service import build_summary_prompt, stream_analysis
+        return stream_analysis(build_summary_prompt(avaliacao, tabuleiro))
+
+
+class BackendLocal:
+    """Só o motor local (``move_analyzer``): resposta determinística, sem rede nem chave."""
+
+    nome = "local"
+
+    def __init__(self, atraso=0.0):
+        self.atraso = atraso  # segundos antes de responder, para simular a latência do modelo
+
+    def analisar(self, avaliacao, tabuleiro=None):
+        if self.atraso:
+            time.sleep(self.atraso)
+        return resumo_texto(avaliacao)
+
+    def transmitir(self, avaliacao, tabuleiro=None):
+        for linha in self.analisar(avaliacao).splitlines(keepends=True):
+            yield linha
+
+
+BACKENDS = {"openai": BackendOpenAI, "local": BackendLocal}
+
+
+def criar_backend(nome):
+    try:
+        return BACKENDS[nome]()
+    except KeyError:
+        raise ValueError(f"Backend de análise desconhecido: {nome} (use {', '.join(BACKENDS)})")
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+class _Transmissao:
+    """Pedaços de um stream de análise; ``close`` antes do primeiro pedaço chama ``abandonar``.
+
+    Um gerador fechado sem nunca ter começado não executa o próprio ``finally``:
+    sem isto a vaga da fila e o job do stream ficariam presos.
+    """
+
+    def __init__(self, pedacos, abandonar):
+        self._pedacos = pedacos
+        self._abandonar = abandonar
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._abandonar = None  # daqui em diante o ``finally`` do gerador cuida da vaga e do job
+        return next(self._pedacos)
+
+    def close(self):
+        abandonar, self._abandonar = self._abandonar, None
+        if abandonar is not None:
+            abandonar()
+        self._pedacos.close()
+
+
+class PipelineAnalises:
+    """Cache, deduplicação por chave, limites e pool de chamadas ao backend."""
+
+    def __init__(self, redis, backend, max_simultaneas=ANALISE_MAX_SIMULTANEAS, fila_maxima=ANALISE_FILA_MAXIMA,
+                 limite_por_minuto=ANALISE_LIMITE_POR_MINUTO):
+        self.redis = redis
+        self.backend = backend
+        self.max_simultaneas = max_simultaneas
+        self.fila_maxima = fila_maxima
+        self.limite_por_minuto = limite_por_minuto
+        self._pool = None
+        self._pendentes = 0
+        self._trava = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(max_simultaneas)  # chamadas ao backend (pool e streams)
+
+    def _reservar(self):
+        """Conta uma análise na fila do worker; FilaAnalisesCheia se já está cheia."""
+        with self._trava:
+            if self._pendentes >= self.fila_maxima:
+                raise FilaAnalisesCheia("Muitas análises em andamento, tente novamente em instantes")
+            self._pendentes += 1
+
+    def _liberar(self):
+        with self._trava:
+            self._pendentes -= 1
+
+    def _submeter(self, *args):
+        self._reservar()
+        with self._trava:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_simultaneas, thread_name_prefix="analise")
+        self._pool.submit(self._executar, *args)
+
+    def _limitar(self, cliente):
+        janela = int(time.time() // 60)
+        chave = f"analysis:rate:{cliente}:{janela}"
+        pipe = self.redis.pipeline()
+        pipe.incr(chave)
+        pipe.expire(chave, 60)
+        usadas, _ = pipe.execute()
+        if usadas > self.limite_por_minuto:
+            raise LimiteAnalises(f"Limite de {self.limite_por_minuto} análises por minuto atingido")
+
+    def _reivindicar(self, chave, cliente):
+        """Job da chave: (id do job já em andamento, False) ou (id novo, True) com a chave reservada.
+
+        Raises:
+            LimiteAnalises
+        """
+        existente = self.redis.get(chave_em_andamento(chave))
+        if existente is not None:
+            return existente.decode(), False
+        self._limitar(cliente)
+        job_id = uuid.uuid4().hex
+        while not self.redis.set(chave_em_andamento(chave), job_id, nx=True, ex=ANALISE_TIMEOUT):
+            # outro pedido reservou no meio; se ele já liberou a chave, tenta reservar de novo
+            existente = self.redis.get(chave_em_andamento(chave))
+            if existente is not None:
+                return existente.decode(), False
+        return job_id, True
+
+    def _criar_job(self, job_id, chave, game_id):
+        pipe = self.redis.pipeline()
+        pipe.hset(chave_job(job_id), mapping={"status": "pending", "key": chave, "game_id": game_id})
+        pipe.expire(chave_job(job_id), ANALISE_TTL_JOB)
+        pipe.execute()
+
+    def solicitar(self, sessao, avaliacao, cliente):
+        """Resultado em cache ou job (novo ou já em andamento) para a última jogada da sessão.
+
+        ``avaliacao`` é a de ``move_analyzer.avaliar_jogada`` (vai para o backend e para o resultado).
+
+        Returns:
+            dict com ``status`` ('done' com ``result``, ou 'pending' com ``job_id``).
+
+        Raises:
+            LimiteAnalises, FilaAnalisesCheia
+        """
+        chave = chave_analise(sessao.game_state, sessao.last_action, self.backend.nome)
+        em_cache = self.redis.get(chave_resultado(chave))
+        if em_cache is not None:
+            return {"status": "done", "cached": True, "result": json.loads(em_cache)}
+
+        job_id, novo = self._reivindicar(chave, cliente)
+        if not novo:
+            return {"status": "pending", "job_id": job_id, "coalesced": True}
+        self._criar_job(job_id, chave, sessao.game_id)
+        try:
+            self._submeter(job_id, chave, avaliacao, _tabuleiro(sessao), sessao.round_number)
+        except FilaAnalisesCheia:
+            self.redis.delete(chave_em_andamento(chave), chave_job(job_id))
+            raise
+        return {"status": "pending", "job_id": job_id, "coalesced": False}
+
+    def transmitir(self, sessao, avaliacao, cliente):
+        """Análise da última jogada em stream.
+
+        Cache, limites e fila são checados aqui (antes de começar a resposta).
+        Sem análise igual em andamento, o stream vira o job da chave: chama o
+        backend numa das vagas do pool e grava o resultado no cache ao terminar,
+        e pedidos iguais feitos no meio (stream ou não) esperam por ele. Com uma
+        análise igual em andamento, espera o resultado dela e o devolve inteiro.
+
+        A vaga e o job ficam reservados até o fim do stream: quem o serve deve
+        chamar ``close()`` mesmo que não chegue a iterá-lo (cliente que
+        desconecta antes do corpo começar).
+
+        Returns:
+            (resultado, None) se está em cache, ou (None, iterável de pedaços de texto com ``close``).
+
+        Raises:
+            LimiteAnalises, FilaAnalisesCheia
+        """
+        last_action = sessao.last_action
+        chave = chave_analise(sessao.game_state, last_action, self.backend.nome)
+        em_cache = self.redis.get(chave_resultado(chave))
+        if em_cache is not None:
+            return {**json.loads(em_cache), "cached": True}, None
+
+        job_id, novo = self._reivindicar(chave, cliente)
+        if not novo:
+            return None, self._esperar_texto(job_id)
+        self._criar_job(job_id, chave, sessao.game_id)
+        try:
+            self._reservar()
+        except FilaAnalisesCheia:
+            self.redis.delete(chave_em_andamento(chave), chave_job(job_id))
+            raise
+        rodada = sessao.round_number
+        tabuleiro = _tabuleiro(sessao)
+
+        def pedacos():
+            try:
+                with self._vagas:
+                    texto = []
+                    for pedaco in self.backend.transmitir(avaliacao, tabuleiro):
+                        texto.append(pedaco)
+                        yield pedaco
+                self._concluir(job_id, chave, {"analysis": "".join(texto).strip(), "analyzed_action": last_action,
+                                               "game_round": rodada, "evaluation": avaliacao})
+            except BaseException as e:  # inclui o cliente desconectando (GeneratorExit)
+                self._falhar(job_id, chave, str(e) or "Análise interrompida")
+                raise
+            finally:
+                self._liberar()
+
+        def abandonar():
+            self._falhar(job_id, chave, "Análise interrompida")
+            self._liberar()
+
+        return None, _Transmissao(pedacos(), abandonar)
+
+    def _esperar_texto(self, job_id):
+        """Gerador com o texto de um job em andamento, quando ele terminar."""
+        resposta = self.aguardar(job_id, ANALISE_TIMEOUT)
+        if resposta is not None and resposta["status"] == "done":
+            yield resposta["result"]["analysis"]
+        elif resposta is not None and resposta["status"] == "pending":
+            raise TimeoutError("Análise demorou demais, tente novamente")
+        else:
+            raise RuntimeError((resposta or {}).get("error") or "Análise não encontrada")
+
+    def _executar(self, job_id, chave, avaliacao, tabuleiro, rodada):
+        try:
+            with self._vagas:
+                texto = self.backend.analisar(avaliacao, tabuleiro)
+            self._concluir(job_id, chave, {"analysis": texto, "analyzed_action": avaliacao["jogada"],
+                                           "game_round": rodada, "evaluation": avaliacao})
+        except Exception as e:
+            self._falhar(job_id, chave, str(e))
+        finally:
+            self._liberar()
+
+    def _concluir(self, job_id, chave, resultado):
+        pipe = self.redis.pipeline()
+        pipe.setex(chave_resultado(chave), ANALISE_TTL_RESULTADO, json.dumps(resultado, ensure_ascii=False))
+        pipe.hset(chave_job(job_id), "status", "done")
+        pipe.delete(chave_em_andamento(chave))
+        pipe.execute()
+
+    def _falhar(self, job_id, chave, erro):
+        # erros não vão para o cache: o próximo pedido tenta de novo
+        pipe = self.redis.pipeline()
+        pipe.hset(chave_job(job_id), mapping={"status": "error", "error": erro})
+        pipe.delete(chave_em_andamento(chave))
+        pipe.execute()
+
+    def consultar(self, job_id):
+        """Status de um job: None se não existe; 'pending', 'done' (com ``result``) ou 'error'."""
+        job = {k.decode(): v.decode() for k, v in self.redis.hgetall(chave_job(job_id)).items()}
+        if not job:
+            return None
+        resposta = {"job_id": job_id, "status": job["status"]}
+        if job["status"] == "done":
+            resultado = self.redis.get(chave_resultado(job["key"]))
+            if resultado is None:
+                return {**resposta, "status": "error", "error": "Resultado expirou, solicite a análise de novo"}
+            resposta["result"] = json.loads(resultado)
+        elif job["status"] == "error":
+            resposta["error"] = job.get("error", "")
+        elif self.redis.get(chave_em_andamento(job["key"])) != job_id.encode():
+            # o worker que executava o job caiu (ou passou do ANALISE_TIMEOUT)
+            resposta = {**resposta, "status": "error", "error": "Análise interrompida, solicite de novo"}
+        return resposta
+
+    def aguardar(self, job_id, segundos, intervalo=0.25):
+        """Consulta o job até terminar ou passar ``segundos``."""
+        limite = time.monotonic() + segundos
+        while True:
+            resposta = self.consultar(job_id)
+            if resposta is None or resposta["status"] != "pending" or time.monotonic() >= limite:
+                return resposta
+            time.sleep(intervalo)
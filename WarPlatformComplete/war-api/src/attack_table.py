@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Tabelas memoizadas dos resultados de ataque.
+
+A chance de vitória depende só de (tropas do atacante, tropas do defensor) e
+as perdas são ``round(n * U(lo, hi))``, uma função em degraus do sorteio
+uniforme. Por isso tudo pode ser tabelado uma vez e consultado por índice:
+
+- ``probabilidade(a, d)``: mesma fórmula de ``GameLogic.calcular_probabilidade_vitoria``;
+- ``sortear_perda(n, faixa, r)``: converte um único ``random()`` na perda, por
+  busca binária nos limiares dos degraus (mesmo consumo de aleatoriedade que
+  ``rng.uniform``);
+- ``distribuicao_perda`` / ``esperanca``: distribuições e valores esperados
+  exatos, para bots e análises consultarem sem simular.
+
+As tabelas crescem sob demanda; ``matriz_probabilidade`` e ``limiares_numpy``
+expõem as mesmas tabelas como matrizes para o ``BatchSimulator``.
+"""
+
+from bisect import bisect_right
+
+FAIXA_VITORIA = (0.1, 0.3)  # perda do atacante ao conquistar: 10% a 30% das tropas do defensor
+FAIXA_DERROTA = (0.1, 0.4)  # perda do atacante ao falhar: 10% a 40% das próprias tropas
+
+
+def _chance(tropas_atacante, tropas_defensor):
+    """Probabilidade de vitória pela razão de tropas, suavizada e limitada a [0.1, 0.9]."""
+    if tropas_atacante <= 1:
+        return 0.0  # não pode atacar
+    chance = 1 / (1 + (tropas_defensor / tropas_atacante) ** 1.5)
+    return max(0.1, min(0.9, chance))
+
+
+def _degraus(n, faixa):
+    """Perda mínima e limiares do sorteio ``r`` em que ``round(n * (lo + (hi - lo) * r))`` sobe."""
+    lo, hi = faixa
+    base = int(n * lo + 0.5)
+    topo = int(n * hi + 0.5)
+    limiares = [((k + 0.5) / n - lo) / (hi - lo) for k in range(base, topo)] if n > 0 else []
+    return base, limiares
+
+
+class TabelaAtaque:
+    """Tabelas de chance de vitória e de perdas, indexadas por número de tropas."""
+
+    def __init__(self, tamanho_inicial=32):
+        self._probabilidades = []  # [atacante][defensor]
+        self._degraus = {FAIXA_VITORIA: [], FAIXA_DERROTA: []}  # faixa -> [n] = (base, limiares)
+        self._esperancas = {}
+        self._numpy = {}
+        self._crescer_probabilidades(tamanho_inicial, tamanho_inicial)
+
+    # ------------------------------------------------------------------
+    # Crescimento sob demanda
+    # ------------------------------------------------------------------
+    def _crescer_probabilidades(self, max_atacante, max_defensor):
+        linhas = self._probabilidades
+        colunas = max(max_defensor + 1, len(linhas[0]) if linhas else 0)
+        if linhas and len(linhas[0]) < colunas:
+            for a, linha in enumerate(linhas):
+                linha.extend(_chance(a, d) for d in range(len(linha), colunas))
+        for a in range(len(linhas), max_atacante + 1):
+            linhas.append([_chance(a, d) for d in range(colunas)])
+
+    def _degraus_de(self, n, faixa):
+        tabela = self._degraus[faixa]
+        if n >= len(tabela):
+            tabela.extend(_degraus(m, faixa) for m in range(len(tabela), max(n + 1, 2 * len(tabela))))
+        return tabela[n]
+
+    # ------------------------------------------------------------------
+    # Consultas escalares
+    # ------------------------------------------------------------------
+    def probabilidade(self, tropas_atacante, tropas_defensor):
+        """Chance de o atacante conquistar o território."""
+        linhas = self._probabilidades
+        if tropas_atacante >= len(linhas) or tropas_defensor >= len(linhas[0]):
+            self._crescer_probabilidades(max(tropas_atacante, 2 * len(linhas)),
+                                         max(tropas_defensor, 2 * len(linhas[0])))
+        return linhas[tropas_atacante][tropas_defensor]
+
+    def sortear_perda(self, n, faixa, r):
+        """Perda ``round(n * U(faixa))`` a partir de um sorteio ``r`` em [0, 1)."""
+        base, limiares = self._degraus_de(n, faixa)
+        return base + bisect_right(limiares, r)
+
+    def distribuicao_perda(self, n, faixa):
+        """Lista ``[(perda, probabilidade)]`` exata da perda ``round(n * U(faixa))``."""
+        base, limiares = self._degraus_de(n, faixa)
+        bordas = [0.0] + limiares + [1.0]
+        return [(base + k, bordas[k + 1] - bordas[k]) for k in range(len(bordas) - 1)]
+
+    def esperanca(self, tropas_atacante, tropas_defensor):
+        """Valores esperados de um ataque, sem simular.
+
+        Returns:
+            dict com ``probabilidade_vitoria``, ``tropas_ocupantes`` (média das
+            tropas movidas se vencer), ``tropas_origem_derrota`` (média das tropas
+            que restam na origem se perder) e ``perda_esperada`` (tropas perdidas
+            pelo atacante, ponderando vitória e derrota).
+        """
+        chave = (tropas_atacante, tropas_defensor)
+        resultado = self._esperancas.get(chave)
+        if resultado is not None:
+            return resultado
+
+        p = self.probabilidade(tropas_atacante, tropas_defensor)
+        vitoria = self.distribuicao_perda(tropas_defensor, FAIXA_VITORIA)
+        derrota = self.distribuicao_perda(tropas_atacante, FAIXA_DERROTA)
+        ocupantes = sum(q * max(1, tropas_atacante - k - 1) for k, q in vitoria)
+        origem_derrota = sum(q * max(1, tropas_atacante - k) for k, q in derrota)
+        resultado = {
+            'probabilidade_vitoria': p,
+            'tropas_ocupantes': ocupantes,
+            'tropas_origem_derrota': origem_derrota,
+            'perda_esperada': tropas_atacante - (p * (1 + ocupantes) + (1 - p) * origem_derrota),
+        }
+        self._esperancas[chave] = resultado
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Matrizes para o motor em lote
+    # ------------------------------------------------------------------
+    def matriz_probabilidade(self, max_atacante, max_defensor):
+        """Matriz NumPy ``[atacante, defensor]`` cobrindo ao menos os máximos pedidos."""
+        import numpy as np
+
+        matriz = self._numpy.get('probabilidade')
+        if matriz is None or matriz.shape[0] <= max_atacante or matriz.shape[1] <= max_defensor:
+            linhas = self._probabilidades
+            self.probabilidade(max(max_atacante, len(linhas) - 1), max(max_defensor, len(linhas[0]) - 1))
+            matriz = self._numpy['probabilidade'] = np.array(self._probabilidades)
+        return matriz
+
+    def limiares_numpy(self, max_n, faixa):
+        """Perdas mínimas ``(n,)`` e limiares ``(n, largura)`` preenchidos com infinito.
+
+        A perda de ``n`` tropas com sorteio ``r`` é
+        ``base[n] + (limiares[n] <= r).sum()``, igual a ``sortear_perda``.
+        """
+        import numpy as np
+
+        chave = ('limiares', faixa)
+        tabela = self._numpy.get(chave)
+        if tabela is None or len(tabela[0]) <= max_n:
+            self._degraus_de(max_n, faixa)
+            degraus = self._degraus[faixa]
+            largura = max(1, max(len(limiares) for _, limiares in degraus))
+            base = np.array([b for b, _ in degraus], dtype=np.int64)
+            limiares = np.full((len(degraus), largura), np.inf)
+            for n, (_, valores) in enumerate(degraus):
+                limiares[n, :len(valores)] = valores
+            tabela = self._numpy[chave] = (base, limiares)
+        return tabela
+
+
+# Tabela compartilhada pelo processo (motores escalar e em lote, bots e análises)
+TABELA_ATAQUE = TabelaAtaque()
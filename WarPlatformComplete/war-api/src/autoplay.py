@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Auto-play no servidor: avança as partidas com ``auto_play`` na velocidade
+configurada, sem depender de o cliente chamar /next-turn.
+
+A agenda é o sorted set ``autoplay:due`` (game_id pontuado pelo horário do
+próximo turno). Cada worker roda um ``EscalonadorAutoPlay``: consulta os jogos
+vencidos, arrenda cada um (``game:{id}:lease``, SET NX com validade) para que
+um único worker conduza a partida e executa os turnos num pool limitado. O
+arrendamento é renovado a cada turno e liberado quando a partida sai do
+auto-play; se o worker cair, ele expira e outro assume.
+
+Cada turno passa por ``SessionStore.atualizar``, que relê o estado: uma pausa
+gravada por /control vale a partir do próximo turno, e /control também tira a
+partida da agenda na hora. /control só mexe na agenda depois de gravar, e o
+escalonador relê a partida depois de tirá-la da agenda; assim uma retomada
+gravada enquanto um turno via o estado ainda pausado não se perde.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import (
+    VELOCIDADES_AUTO_PLAY, AUTO_PLAY_MAX_SIMULTANEAS, AUTO_PLAY_INTERVALO_CICLO, AUTO_PLAY_ARRENDAMENTO
+)
+
+CHAVE_AGENDA = "autoplay:due"
+
+
+def chave_arrendamento(game_id):
+    return f"game:{game_id}:lease"
+
+
+def deve_jogar(sessao):
+    """True se o servidor deve executar o próximo turno sozinho."""
+    return sessao.status == "playing" and bool(sessao.auto_play) and not sessao.is_human_turn()
+
+
+def intervalo_turno(sessao):
+    return VELOCIDADES_AUTO_PLAY.get(sessao.speed, VELOCIDADES_AUTO_PLAY["normal"])
+
+
+def sincronizar_agenda(redis, sessao):
+    """Agenda o próximo turno para já ou tira a partida da agenda, conforme o estado."""
+    if deve_jogar(sessao):
+        redis.zadd(CHAVE_AGENDA, {sessao.game_id: time.time()})
+    else:
+        redis.zrem(CHAVE_AGENDA, sessao.game_id)
+
+
+def _jogar_turno(sessao):
+    if not deve_jogar(sessao):
+        return False
+    sessao.execute_turn()
+    return deve_jogar(sessao)
+
+
+class EscalonadorAutoPlay:
+    """Laço de um worker que executa os turnos vencidos da agenda."""
+
+    def __init__(self, store, max_simultaneas=AUTO_PLAY_MAX_SIMULTANEAS,
+                 intervalo_ciclo=AUTO_PLAY_INTERVALO_CICLO, arrendamento=AUTO_PLAY_ARRENDAMENTO):
+        self.store = store
+        self.max_simultaneas = max_simultaneas
+        self.intervalo_ciclo = intervalo_ciclo
+        self.arrendamento = arrendamento
+        self.token = uuid.uuid4().hex  # identifica este worker nos arrendamentos
+        self.em_andamento = set()
+        self.arrendadas = set()
+        self.turnos = 0
+        self.trava = threading.Lock()
+        self._pool = None
+        self._thread = None
+        self._parar = threading.Event()
+
+    @property
+    def redis(self):
+        return self.store.redis
+
+    def iniciar(self):
+        if self._thread is not None:
+            return
+        self._pool = ThreadPoolExecutor(self.max_simultaneas, thread_name_prefix="auto-play")
+        self._thread = threading.Thread(target=self._laco, name="escalonador-auto-play", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._pool.shutdown(wait=True)
+            self._thread = None
+        for game_id in list(self.arrendadas):
+            self._liberar(game_id)
+
+    def _laco(self):
+        while not self._parar.is_set():
+            try:
+                self.ciclo()
+            except Exception as e:
+                print(f"[AutoPlay] Falha no ciclo do escalonador: {e}")
+            self._parar.wait(self.intervalo_ciclo)
+
+    def ciclo(self):
+        """Despacha os turnos vencidos que couberem no pool; retorna quantos foram despachados."""
+        with self.trava:
+            livres = self.max_simultaneas - len(self.em_andamento)
+        if livres <= 0:
+            return 0
+        vencidas = self.redis.zrangebyscore(CHAVE_AGENDA, "-inf", time.time(), start=0, num=livres * 2)
+        despachadas = 0
+        for bruto in vencidas:
+            game_id = bruto.decode()
+            with self.trava:
+                if game_id in self.em_andamento:
+                    continue
+            if not self._arrendar(game_id):
+                continue
+            with self.trava:
+                self.em_andamento.add(game_id)
+            self._pool.submit(self._executar, game_id)
+            despachadas += 1
+            if despachadas >= livres:
+                break
+        return despachadas
+
+    def _arrendar(self, game_id):
+        """Arrenda (ou renova) a partida para este worker; False se outro worker a conduz."""
+        chave = chave_arrendamento(game_id)
+        validade = int(self.arrendamento * 1000)
+        if self.redis.set(chave, self.token, nx=True, px=validade):
+            self.arrendadas.add(game_id)
+            return True
+        if game_id in self.arrendadas and self.redis.get(chave) == self.token.encode():
+            self.redis.pexpire(chave, validade)
+            return True
+        self.arrendadas.discard(game_id)
+        return False
+
+    def _liberar(self, game_id):
+        self.arrendadas.discard(game_id)
+        chave = chave_arrendamento(game_id)
+        if self.redis.get(chave) == self.token.encode():
+            self.redis.delete(chave)
+
+    def _executar(self, game_id):
+        continuar = False
+        try:
+            sessao, continuar = self.store.atualizar(game_id, _jogar_turno)
+            if continuar:
+                self.turnos += 1
+                # XX: não reagenda uma partida que /control tirou da agenda durante o turno
+                self.redis.zadd(CHAVE_AGENDA, {game_id: time.time() + intervalo_turno(sessao)}, xx=True)
+        except Exception as e:
+            print(f"[AutoPlay] Falha no turno do jogo {game_id}: {e}")
+            # tenta de novo no próximo intervalo (conflitos e falhas do Redis são passageiros)
+            self.redis.zadd(CHAVE_AGENDA, {game_id: time.time() + VELOCIDADES_AUTO_PLAY["normal"]}, xx=True)
+            continuar = True
+        finally:
+            with self.trava:
+                self.em_andamento.discard(game_id)
+        if not continuar:
+            self._desagendar(game_id)
+
+    def _desagendar(self, game_id):
+        """Tira a partida da agenda e libera o arrendamento; reagenda se ela voltou ao auto-play."""
+        self.redis.zrem(CHAVE_AGENDA, game_id)
+        self._liberar(game_id)
+        try:
+            # o turno pode ter lido o estado antes de um /control gravar a retomada
+            sessao = self.store.carregar(game_id)
+            if sessao is not None and deve_jogar(sessao):
+                sincronizar_agenda(self.redis, sessao)
+        except Exception as e:
+            print(f"[AutoPlay] Falha ao reler o jogo {game_id}: {e}")
+
+    def estatisticas(self):
+        with self.trava:
+            em_andamento = len(self.em_andamento)
+        return {
+            "running": self._thread is not None,
+            "in_flight": em_andamento,
+            "leased_games": len(self.arrendadas),
+            "turns_executed": self.turnos,
+            "scheduled_games": self.redis.zcard(CHAVE_AGENDA),
+        }
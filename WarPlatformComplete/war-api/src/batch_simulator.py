@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Simulador vetorizado de partidas do jogo WAR.
+Executa N partidas independentes em paralelo (lockstep) usando matrizes NumPy.
+"""
+
+import numpy as np
+from src.config import (
+    TROPAS_INICIAIS_POR_JOGADOR, MAX_RODADAS, BONUS_CONTINENTES
+)
+from src.game import (
+    NUM_TERRITORIOS, ADJACENCIAS_IDX, NOMES_CONTINENTES, TAMANHO_CONTINENTE,
+    CONTINENTE_DO_TERRITORIO
+)
+from src.attack_table import TABELA_ATAQUE, FAIXA_VITORIA, FAIXA_DERROTA
+
+
+# --- Mapa em formato matricial ---
+ADJACENCIA = np.zeros((NUM_TERRITORIOS, NUM_TERRITORIOS), dtype=bool)
+for _i, _vizinhos in enumerate(ADJACENCIAS_IDX):
+    ADJACENCIA[_i, list(_vizinhos)] = True
+_ADJACENCIA_T = ADJACENCIA.T.astype(np.float64)  # float: usa BLAS no produto matricial
+
+# Vizinhos em matriz (T, grau máximo); posições vazias apontam para o próprio território
+_GRAU_MAX = max(len(v) for v in ADJACENCIAS_IDX)
+VIZINHOS = np.array(
+    [list(v) + [i] * (_GRAU_MAX - len(v)) for i, v in enumerate(ADJACENCIAS_IDX)],
+    dtype=np.int64
+)
+# Máscara (T, grau máximo) que ignora as posições de preenchimento de VIZINHOS
+ADJACENCIA_VALIDA = np.array(
+    [[k < len(v) for k in range(_GRAU_MAX)] for v in ADJACENCIAS_IDX], dtype=bool
+)
+
+# Arestas de ataque na mesma ordem de GameLogic.jogadas_possiveis (origem crescente, vizinhos do MAPA_WAR)
+ARESTA_ORIGEM = np.array([i for i, v in enumerate(ADJACENCIAS_IDX) for _ in v], dtype=np.int64)
+ARESTA_DESTINO = np.array([j for v in ADJACENCIAS_IDX for j in v], dtype=np.int64)
+NUM_ARESTAS = len(ARESTA_ORIGEM)
+
+CONTINENTE = np.array(CONTINENTE_DO_TERRITORIO, dtype=np.int64)
+MEMBRO_CONTINENTE = np.zeros((NUM_TERRITORIOS, len(NOMES_CONTINENTES)), dtype=np.int64)
+MEMBRO_CONTINENTE[np.arange(NUM_TERRITORIOS), CONTINENTE] = 1
+TAMANHOS = np.array(TAMANHO_CONTINENTE, dtype=np.int64)
+BONUS = np.array([BONUS_CONTINENTES[nome] for nome in NOMES_CONTINENTES], dtype=np.int64)
+CONTINENTE_DESTINO = CONTINENTE[ARESTA_DESTINO]
+
+
+class BatchSimulator:
+    """Simula N partidas de WAR em lockstep.
+
+    O estado de todas as partidas fica em matrizes ``(N, 42)`` (``donos`` e
+    ``tropas``) e cada fase do turno — reforço NBSRx, ataques com as oito
+    estratégias do WarBot e redistribuição — é aplicada a todas as partidas de
+    uma vez. As regras são as mesmas de GameLogic, mas a sequência de sorteios
+    é outra, então os resultados são estatisticamente (e não bit a bit)
+    equivalentes ao simulador escalar.
+    """
+
+    def __init__(self, semente=None, max_rodadas=MAX_RODADAS, max_ataques=10):
+        self.rng = np.random.default_rng(semente)
+        self.max_rodadas = max_rodadas
+        self.max_ataques = max_ataques
+
+    def simular(self, genes):
+        """Simula uma partida por linha de ``genes``.
+
+        Args:
+            genes: matriz (N, jogadores) com os genes como inteiros de 9 bits
+                (ver ``bot.gene_para_inteiro``); a coluna é a posição do jogador.
+
+        Returns:
+            dict com ``vencedor`` (N,) — posição do vencedor —, ``territorios_finais``
+            (N, jogadores) e ``rodadas`` (N,).
+        """
+        n, num_jogadores = self._decodificar_genes(genes)
+        self._inicializar(n, num_jogadores)
+        rodadas = self._jogar(num_jogadores, self.max_rodadas)
+
+        territorios_finais = np.stack(
+            [(self.donos == j).sum(axis=1) for j in range(num_jogadores)], axis=1
+        )
+        return {
+            'vencedor': territorios_finais.argmax(axis=1),
+            'territorios_finais': territorios_finais,
+            'rodadas': rodadas,
+        }
+
+    def continuar(self, genes, donos, tropas, rodadas, primeiro=0, perdeu=None):
+        """Continua partidas já em andamento por até ``rodadas`` rodadas.
+
+        Cada linha parte do tabuleiro ``donos``/``tropas`` (N, 42) na vez do
+        jogador ``primeiro``; a primeira rodada vai dele até o último jogador e
+        as seguintes são completas. Como a rodada em curso não recomeça, quem
+        já perdeu território nela vem de ``perdeu`` (N ou 1, jogadores).
+
+        Returns:
+            tupla ``(donos, tropas)`` finais, matrizes (N, 42).
+        """
+        n, num_jogadores = self._decodificar_genes(genes)
+        self.donos = np.array(np.broadcast_to(donos, (n, NUM_TERRITORIOS)), dtype=np.int64)
+        self.tropas = np.array(np.broadcast_to(tropas, (n, NUM_TERRITORIOS)), dtype=np.int64)
+        self.perdeu = np.zeros((n, num_jogadores), dtype=bool)
+        if perdeu is not None:
+            self.perdeu |= np.asarray(perdeu, dtype=bool)
+        self.ativo = ~(self.donos == self.donos[:, :1]).all(axis=1)
+        self._jogar(num_jogadores, rodadas, primeiro)
+        return self.donos, self.tropas
+
+    def _decodificar_genes(self, genes):
+        genes = np.asarray(genes, dtype=np.int64)
+        self.e1 = genes >> 6
+        self.e2 = (genes >> 3) & 7
+        self.prob = (genes & 7) / 7
+        return genes.shape
+
+    def _jogar(self, num_jogadores, max_rodadas, primeiro=0):
+        """Joga até ``max_rodadas`` rodadas; a primeira começa no jogador ``primeiro``.
+
+        Returns:
+            rodadas jogadas por partida (N,).
+        """
+        rodadas = np.zeros(len(self.donos), dtype=np.int64)
+
+        for rodada in range(max_rodadas):
+            if not self.ativo.any():
+                break
+            inicio_rodada = self.ativo.copy()
+            inicio = primeiro if rodada == 0 else 0
+            if inicio == 0:
+                self.perdeu[self.ativo] = False
+
+            for jogador in range(inicio, num_jogadores):
+                vivos = self.ativo & (self.donos == jogador).any(axis=1)
+                if not vivos.any():
+                    continue
+                self._reforcar(jogador, vivos)
+                self._atacar(jogador, vivos)
+                self._redistribuir(jogador, vivos)
+                # Partida termina quando um jogador controla todos os territórios
+                self.ativo &= ~(self.donos == self.donos[:, :1]).all(axis=1)
+
+            rodadas += inicio_rodada
+
+        return rodadas
+
+    # ------------------------------------------------------------------
+    # Inicialização
+    # ------------------------------------------------------------------
+    def _inicializar(self, n, num_jogadores):
+        """Sorteia donos e tropas iniciais de todas as partidas."""
+        permutacoes = self.rng.random((n, NUM_TERRITORIOS)).argsort(axis=1)
+        self.donos = np.empty((n, NUM_TERRITORIOS), dtype=np.int64)
+        np.put_along_axis(
+            self.donos, permutacoes,
+            np.broadcast_to(np.arange(NUM_TERRITORIOS) % num_jogadores, (n, NUM_TERRITORIOS)),
+            axis=1
+        )
+        self.tropas = np.ones((n, NUM_TERRITORIOS), dtype=np.int64)
+
+        # Tropas restantes: cada uma vai para um território aleatório do próprio jogador
+        restantes = TROPAS_INICIAIS_POR_JOGADOR - (NUM_TERRITORIOS // num_jogadores)
+        proprios = self.donos[:, None, :] == np.arange(num_jogadores)[None, :, None]
+        linhas = np.repeat(np.arange(n), num_jogadores)
+        for _ in range(restantes):
+            sorteio = np.where(proprios, self.rng.random(proprios.shape), -1.0)
+            np.add.at(self.tropas, (linhas, sorteio.argmax(axis=2).ravel()), 1)
+
+        self.perdeu = np.zeros((n, num_jogadores), dtype=bool)
+        self.ativo = np.ones(n, dtype=bool)
+
+    # ------------------------------------------------------------------
+    # Heurísticas
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _nbsrx(meus, tropas):
+        """NBSRx de cada território próprio (0 nos demais), normalizado por partida."""
+        tropas_inimigas = np.where(meus, 0.0, tropas)
+        bstx = tropas_inimigas @ _ADJACENCIA_T
+        bsrx = np.where(meus, bstx / np.maximum(tropas, 1), 0.0)
+        soma = bsrx.sum(axis=1, keepdims=True)
+        return np.divide(bsrx, soma, out=np.zeros_like(bsrx), where=soma > 0)
+
+    def _reforcar(self, jogador, vivos):
+        """Fase 1: recebe tropas (base + bônus de continentes) e distribui por NBSRx."""
+        meus = self.donos == jogador
+        contagem = meus.astype(np.int64) @ MEMBRO_CONTINENTE
+        bonus = ((contagem == TAMANHOS) * BONUS).sum(axis=1)
+        restantes = np.where(vivos, np.maximum(3, meus.sum(axis=1) // 2) + bonus, 0)
+
+        nbsrx = self._nbsrx(meus, self.tropas)
+        # Mesmo arredondamento sequencial de GameLogic.distribuir_tropas
+        for t in range(NUM_TERRITORIOS):
+            alocar = np.where(meus[:, t], np.rint(nbsrx[:, t] * restantes), 0).astype(np.int64)
+            self.tropas[:, t] += alocar
+            restantes -= alocar
+
+        sobra = restantes > 0
+        if sobra.any():
+            mais_ameacado = np.where(meus, nbsrx, -1.0).argmax(axis=1)
+            linhas = np.flatnonzero(sobra)
+            self.tropas[linhas, mais_ameacado[linhas]] += restantes[linhas]
+
+    def _escolher_ataques(self, jogador, linhas):
+        """Aplica a estratégia sorteada do gene em cada partida; retorna índice da aresta ou -1."""
+        donos = self.donos[linhas]
+        tropas = self.tropas[linhas]
+        tropas_origem = tropas[:, ARESTA_ORIGEM]
+        tropas_destino = tropas[:, ARESTA_DESTINO]
+        validas = (
+            (donos[:, ARESTA_ORIGEM] == jogador)
+            & (tropas_origem > 1)
+            & (donos[:, ARESTA_DESTINO] != jogador)
+        )
+
+        usa_e1 = self.rng.random(len(linhas)) < self.prob[linhas, jogador]
+        estrategia = np.where(usa_e1, self.e1[linhas, jogador], self.e2[linhas, jogador])
+        perdeu = self.perdeu[linhas, jogador][:, None]
+
+        condicoes = {
+            1: lambda: perdeu,                                  # Contra-golpe
+            2: lambda: tropas_origem > 2 * tropas_destino,      # Fortaleza
+            3: lambda: perdeu,                                  # Retomada
+            4: lambda: tropas_origem > tropas_destino + 2,      # Expansão segura
+            5: lambda: tropas_destino <= 2,                     # Oportunista
+            6: lambda: tropas_origem > tropas_destino,          # Invasor moderado
+        }
+        candidatas = np.zeros_like(validas)
+        for codigo in np.unique(estrategia):
+            if codigo in condicoes:
+                candidatas |= (estrategia == codigo)[:, None] & condicoes[codigo]()
+        candidatas &= validas
+
+        escolha = np.where(candidatas.any(axis=1), candidatas.argmax(axis=1), -1)
+
+        # Caçador de bônus: primeiro continente (na ordem do mapa) com >= 60% de posse
+        cacador = estrategia == 7
+        if cacador.any():
+            contagem = (donos == jogador).astype(np.int64) @ MEMBRO_CONTINENTE
+            alvo = (contagem >= 0.6 * TAMANHOS)[:, CONTINENTE_DESTINO] & validas
+            chave = np.where(alvo, CONTINENTE_DESTINO * NUM_ARESTAS + np.arange(NUM_ARESTAS), np.iinfo(np.int64).max)
+            preferida = np.where(alvo.any(axis=1), chave.argmin(axis=1), -1)
+            qualquer = np.where(validas.any(axis=1), validas.argmax(axis=1), -1)
+            escolha = np.where(cacador, np.where(preferida >= 0, preferida, qualquer), escolha)
+
+        return escolha
+
+    def _atacar(self, jogador, vivos):
+        """Fase 2: até ``max_ataques`` ataques; para no primeiro ataque sem sucesso."""
+        atacando = np.flatnonzero(vivos)
+        for _ in range(self.max_ataques):
+            if len(atacando) == 0:
+                break
+            aresta = self._escolher_ataques(jogador, atacando)
+            atacando = atacando[aresta >= 0]
+            aresta = aresta[aresta >= 0]
+            if len(atacando) == 0:
+                break
+
+            origem = ARESTA_ORIGEM[aresta]
+            destino = ARESTA_DESTINO[aresta]
+            tropas_atacante = self.tropas[atacando, origem]
+            tropas_defensor = self.tropas[atacando, destino]
+
+            chance = TABELA_ATAQUE.matriz_probabilidade(tropas_atacante.max(), tropas_defensor.max())
+            sucesso = self.rng.random(len(atacando)) < chance[tropas_atacante, tropas_defensor]
+
+            # Vitória: atacante ocupa o território deixando 1 tropa na origem
+            v = sucesso
+            perda = self._sortear_perdas(tropas_defensor[v], FAIXA_VITORIA)
+            self.perdeu[atacando[v], self.donos[atacando[v], destino[v]]] = True
+            self.donos[atacando[v], destino[v]] = jogador
+            self.tropas[atacando[v], destino[v]] = np.maximum(1, tropas_atacante[v] - perda - 1)
+            self.tropas[atacando[v], origem[v]] = 1
+
+            # Derrota: atacante perde entre 10% e 40% das tropas
+            d = ~sucesso
+            perda = self._sortear_perdas(tropas_atacante[d], FAIXA_DERROTA)
+            self.tropas[atacando[d], origem[d]] = np.maximum(1, tropas_atacante[d] - perda)
+
+            atacando = atacando[sucesso]
+
+    def _sortear_perdas(self, tropas, faixa):
+        """Perdas ``round(tropas * U(faixa))`` pelos limiares da tabela de ataque (um sorteio por linha)."""
+        if len(tropas) == 0:
+            return tropas
+        base, limiares = TABELA_ATAQUE.limiares_numpy(tropas.max(), faixa)
+        r = self.rng.random(len(tropas))
+        return base[tropas] + (limiares[tropas] <= r[:, None]).sum(axis=1)
+
+    @staticmethod
+    def _componentes(meus):
+        """Rótulo de componente conexa (menor índice do componente) dos territórios próprios.
+
+        Propaga o menor rótulo entre vizinhos próprios e salta ponteiros
+        (rótulo do rótulo) a cada passo, convergindo em poucas iterações.
+        """
+        grande = NUM_TERRITORIOS
+        rotulos = np.where(meus, np.arange(NUM_TERRITORIOS), grande)
+        meus_vizinhos = meus[:, VIZINHOS] & ADJACENCIA_VALIDA
+        while True:
+            vizinhos = np.where(meus_vizinhos, rotulos[:, VIZINHOS], grande).min(axis=2)
+            novos = np.minimum(rotulos, vizinhos)
+            estendido = np.concatenate([novos, np.full((len(novos), 1), grande)], axis=1)
+            novos = np.take_along_axis(estendido, novos, axis=1)
+            if np.array_equal(novos, rotulos):
+                return rotulos
+            rotulos = novos
+
+    def _redistribuir(self, jogador, vivos):
+        """Fase 3: move o excedente dos territórios internos para as fronteiras conectadas.
+
+        O excedente de cada componente conexa é repartido entre suas fronteiras
+        proporcionalmente ao NBSRx; a sobra de arredondamento vai para a
+        fronteira de maior NBSRx do componente.
+        """
+        meus = (self.donos == jogador) & vivos[:, None]
+        fronteira = meus & np.any(~meus[:, VIZINHOS] & ADJACENCIA_VALIDA, axis=2)
+        interno = meus & ~fronteira
+
+        # Só as partidas com algum território interno com excedente têm o que mover
+        linhas = np.flatnonzero((interno & (self.tropas > 1)).any(axis=1))
+        if len(linhas) == 0:
+            return
+        meus, fronteira, interno = meus[linhas], fronteira[linhas], interno[linhas]
+        tropas = self.tropas[linhas]
+        nbsrx = self._nbsrx(meus, tropas)
+
+        rotulos = self._componentes(meus)
+        n = len(linhas)
+        base = (np.arange(n) * NUM_TERRITORIOS)[:, None]
+        chave = (base + np.minimum(rotulos, NUM_TERRITORIOS - 1)).ravel()
+        tamanho = n * NUM_TERRITORIOS
+
+        excedente = np.where(interno, tropas - 1, 0)
+        peso = np.where(fronteira, nbsrx, 0.0)
+        num_fronteiras = np.bincount(chave, weights=fronteira.ravel(), minlength=tamanho)
+        excedente_comp = np.bincount(chave, weights=excedente.ravel(), minlength=tamanho).astype(np.int64)
+        peso_comp = np.bincount(chave, weights=peso.ravel(), minlength=tamanho)
+
+        tem_fronteira = (num_fronteiras[chave] > 0).reshape(n, NUM_TERRITORIOS)
+        total = excedente_comp[chave].reshape(n, NUM_TERRITORIOS)
+        soma_peso = peso_comp[chave].reshape(n, NUM_TERRITORIOS)
+        qtd = num_fronteiras[chave].reshape(n, NUM_TERRITORIOS)
+        frac = np.where(soma_peso > 0, peso / np.where(soma_peso > 0, soma_peso, 1), 1 / np.maximum(qtd, 1))
+        recebe = np.where(fronteira, np.floor(frac * total), 0).astype(np.int64)
+
+        # Sobra do arredondamento para a fronteira mais ameaçada de cada componente
+        entregue = np.bincount(chave, weights=recebe.ravel(), minlength=tamanho).astype(np.int64)
+        sobra = excedente_comp - entregue
+        melhor = np.full(tamanho, -1, dtype=np.int64)
+        ordem = np.lexsort((-np.arange(tamanho), np.where(fronteira, nbsrx, -1.0).ravel()))
+        melhor[chave[ordem]] = ordem
+        destinos = melhor[melhor >= 0]
+        destinos = destinos[fronteira.ravel()[destinos]]
+        recebe.ravel()[destinos] += sobra[chave[destinos]]
+
+        tropas -= np.where(interno & tem_fronteira, excedente, 0)
+        tropas += recebe
+        self.tropas[linhas] = tropas
@@ -4,25 +4,35 @@ Módulo de bot para o jogo WAR.
 Contém a classe WarBot que representa um jogador controlado por IA.
 """
 
-import random
 from src.config import ESTRATEGIAS
+from src.game import INDICE_TERRITORIO, CONTINENTE_DO_TERRITORIO, TAMANHO_CONTINENTE
+
+
+def decodificar_gene(g):
+    """Divide gene 9 bits em (e1, e2, prob). Retrocompatível com 3 bits."""
+    if isinstance(g, str) and len(g) == 9:
+        e1 = g[:3]
+        e2 = g[3:6]
+        p_code = int(g[6:], 2)
+        prob = p_code / 7
+        return e1, e2, prob
+    elif isinstance(g, str) and len(g) == 3:
+        return g, g, 1.0
+    else:
+        return "000", "000", 1.0
+
+
+def gene_para_inteiro(g):
+    """Converte um gene (9 ou 3 bits) no inteiro de 9 bits equivalente (E1 + E2 + P)."""
+    e1, e2, prob = decodificar_gene(g)
+    return (int(e1, 2) << 6) | (int(e2, 2) << 3) | int(round(prob * 7))
 
 
 class WarBot:
     """Representa um jogador controlado por IA no jogo WAR."""
     def _decodificar_gene_duplo(self):
         """Divide gene 9 bits em (e1, e2, prob). Retrocompatível com 3 bits."""
-        g = self.gene
-        if isinstance(g, str) and len(g) == 9:
-            e1 = g[:3]
-            e2 = g[3:6]
-            p_code = int(g[6:], 2)
-            prob = p_code / 7
-            return e1, e2, prob
-        elif isinstance(g, str) and len(g) == 3:
-            return g, g, 1.0
-        else:
-            return "000", "000", 1.0
+        return decodificar_gene(self.gene)
 
     
     def __init__(self, bot_id, gene):
@@ -38,16 +48,23 @@ class WarBot:
 
         
     
-    def escolher_ataque(self, game_state, jogadas_possiveis):
-        """Decide qual ataque realizar com base no gene de 9 bits (estratégia híbrida)."""
+    def escolher_ataque(self, game_state, jogadas_possiveis, rng=None):
+        """Decide qual ataque realizar com base no gene de 9 bits (estratégia híbrida).
+
+        O sorteio entre E1 e E2 usa ``rng`` ou, se omitido, ``game_state.rng``.
+        """
         if not jogadas_possiveis:
             return None
+        if rng is None:
+            rng = game_state.rng
 
         perdeu_territorio = game_state.historico_perdas.get(self.id, False)
+        tropas = game_state.tropas
+        idx = INDICE_TERRITORIO
 
         # --- Suporte ao gene híbrido (9 bits) ---
         e1, e2, p = self._decodificar_gene_duplo()
-        gene_escolhido = e1 if random.random() < p else e2
+        gene_escolhido = e1 if rng.random() < p else e2
 
         # --- Estratégias clássicas (iguais às antigas) ---
         if gene_escolhido == '000':  # Pacifista absoluto
@@ -61,8 +78,8 @@ class WarBot:
 
         elif gene_escolhido == '010':  # Fortaleza
             for origem, destino in jogadas_possiveis:
-                tropas_origem = game_state.territorios[origem]['tropas']
-                tropas_destino = game_state.territorios[destino]['tropas']
+                tropas_origem = tropas[idx[origem]]
+                tropas_destino = tropas[idx[destino]]
                 if tropas_origem > 2 * tropas_destino:
                     return (origem, destino)
             return None
@@ -70,29 +87,29 @@ class WarBot:
         elif gene_escolhido == '011':  # Retomada
             if perdeu_territorio:
                 for origem, destino in jogadas_possiveis:
-                    if game_state.territorios[destino]['dono'] != self.id:
+                    if game_state.donos[idx[destino]] != self.id:
                         return (origem, destino)
             return None
 
         elif gene_escolhido == '100':  # Expansão segura
             for origem, destino in jogadas_possiveis:
-                tropas_origem = game_state.territorios[origem]['tropas']
-                tropas_destino = game_state.territorios[destino]['tropas']
+                tropas_origem = tropas[idx[origem]]
+                tropas_destino = tropas[idx[destino]]
                 if tropas_origem > tropas_destino + 2:
                     return (origem, destino)
             return None
 
         elif gene_escolhido == '101':  # Oportunista
             for origem, destino in jogadas_possiveis:
-                tropas_destino = game_state.territorios[destino]['tropas']
+                tropas_destino = tropas[idx[destino]]
                 if tropas_destino <= 2:
                     return (origem, destino)
             return None
 
         elif gene_escolhido == '110':  # Invasor moderado
             for origem, destino in jogadas_possiveis:
-                tropas_origem = game_state.territorios[origem]['tropas']
-                tropas_destino = game_state.territorios[destino]['tropas']
+                tropas_origem = tropas[idx[origem]]
+                tropas_destino = tropas[idx[destino]]
                 if tropas_origem > tropas_destino:
                     return (origem, destino)
             return None
@@ -109,19 +126,16 @@ class WarBot:
     
     def _encontrar_ataques_continente(self, game_state, jogadas_possiveis):
         """Encontra ataques que podem ajudar a completar continentes."""
-        from src.config import CONTINENTES
-        
         ataques_continente = []
-        meus_territorios = game_state.get_territorios_jogador(self.id)
+        contagem = game_state.contagem_continente.get(self.id)
+        if contagem is None:
+            return ataques_continente
         
-        for nome_continente, territorios_continente in CONTINENTES.items():
-            # Verifica quantos territórios do continente já possui
-            meus_no_continente = [t for t in territorios_continente if t in meus_territorios]
-            
+        for c, tamanho in enumerate(TAMANHO_CONTINENTE):
             # Se possui a maioria dos territórios do continente
-            if len(meus_no_continente) >= len(territorios_continente) * 0.6:
+            if contagem[c] >= tamanho * 0.6:
                 for origem, destino in jogadas_possiveis:
-                    if destino in territorios_continente:
+                    if CONTINENTE_DO_TERRITORIO[INDICE_TERRITORIO[destino]] == c:
                         ataques_continente.append((origem, destino))
         
         return ataques_continente
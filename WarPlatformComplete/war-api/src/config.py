@@ -12,6 +12,81 @@ TAXA_MUTACAO_INICIAL = 0.7
 NUM_PARTIDAS_SIM = 20  # Partidas jogadas para avaliar cada gene/indivíduo
 TAXA_CROSSOVER_INICIAL = 0.7  # recombinação muito alta no início, vai decaindo a cada geração
 ELITE = 6  # Número de melhores pais a preservar
+NUM_PROCESSOS = 1  # Processos para simular partidas em paralelo (1 = avaliação serial)
+SEMENTE_MESTRE = None  # Semente do sorteio de partidas do AG (None = aleatória)
+MOTOR_SIMULACAO = "escalar"  # "escalar" (GameLogic) ou "lote" (BatchSimulator, requer NumPy)
+
+# --- Cache de fitness por gene ---
+USAR_CACHE_FITNESS = False
+CACHE_MIN_PARTIDAS = 30  # Partidas acumuladas para o fitness de um gene ser considerado confiável
+CACHE_PARTIDAS_INCREMENTAIS = 2  # Partidas por geração quando todos os genes já são confiáveis
+CACHE_DECAIMENTO = 0.98  # Fator aplicado às estatísticas acumuladas a cada geração
+CACHE_IDADE_MAXIMA = 100  # Gerações sem partidas novas antes de descartar um gene
+CACHE_MAX_ENTRADAS = 512  # Espaço completo de genes de 9 bits
+CACHE_ARQUIVO = None  # Caminho JSON para reaproveitar o cache entre execuções de evoluir()
+
+# --- Torneio exaustivo entre genes (src/tournament.py) ---
+TORNEIO_ERRO_PADRAO = 0.02  # Erro padrão alvo da taxa de vitória de cada gene
+TABELA_GENES = "tabela_genes.npz"  # Tabela de payoff/checkpoint gerada pelo torneio
+
+# --- Histórico das partidas da API ---
+HISTORICO_INTERVALO_KEYFRAME = 20  # A cada N turnos o histórico grava o tabuleiro completo
+
+# --- Concorrência das sessões da API (src/session_store.py) ---
+SESSAO_TENTATIVAS = 5  # Tentativas de uma alteração antes de desistir por conflito
+SESSAO_ESPERA_BASE = 0.01  # Espera (s) antes da 2ª tentativa, dobrando a cada conflito
+SESSAO_TRAVA_TIMEOUT = 5.0  # Validade (s) da trava opcional por partida
+SESSAO_TRAVA_ESPERA = 2.0  # Tempo máximo (s) esperando a trava antes de seguir sem ela
+SESSAO_CACHE_TAMANHO = 256  # Sessões decodificadas mantidas em memória por worker (0 = sem cache)
+SESSAO_CACHE_TTL = 300.0  # Segundos sem uso antes de uma sessão sair do cache
+SESSAO_ADIAR_MAX_ALTERACOES = 10  # Com escrita adiada: grava a cada N alterações...
+SESSAO_ADIAR_MAX_ESPERA = 1.0  # ...ou depois de N segundos com alterações pendentes
+
+# --- Eventos em tempo real das partidas (src/game_events.py) ---
+EVENTOS_INTERVALO_PING = 15.0  # Segundos sem eventos antes de mandar um comentário de keep-alive
+EVENTOS_DURACAO_MAXIMA = 600.0  # Segundos até fechar o stream (o cliente reconecta com Last-Event-ID)
+EVENTOS_MAX_RECUPERACAO = 200  # Turnos perdidos reenviados como deltas; acima disso manda o estado completo
+
+# --- Auto-play no servidor (src/autoplay.py) ---
+VELOCIDADES_AUTO_PLAY = {"slow": 2.0, "normal": 1.0, "fast": 0.4}  # Segundos entre turnos de bots
+AUTO_PLAY_MAX_SIMULTANEAS = 32  # Turnos executando ao mesmo tempo por worker
+AUTO_PLAY_INTERVALO_CICLO = 0.05  # Segundos entre consultas à agenda
+AUTO_PLAY_ARRENDAMENTO = 10.0  # Validade (s) do arrendamento de uma partida por um worker
+
+# --- Análise de jogadas pelo LLM (src/analysis.py) ---
+ANALISE_MAX_SIMULTANEAS = 4  # Chamadas ao LLM ao mesmo tempo por worker
+ANALISE_FILA_MAXIMA = 32  # Análises esperando no worker antes de recusar novas (503)
+ANALISE_LIMITE_POR_MINUTO = 20  # Análises novas (fora do cache) por cliente por minuto
+ANALISE_TTL_RESULTADO = 86400  # Segundos que uma análise fica no cache
+ANALISE_TTL_JOB = 3600  # Segundos que o status de um job fica consultável
+ANALISE_TIMEOUT = 120  # Segundos até uma análise em andamento ser considerada perdida
+
+# --- Análise local das jogadas (src/move_analyzer.py) ---
+ANALISE_LOCAL_HORIZONTE = 3  # Turnos em que o ganho de tropas de uma conquista é contado no valor esperado
+ANALISE_LOCAL_ALTERNATIVAS = 3  # Melhores ataques alternativos listados na avaliação
+ANALISE_LOCAL_MAX_RECUO = 8  # Turnos do histórico percorridos atrás do tabuleiro anterior à jogada
+
+# --- Cliente do LLM (src/llm_client.py) ---
+LLM_MODELO = "gpt-4o-mini"
+LLM_TIMEOUT = 60.0  # Segundos por chamada (inclui o stream inteiro)
+LLM_TIMEOUT_CONEXAO = 5.0  # Segundos para abrir a conexão
+LLM_MAX_CONEXOES = 20  # Conexões HTTP do pool compartilhado por worker
+LLM_MAX_CONEXOES_OCIOSAS = 10  # Conexões mantidas abertas entre requisições (keep-alive)
+LLM_TENTATIVAS = 2  # Novas tentativas do cliente em erros de rede/5xx (antes do primeiro token)
+
+# --- Prompts de análise (src/prompt_builder.py) ---
+PROMPT_ORCAMENTO_TOKENS = 900  # Tokens máximos do prompt de análise (prefixo fixo incluído)
+PROMPT_MAX_AMEACAS = 5  # Fronteiras ameaçadas listadas para quem jogou
+
+# --- Avaliação Monte Carlo das jogadas do humano (src/move_evaluator.py) ---
+AVALIACAO_TEMPO_MAXIMO = 0.5  # Segundos padrão de rollouts por avaliação (a primeira onda roda sempre)
+AVALIACAO_TEMPO_LIMITE = 1.5  # Teto do orçamento pedido em /evaluate-moves (a vaga fica ocupada nesse tempo)
+AVALIACAO_RODADAS = 2  # Horizonte dos rollouts: resto da rodada atual + rodadas completas
+AVALIACAO_LOTE = 32  # Rollouts por onda para um resultado de peso 1 (os demais, proporcionais ao peso)
+AVALIACAO_MAX_ROLLOUTS = 512  # Rollouts máximos de um tabuleiro de peso 1 (limita o número de ondas)
+AVALIACAO_MAX_CANDIDATOS = 40  # Ataques avaliados (os de maior chance de vitória)
+AVALIACAO_MAX_SIMULTANEAS = 1  # Avaliações simultâneas por worker (threads nativas); as demais recebem 503
+AVALIACAO_TIMEOUT = 3.0  # Espera máxima por uma avaliação em /evaluate-moves; depois, 504
 
 # --- Mapeamento de Estratégias ---
 ESTRATEGIAS = {
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de fitness por gene para o algoritmo genético.
+Acumula estatísticas de partidas por genótipo entre gerações (e entre execuções).
+"""
+
+import json
+import os
+from src.config import (
+    CACHE_MIN_PARTIDAS, CACHE_DECAIMENTO, CACHE_IDADE_MAXIMA, CACHE_MAX_ENTRADAS
+)
+
+
+class FitnessCache:
+    """Estatísticas acumuladas (partidas, vitórias, territórios) por gene.
+
+    - Um gene é *confiável* quando acumula ao menos ``min_partidas`` partidas;
+      a partir daí o AG só lhe dá partidas incrementais.
+    - A cada geração as estatísticas são multiplicadas por ``decaimento``, para
+      que resultados contra populações antigas percam peso, e a idade de cada
+      entrada aumenta; entradas sem partidas novas por ``idade_maxima`` gerações
+      são descartadas, assim como as mais antigas acima de ``max_entradas``.
+    """
+
+    def __init__(self, min_partidas=CACHE_MIN_PARTIDAS, decaimento=CACHE_DECAIMENTO,
+                 idade_maxima=CACHE_IDADE_MAXIMA, max_entradas=CACHE_MAX_ENTRADAS):
+        self.min_partidas = min_partidas
+        self.decaimento = decaimento
+        self.idade_maxima = idade_maxima
+        self.max_entradas = max_entradas
+        self.entradas = {}  # gene -> {'partidas', 'vitorias', 'territorios', 'idade'}
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def __contains__(self, gene):
+        return gene in self.entradas
+
+    def registrar(self, gene, venceu, territorios):
+        """Soma o resultado de uma partida às estatísticas do gene."""
+        entrada = self.entradas.get(gene)
+        if entrada is None:
+            entrada = self.entradas[gene] = {'partidas': 0, 'vitorias': 0, 'territorios': 0, 'idade': 0}
+        entrada['partidas'] += 1
+        entrada['vitorias'] += 1 if venceu else 0
+        entrada['territorios'] += territorios
+        entrada['idade'] = 0
+
+    def estatisticas(self, gene):
+        """Retorna a entrada do gene (ou None)."""
+        return self.entradas.get(gene)
+
+    def confiavel(self, gene):
+        """True se o gene já acumulou partidas suficientes."""
+        entrada = self.entradas.get(gene)
+        return entrada is not None and entrada['partidas'] >= self.min_partidas
+
+    def envelhecer(self):
+        """Aplica o decaimento e a idade de uma geração e descarta entradas velhas."""
+        for gene in list(self.entradas):
+            entrada = self.entradas[gene]
+            entrada['idade'] += 1
+            if entrada['idade'] > self.idade_maxima:
+                del self.entradas[gene]
+                continue
+            for campo in ('partidas', 'vitorias', 'territorios'):
+                entrada[campo] *= self.decaimento
+
+        excesso = len(self.entradas) - self.max_entradas
+        if excesso > 0:
+            mais_velhos = sorted(self.entradas, key=lambda g: self.entradas[g]['idade'], reverse=True)
+            for gene in mais_velhos[:excesso]:
+                del self.entradas[gene]
+
+    def salvar(self, caminho):
+        """Persiste as entradas em JSON."""
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({'versao': 1, 'entradas': self.entradas}, f)
+
+    @classmethod
+    def carregar(cls, caminho, **kwargs):
+        """Cria um cache a partir de um arquivo salvo (ou vazio se o arquivo não existir)."""
+        cache = cls(**kwargs)
+        if caminho and os.path.exists(caminho):
+            with open(caminho, 'r', encoding='utf-8') as f:
+                cache.entradas = json.load(f).get('entradas', {})
+        return cache
@@ -4,76 +4,429 @@ Módulo de lógica do jogo WAR.
 Contém as classes GameState e GameLogic para gerenciar o estado e as regras do jogo.
 """
 
+import copy
 import random
 from collections import deque
+from collections.abc import Mapping, MutableMapping
 from src.config import TERRITORIOS,MAPA_WAR, CONTINENTES, BONUS_CONTINENTES, NUM_JOGADORES, TROPAS_INICIAIS_POR_JOGADOR
+from src.attack_table import TABELA_ATAQUE, FAIXA_VITORIA, FAIXA_DERROTA
+
+
+# --- Mapa compilado em índices inteiros ---
+# Cada território é identificado pela sua posição em TERRITORIOS; as adjacências
+# de MAPA_WAR são convertidas uma única vez em tuplas de índices (mesma ordem).
+NUM_TERRITORIOS = len(TERRITORIOS)
+INDICE_TERRITORIO = {t: i for i, t in enumerate(TERRITORIOS)}
+ADJACENCIAS_IDX = tuple(
+    tuple(INDICE_TERRITORIO[v] for v in MAPA_WAR[t]) for t in TERRITORIOS
+)
+# Territórios que têm cada território como vizinho (MAPA_WAR não é simétrico:
+# p.ex. Japão lista Vladivostok, mas não o contrário)
+ADJACENCIAS_REVERSAS_IDX = tuple(
+    tuple(j for j in range(NUM_TERRITORIOS) if i in ADJACENCIAS_IDX[j]) for i in range(NUM_TERRITORIOS)
+)
+# Vizinhança sem direção, usada para conectividade entre territórios do mesmo dono
+VIZINHANCA_IDX = tuple(
+    tuple(sorted(set(ADJACENCIAS_IDX[i]) | set(ADJACENCIAS_REVERSAS_IDX[i]))) for i in range(NUM_TERRITORIOS)
+)
+CONTINENTES_IDX = {
+    nome: tuple(INDICE_TERRITORIO[t] for t in territorios)
+    for nome, territorios in CONTINENTES.items()
+}
+NOMES_CONTINENTES = tuple(CONTINENTES)
+TAMANHO_CONTINENTE = tuple(len(CONTINENTES_IDX[nome]) for nome in NOMES_CONTINENTES)
+BONUS_CONTINENTE_IDX = tuple(BONUS_CONTINENTES[nome] for nome in NOMES_CONTINENTES)
+CONTINENTE_DO_TERRITORIO = tuple(
+    next(c for c, nome in enumerate(NOMES_CONTINENTES) if i in CONTINENTES_IDX[nome])
+    for i in range(NUM_TERRITORIOS)
+)
+SEM_DONO = -1  # valor usado no vetor de donos para território sem dono
+
+
+class TerritorioView(MutableMapping):
+    """Visão de um território no formato antigo {'dono': ..., 'tropas': ...}.
+
+    Leituras e escritas são repassadas diretamente aos vetores do GameState.
+    """
+
+    __slots__ = ('_gs', '_idx')
+    _CHAVES = ('dono', 'tropas')
+
+    def __init__(self, game_state, idx):
+        self._gs = game_state
+        self._idx = idx
+
+    def __getitem__(self, chave):
+        if chave == 'tropas':
+            return self._gs.tropas[self._idx]
+        if chave == 'dono':
+            dono = self._gs.donos[self._idx]
+            return None if dono == SEM_DONO else dono
+        raise KeyError(chave)
+
+    def __setitem__(self, chave, valor):
+        if chave == 'tropas':
+            self._gs.definir_tropas(self._idx, valor)
+        elif chave == 'dono':
+            self._gs.definir_dono(self._idx, SEM_DONO if valor is None else valor)
+        else:
+            raise KeyError(chave)
+
+    def __delitem__(self, chave):
+        raise TypeError("Não é possível remover campos de um território.")
+
+    def __iter__(self):
+        return iter(self._CHAVES)
+
+    def __len__(self):
+        return len(self._CHAVES)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TerritoriosView(Mapping):
+    """Fachada somente-leitura {nome: {'dono', 'tropas'}} sobre os vetores do GameState."""
+
+    __slots__ = ('_gs',)
+
+    def __init__(self, game_state):
+        self._gs = game_state
+
+    def __getitem__(self, nome):
+        return TerritorioView(self._gs, INDICE_TERRITORIO[nome])
+
+    def __contains__(self, nome):
+        return nome in INDICE_TERRITORIO
+
+    def __iter__(self):
+        return iter(TERRITORIOS)
+
+    def __len__(self):
+        return NUM_TERRITORIOS
 
+    def __repr__(self):
+        return repr(self._gs.territorios_dict())
 
 
 class GameState:
-    """Representa o estado atual do tabuleiro do jogo WAR."""
+    """Representa o estado atual do tabuleiro do jogo WAR.
+
+    O tabuleiro é guardado em dois vetores de tamanho fixo indexados pelo id do
+    território (posição em TERRITORIOS): ``donos`` e ``tropas``. O atributo
+    ``territorios`` continua disponível como fachada no formato de dicionário.
+
+    Para cada jogador são mantidos, de forma incremental a cada troca de dono,
+    o conjunto de índices dos seus territórios e a contagem de territórios
+    possuídos em cada continente (na ordem de NOMES_CONTINENTES).
+
+    Também são mantidos por território a força de fronteira ``bst`` (soma das
+    tropas inimigas adjacentes) e o número de vizinhos inimigos, e por jogador o
+    conjunto das suas fronteiras e o total de tropas. Os rótulos de componente conexa de cada
+    jogador (``componentes_jogador``) são calculados sob demanda e guardados
+    até a próxima troca de dono que o envolva. ``versao`` muda a cada alteração
+    do tabuleiro, para caches de quem o serializa. Por isso as tropas só devem ser alteradas via
+    ``alterar_tropas``/``definir_tropas`` (ou a fachada ``territorios``).
+
+    Todos os sorteios da partida usam ``self.rng`` (um ``random.Random``
+    próprio), para que a partida possa ser reproduzida a partir da semente.
+    """
     
-    def __init__(self):
-        self.territorios = {}
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random.Random()
+        self.donos = [SEM_DONO] * NUM_TERRITORIOS
+        self.tropas = [0] * NUM_TERRITORIOS
+        self.territorios_por_jogador = {}  # jogador_id -> set de índices
+        self.contagem_continente = {}  # jogador_id -> [territórios possuídos por continente]
+        self._indices_ordenados = {}  # cache de get_indices_jogador, invalidado na troca de dono
+        self._componentes = {}  # cache de componentes_jogador, invalidado na troca de dono
+        self.bst = [0] * NUM_TERRITORIOS  # soma das tropas inimigas adjacentes a cada território
+        self.vizinhos_inimigos = [0] * NUM_TERRITORIOS  # vizinhos com outro dono
+        self.fronteiras_por_jogador = {}  # jogador_id -> set de índices com vizinho inimigo
+        self.tropas_por_jogador = {}  # jogador_id -> soma das tropas nos seus territórios
+        self.versao = 0  # incrementada a cada troca de dono ou de tropas
         self.jogadores = []
         self.rodada_atual = 0
         self.historico_perdas = {}  # Para rastrear se um jogador perdeu território na rodada anterior
         self.tropas_disponiveis = {}  # ← novo: tropas ainda não distribuídas
-        
+
+    @property
+    def territorios(self):
+        """Fachada {nome: {'dono': ..., 'tropas': ...}} sobre os vetores do tabuleiro."""
+        return TerritoriosView(self)
+
+    def territorios_dict(self):
+        """Retorna uma cópia do tabuleiro como dicionário comum (serializável em JSON)."""
+        donos = self.donos
+        tropas = self.tropas
+        return {
+            t: {'dono': None if donos[i] == SEM_DONO else donos[i], 'tropas': tropas[i]}
+            for i, t in enumerate(TERRITORIOS)
+        }
+
+    def get_dono(self, territorio):
+        """Retorna o id do dono do território (ou None)."""
+        dono = self.donos[INDICE_TERRITORIO[territorio]]
+        return None if dono == SEM_DONO else dono
+
+    def get_tropas(self, territorio):
+        """Retorna o número de tropas no território."""
+        return self.tropas[INDICE_TERRITORIO[territorio]]
+
     def inicializar_tabuleiro(self, jogadores):
         """Inicializa o tabuleiro com territórios e jogadores."""
         self.jogadores = jogadores
 
         # Inicializar todos os territórios
-        for territorio in TERRITORIOS:
-            self.territorios[territorio] = {
-                'dono': None,
-                'tropas': 0
-            }
+        self.donos = [SEM_DONO] * NUM_TERRITORIOS
+        self.tropas = [0] * NUM_TERRITORIOS
 
         # Inicializar contador de tropas disponíveis para cada jogador
         for jogador in jogadores:
             self.tropas_disponiveis[jogador.id] = 0
 
         # Distribuir territórios aleatoriamente entre os jogadores
-        territorios_embaralhados = TERRITORIOS.copy()
-        random.shuffle(territorios_embaralhados)
+        territorios_embaralhados = list(range(NUM_TERRITORIOS))
+        self.rng.shuffle(territorios_embaralhados)
 
-        for i, territorio in enumerate(territorios_embaralhados):
+        for i, idx in enumerate(territorios_embaralhados):
             jogador = jogadores[i % len(jogadores)]
-            self.territorios[territorio]['dono'] = jogador.id
-            self.territorios[territorio]['tropas'] = 1  # Cada território começa com 1 tropa
+            self.donos[idx] = jogador.id
+            self.tropas[idx] = 1  # Cada território começa com 1 tropa
+
+        self._reconstruir_indices()
 
         # Distribuir tropas restantes
-        tropas_restantes_por_jogador = TROPAS_INICIAIS_POR_JOGADOR - (len(TERRITORIOS) // len(jogadores))
+        tropas_restantes_por_jogador = TROPAS_INICIAIS_POR_JOGADOR - (NUM_TERRITORIOS // len(jogadores))
 
         for jogador in jogadores:
-            meus_territorios = self.get_territorios_jogador(jogador.id)
+            meus_territorios = self.get_indices_jogador(jogador.id)
             tropas_restantes = tropas_restantes_por_jogador
 
             # Distribuir tropas restantes aleatoriamente
             while tropas_restantes > 0:
-                territorio = random.choice(meus_territorios)
-                self.territorios[territorio]['tropas'] += 1
+                idx = self.rng.choice(meus_territorios)
+                self.alterar_tropas(idx, 1)
                 tropas_restantes -= 1
 
         # Inicializar histórico de perdas
         for jogador in jogadores:
             self.historico_perdas[jogador.id] = False
 
+    def _reconstruir_indices(self):
+        """Recalcula do zero os índices por jogador a partir do vetor de donos."""
+        self.territorios_por_jogador = {}
+        self.contagem_continente = {}
+        self._indices_ordenados = {}
+        self._componentes = {}
+        self.fronteiras_por_jogador = {}
+        self.tropas_por_jogador = {}
+        self.versao = getattr(self, 'versao', 0) + 1
+        for idx, dono in enumerate(self.donos):
+            if dono != SEM_DONO:
+                self._registrar_posse(idx, dono)
+
+        donos = self.donos
+        tropas = self.tropas
+        for idx, dono in enumerate(donos):
+            if dono != SEM_DONO:
+                self.tropas_por_jogador[dono] += tropas[idx]
+        self.bst = [0] * NUM_TERRITORIOS
+        self.vizinhos_inimigos = [0] * NUM_TERRITORIOS
+        for idx, dono in enumerate(donos):
+            inimigos = [j for j in ADJACENCIAS_IDX[idx] if donos[j] != dono]
+            self.bst[idx] = sum(tropas[j] for j in inimigos)
+            self.vizinhos_inimigos[idx] = len(inimigos)
+            if inimigos and dono != SEM_DONO:
+                self.fronteiras_por_jogador[dono].add(idx)
+
+    def _registrar_posse(self, idx, jogador_id):
+        conjunto = self.territorios_por_jogador.get(jogador_id)
+        if conjunto is None:
+            conjunto = self.territorios_por_jogador[jogador_id] = set()
+            self.contagem_continente[jogador_id] = [0] * len(NOMES_CONTINENTES)
+        conjunto.add(idx)
+        self.contagem_continente[jogador_id][CONTINENTE_DO_TERRITORIO[idx]] += 1
+        self._indices_ordenados.pop(jogador_id, None)
+        self._componentes.pop(jogador_id, None)
+        self.fronteiras_por_jogador.setdefault(jogador_id, set())
+        self.tropas_por_jogador.setdefault(jogador_id, 0)
+
+    def definir_dono(self, idx, jogador_id):
+        """Troca o dono do território ``idx`` mantendo os índices por jogador."""
+        donos = self.donos
+        antigo = donos[idx]
+        if antigo == jogador_id:
+            return
+        if antigo != SEM_DONO:
+            self.territorios_por_jogador[antigo].discard(idx)
+            self.contagem_continente[antigo][CONTINENTE_DO_TERRITORIO[idx]] -= 1
+            self._indices_ordenados.pop(antigo, None)
+            self._componentes.pop(antigo, None)
+            self.fronteiras_por_jogador[antigo].discard(idx)
+            self.tropas_por_jogador[antigo] -= self.tropas[idx]
+        donos[idx] = jogador_id
+        if jogador_id != SEM_DONO:
+            self._registrar_posse(idx, jogador_id)
+            self.tropas_por_jogador[jogador_id] += self.tropas[idx]
+        self.versao += 1
+
+        # Só muda a relação (amigo/inimigo) com territórios do dono antigo ou do novo
+        tropas = self.tropas
+        bst = self.bst
+        contagem = self.vizinhos_inimigos
+        for j in ADJACENCIAS_REVERSAS_IDX[idx]:  # territórios que têm idx como vizinho
+            dono_j = donos[j]
+            if dono_j == antigo:  # idx passou a ser inimigo de j
+                bst[j] += tropas[idx]
+                contagem[j] += 1
+                if contagem[j] == 1:
+                    self._atualizar_fronteira(j)
+            elif dono_j == jogador_id:  # idx deixou de ser inimigo de j
+                bst[j] -= tropas[idx]
+                contagem[j] -= 1
+                if contagem[j] == 0:
+                    self._atualizar_fronteira(j)
+        for j in ADJACENCIAS_IDX[idx]:  # vizinhos do próprio idx
+            dono_j = donos[j]
+            if dono_j == antigo:
+                bst[idx] += tropas[j]
+                contagem[idx] += 1
+            elif dono_j == jogador_id:
+                bst[idx] -= tropas[j]
+                contagem[idx] -= 1
+        self._atualizar_fronteira(idx)
+
+    def _atualizar_fronteira(self, idx):
+        """Inclui ou remove ``idx`` do conjunto de fronteiras do seu dono."""
+        dono = self.donos[idx]
+        if dono == SEM_DONO:
+            return
+        if self.vizinhos_inimigos[idx]:
+            self.fronteiras_por_jogador[dono].add(idx)
+        else:
+            self.fronteiras_por_jogador[dono].discard(idx)
+
+    def alterar_tropas(self, idx, delta):
+        """Soma ``delta`` às tropas de ``idx`` e à força de fronteira dos inimigos vizinhos."""
+        if not delta:
+            return
+        self.tropas[idx] += delta
+        self.versao += 1
+        donos = self.donos
+        dono = donos[idx]
+        if dono != SEM_DONO:
+            self.tropas_por_jogador[dono] += delta
+        bst = self.bst
+        for j in ADJACENCIAS_REVERSAS_IDX[idx]:
+            if donos[j] != dono:
+                bst[j] += delta
+
+    def definir_tropas(self, idx, valor):
+        """Define as tropas de ``idx`` (ver ``alterar_tropas``)."""
+        self.alterar_tropas(idx, valor - self.tropas[idx])
+
+    def num_territorios(self, jogador_id):
+        """Número de territórios do jogador (O(1))."""
+        return len(self.territorios_por_jogador.get(jogador_id, ()))
+
+    def get_indices_jogador(self, jogador_id):
+        """Retorna os índices (em ordem crescente) dos territórios do jogador.
+
+        A lista devolvida é compartilhada com o cache interno e não deve ser alterada.
+        """
+        indices = self._indices_ordenados.get(jogador_id)
+        if indices is None:
+            indices = sorted(self.territorios_por_jogador.get(jogador_id, ()))
+            self._indices_ordenados[jogador_id] = indices
+        return indices
+    
+    def componentes_jogador(self, jogador_id):
+        """Rótulo da componente conexa de cada território do jogador.
+
+        Retorna uma lista indexada por território: o menor índice da componente
+        para os territórios do jogador e SEM_DONO para os demais. É calculada em
+        uma única passada e reaproveitada até o jogador ganhar ou perder um
+        território; não deve ser alterada.
+        """
+        rotulos = self._componentes.get(jogador_id)
+        if rotulos is not None:
+            return rotulos
+
+        donos = self.donos
+        rotulos = [SEM_DONO] * NUM_TERRITORIOS
+        for inicio in self.get_indices_jogador(jogador_id):
+            if rotulos[inicio] != SEM_DONO:
+                continue
+            rotulos[inicio] = inicio
+            pilha = [inicio]
+            while pilha:
+                atual = pilha.pop()
+                for vizinho in VIZINHANCA_IDX[atual]:
+                    if rotulos[vizinho] == SEM_DONO and donos[vizinho] == jogador_id:
+                        rotulos[vizinho] = inicio
+                        pilha.append(vizinho)
+        self._componentes[jogador_id] = rotulos
+        return rotulos
+
+    def conectados(self, jogador_id, idx_a, idx_b):
+        """True se há caminho entre os dois territórios passando só por territórios do jogador."""
+        rotulos = self.componentes_jogador(jogador_id)
+        return rotulos[idx_a] != SEM_DONO and rotulos[idx_a] == rotulos[idx_b]
+
+    def total_tropas(self, jogador_id):
+        """Soma das tropas do jogador (O(1))."""
+        return self.tropas_por_jogador.get(jogador_id, 0)
+
+    def get_fronteiras_jogador(self, jogador_id):
+        """Índices (em ordem crescente) dos territórios do jogador com algum vizinho inimigo."""
+        return sorted(self.fronteiras_por_jogador.get(jogador_id, ()))
     
     def get_territorios_jogador(self, jogador_id):
         """Retorna lista de territórios pertencentes ao jogador."""
-        return [t for t, info in self.territorios.items() if info['dono'] == jogador_id]
+        return [TERRITORIOS[i] for i in self.get_indices_jogador(jogador_id)]
     
     def get_inimigos_jogador(self, jogador_id):
         """Retorna lista de territórios que não pertencem ao jogador."""
-        return [t for t, info in self.territorios.items() if info['dono'] != jogador_id]
+        meus = self.territorios_por_jogador.get(jogador_id, ())
+        return [t for i, t in enumerate(TERRITORIOS) if i not in meus]
     
+    @classmethod
+    def restaurar(cls, donos, tropas, jogadores=(), rodada_atual=0, historico_perdas=None,
+                  tropas_disponiveis=None, rng=None):
+        """Recria um estado a partir dos vetores do tabuleiro, sem passar pelo construtor.
+
+        Usado na desserialização de sessões; os índices incrementais são reconstruídos.
+        """
+        gs = cls.__new__(cls)
+        gs.rng = rng if rng is not None else random.Random()
+        gs.donos = list(donos)
+        gs.tropas = list(tropas)
+        gs.jogadores = list(jogadores)
+        gs.rodada_atual = rodada_atual
+        gs.historico_perdas = historico_perdas if historico_perdas is not None else {}
+        gs.tropas_disponiveis = tropas_disponiveis if tropas_disponiveis is not None else {}
+        gs._reconstruir_indices()
+        return gs
+
     def copy(self):
         """Retorna uma cópia profunda do estado do jogo."""
         return copy.deepcopy(self)
 
+    def __setstate__(self, state):
+        # Sessões antigas (pickle) guardavam o tabuleiro em ``territorios`` como dict.
+        antigos = state.pop('territorios', None)
+        state.setdefault('rng', random.Random())
+        self.__dict__.update(state)
+        if antigos is not None:
+            self.donos = [SEM_DONO] * NUM_TERRITORIOS
+            self.tropas = [0] * NUM_TERRITORIOS
+            for nome, info in antigos.items():
+                idx = INDICE_TERRITORIO[nome]
+                self.donos[idx] = SEM_DONO if info['dono'] is None else info['dono']
+                self.tropas[idx] = info['tropas']
+        self._reconstruir_indices()
+
 
 class GameLogic:
     """Contém a lógica e regras do jogo WAR."""
@@ -81,10 +434,8 @@ class GameLogic:
     @staticmethod
     def calcular_unidades_recebidas(game_state, jogador_id):
         """Calcula o número de tropas que um jogador recebe no início do turno."""
-        meus_territorios = game_state.get_territorios_jogador(jogador_id)
-        
         # Tropas base: número de territórios dividido por 2 (mínimo 3)
-        tropas_base = max(3, len(meus_territorios) // 2)
+        tropas_base = max(3, game_state.num_territorios(jogador_id) // 2)
         
         # Bônus por continentes
         bonus_continentes = GameLogic.bonus_continentes(game_state, jogador_id)
@@ -94,64 +445,89 @@ class GameLogic:
     @staticmethod
     def bonus_continentes(game_state, jogador_id):
         """Calcula o bônus de tropas por continentes controlados."""
+        contagem = game_state.contagem_continente.get(jogador_id)
+        if contagem is None:
+            return 0
         bonus = 0
-        for nome_continente, territorios_continente in CONTINENTES.items():
-            if all(game_state.territorios[t]['dono'] == jogador_id for t in territorios_continente):
-                bonus += BONUS_CONTINENTES[nome_continente]
+        for c, possuidos in enumerate(contagem):
+            if possuidos == TAMANHO_CONTINENTE[c]:
+                bonus += BONUS_CONTINENTE_IDX[c]
         return bonus
     
     @staticmethod
     def calcular_BSTx(game_state, territorio, inimigos):
         """Calcula Border Strength Total - soma das tropas inimigas adjacentes."""
-        return sum(game_state.territorios[t]['tropas'] for t in MAPA_WAR[territorio] if t in inimigos)
+        return sum(game_state.get_tropas(t) for t in MAPA_WAR[territorio] if t in inimigos)
     
     @staticmethod
     def calcular_BSRx(game_state, territorio, inimigos):
         """Calcula Border Strength Ratio - razão entre tropas inimigas adjacentes e próprias."""
         bstx = GameLogic.calcular_BSTx(game_state, territorio, inimigos)
-        unidades_x = game_state.territorios[territorio]['tropas']
+        unidades_x = game_state.get_tropas(territorio)
         return bstx / unidades_x if unidades_x > 0 else float('inf')
     
     @staticmethod
     def calcular_NBSRx(game_state, meus_territorios, inimigos):
         """Calcula Normalized Border Strength Ratio para todos os territórios."""
+        inimigos = set(inimigos)
         bsrxs = {t: GameLogic.calcular_BSRx(game_state, t, inimigos) for t in meus_territorios}
         soma = sum(bsrxs.values())
         return {t: (bsrxs[t] / soma if soma > 0 else 0) for t in meus_territorios}
+
+    @staticmethod
+    def _nbsrx_indices(game_state, indices):
+        """Versão indexada de calcular_NBSRx: retorna os NBSRx alinhados a ``indices``.
+
+        Usa a força de fronteira mantida pelo GameState; territórios internos têm
+        BSTx 0, então normalizar só sobre as fronteiras dá o mesmo resultado.
+        """
+        bst = game_state.bst
+        tropas = game_state.tropas
+        bsrxs = [bst[i] / tropas[i] if tropas[i] > 0 else float('inf') for i in indices]
+        soma = sum(bsrxs)
+        return [(b / soma if soma > 0 else 0) for b in bsrxs]
     
     @staticmethod
     def distribuir_tropas(game_state, jogador_id, unidades_disponiveis):
         """Distribui tropas usando a heurística NBSRx."""
-        meus_territorios = game_state.get_territorios_jogador(jogador_id)
-        inimigos = game_state.get_inimigos_jogador(jogador_id)
+        meus_idx = game_state.get_indices_jogador(jogador_id)
         
-        if not meus_territorios:
+        if not meus_idx:
             return
         
-        nbsrxs = GameLogic.calcular_NBSRx(game_state, meus_territorios, inimigos)
+        # Só as fronteiras recebem tropas (NBSRx dos territórios internos é 0)
+        fronteiras = game_state.get_fronteiras_jogador(jogador_id)
+        nbsrxs = GameLogic._nbsrx_indices(game_state, fronteiras)
         
         # Distribuir tropas proporcionalmente ao NBSRx
-        for territorio in meus_territorios:
-            alocar = int(round(nbsrxs[territorio] * unidades_disponiveis))
-            game_state.territorios[territorio]['tropas'] += alocar
-            unidades_disponiveis -= alocar
+        for i, nbsrx in zip(fronteiras, nbsrxs):
+            alocar = int(round(nbsrx * unidades_disponiveis))
+            if alocar:
+                game_state.alterar_tropas(i, alocar)
+                unidades_disponiveis -= alocar
         
         # Distribuir tropas restantes para o território mais ameaçado
-        if unidades_disponiveis > 0 and meus_territorios:
-            mais_ameacado = max(nbsrxs, key=nbsrxs.get)
-            game_state.territorios[mais_ameacado]['tropas'] += unidades_disponiveis
+        # (sem ameaça alguma, o primeiro território do jogador)
+        if unidades_disponiveis > 0:
+            if any(nbsrxs):
+                posicao = max(range(len(fronteiras)), key=nbsrxs.__getitem__)
+                mais_ameacado = fronteiras[posicao]
+            else:
+                mais_ameacado = meus_idx[0]
+            game_state.alterar_tropas(mais_ameacado, unidades_disponiveis)
     
     @staticmethod
     def jogadas_possiveis(game_state, jogador_id):
         """Retorna lista de ataques possíveis para um jogador."""
-        meus_territorios = game_state.get_territorios_jogador(jogador_id)
+        donos = game_state.donos
+        tropas = game_state.tropas
         jogadas = []
         
-        for territorio in meus_territorios:
-            if game_state.territorios[territorio]['tropas'] > 1:  # Precisa ter mais de 1 tropa para atacar
-                for adjacente in MAPA_WAR[territorio]:
-                    if game_state.territorios[adjacente]['dono'] != jogador_id:
-                        jogadas.append((territorio, adjacente))
+        for i in game_state.get_indices_jogador(jogador_id):
+            if tropas[i] > 1:  # Precisa ter mais de 1 tropa para atacar
+                for j in ADJACENCIAS_IDX[i]:
+                    if donos[j] != jogador_id:
+                        jogadas.append((TERRITORIOS[i], TERRITORIOS[j]))
         
         return jogadas
     
@@ -160,50 +536,62 @@ class GameLogic:
         """
         Calcula a probabilidade de vitória do atacante com base na razão de tropas.
         Retorna valor entre 0.1 e 0.9 (10% a 90% de chance).
+        O valor vem da tabela memoizada de ``src.attack_table``.
         """
-        if tropas_atacante <= 1:
-            return 0.0  # não pode atacar
+        return TABELA_ATAQUE.probabilidade(tropas_atacante, tropas_defensor)
+    
 
-        # razão entre tropas, suavizada
-        chance = 1 / (1 + (tropas_defensor / tropas_atacante) ** 1.5)
+    @staticmethod
+    def resultado_esperado_ataque(game_state, origem, destino):
+        """Valores esperados do ataque origem -> destino no estado atual, sem simular.
 
-        # limitar chance entre 10% e 90%
-        return max(0.1, min(0.9, chance))
-    
+        Ver ``TabelaAtaque.esperanca`` para os campos retornados.
+        """
+        return TABELA_ATAQUE.esperanca(game_state.get_tropas(origem), game_state.get_tropas(destino))
 
     @staticmethod
-    def executar_ataque(game_state, origem, destino):
-        """Executa um ataque entre dois territórios de forma probabilística."""
-        tropas_atacante = game_state.territorios[origem]['tropas']
-        tropas_defensor = game_state.territorios[destino]['tropas']
-        dono_defensor = game_state.territorios[destino]['dono']
+    def executar_ataque(game_state, origem, destino, rng=None):
+        """Executa um ataque entre dois territórios de forma probabilística.
+
+        Os sorteios usam ``rng`` ou, se omitido, o gerador da partida (``game_state.rng``).
+        """
+        if rng is None:
+            rng = game_state.rng
+        i_origem = INDICE_TERRITORIO[origem]
+        i_destino = INDICE_TERRITORIO[destino]
+        donos = game_state.donos
+        tropas = game_state.tropas
+
+        tropas_atacante = tropas[i_origem]
+        tropas_defensor = tropas[i_destino]
+        dono_defensor = donos[i_destino]
 
         if tropas_atacante <= 1:
             return False
 
         # Calcula probabilidade de vitória
-        chance_vitoria = GameLogic.calcular_probabilidade_vitoria(tropas_atacante, tropas_defensor)
+        chance_vitoria = TABELA_ATAQUE.probabilidade(tropas_atacante, tropas_defensor)
 
         # Decide com base em sorteio
-        sucesso = random.random() < chance_vitoria
+        sucesso = rng.random() < chance_vitoria
 
         if sucesso:
             # Vitória: atacante ocupa território
-            perda = int(round(tropas_defensor * random.uniform(0.1, 0.3)))  # perda de 10% a 30%
+            perda = TABELA_ATAQUE.sortear_perda(tropas_defensor, FAIXA_VITORIA, rng.random())  # perda de 10% a 30%
             tropas_restantes = tropas_atacante - perda
             tropas_movidas = max(1, tropas_restantes - 1)
 
             # Atualiza territórios
-            game_state.territorios[destino]['dono'] = game_state.territorios[origem]['dono']
-            game_state.territorios[destino]['tropas'] = tropas_movidas
-            game_state.territorios[origem]['tropas'] = 1
+            game_state.definir_dono(i_destino, donos[i_origem])
+            game_state.definir_tropas(i_destino, tropas_movidas)
+            game_state.definir_tropas(i_origem, 1)
 
             game_state.historico_perdas[dono_defensor] = True
             return True
         else:
             # Derrota: atacante perde entre 10% e 40% de suas tropas
-            perda = int(round(tropas_atacante * random.uniform(0.1, 0.4)))
-            game_state.territorios[origem]['tropas'] = max(1, tropas_atacante - perda)
+            perda = TABELA_ATAQUE.sortear_perda(tropas_atacante, FAIXA_DERROTA, rng.random())
+            game_state.definir_tropas(i_origem, max(1, tropas_atacante - perda))
             return False
 
 
@@ -215,11 +603,11 @@ class GameLogic:
         - A quantidade deve ser positiva e não ultrapassar o saldo disponível.
         - Atualiza o estado do jogo.
         """
-        if territorio not in game_state.territorios:
+        if territorio not in INDICE_TERRITORIO:
             raise ValueError(f"O território {territorio} não existe.")
 
-        info = game_state.territorios[territorio]
-        if info['dono'] != jogador_id:
+        idx = INDICE_TERRITORIO[territorio]
+        if game_state.donos[idx] != jogador_id:
             raise ValueError(f"O território {territorio} não pertence ao jogador.")
 
         if qtd <= 0:
@@ -233,12 +621,13 @@ class GameLogic:
             )
 
         # Adiciona tropas e atualiza saldo
-        info['tropas'] += qtd
+        game_state.alterar_tropas(idx, qtd)
         game_state.tropas_disponiveis[jogador_id] = disponiveis - qtd
 
     @staticmethod
     def territorios_conectados(game_state, origem, meus_territorios):
         """Retorna todos territórios conectados à origem usando BFS."""
+        meus_territorios = set(meus_territorios)
         visitados = set()
         fila = deque([origem])
         
@@ -253,42 +642,39 @@ class GameLogic:
         if origem in visitados:
             visitados.remove(origem)
         return visitados
-    
+
     @staticmethod
     def redistribuir_tropas(game_state, jogador_id):
         """Redistribui tropas usando heurística defensiva nas fronteiras."""
-        meus_territorios = game_state.get_territorios_jogador(jogador_id)
-        inimigos = game_state.get_inimigos_jogador(jogador_id)
+        meus_idx = game_state.get_indices_jogador(jogador_id)
         
-        if not meus_territorios:
+        if not meus_idx:
             return
         
-        # Calcular NBSRx para todos os territórios
-        nbsrxs = GameLogic.calcular_NBSRx(game_state, meus_territorios, inimigos)
+        tropas = game_state.tropas
+
+        # Fronteiras (territórios com vizinhos inimigos) e internos, mantidos pelo GameState
+        fronteiras = game_state.get_fronteiras_jogador(jogador_id)
+        conjunto_fronteiras = game_state.fronteiras_por_jogador[jogador_id]
+        internos = [i for i in meus_idx if i not in conjunto_fronteiras]
         
-        # Identificar fronteiras (territórios com vizinhos inimigos)
-        fronteiras = []
-        internos = []
+        # Calcular NBSRx das fronteiras
+        nbsrxs = dict(zip(fronteiras, GameLogic._nbsrx_indices(game_state, fronteiras)))
         
-        for territorio in meus_territorios:
-            tem_vizinho_inimigo = any(
-                game_state.territorios[v]['dono'] != jogador_id 
-                for v in MAPA_WAR[territorio]
-            )
-            if tem_vizinho_inimigo:
-                fronteiras.append(territorio)
-            else:
-                internos.append(territorio)
+        # Fronteiras agrupadas por componente conexa (rotulagem única para o turno)
+        rotulos = game_state.componentes_jogador(jogador_id)
+        fronteiras_por_componente = {}
+        for f in fronteiras:
+            fronteiras_por_componente.setdefault(rotulos[f], []).append(f)
         
         # Mover tropas excedentes dos territórios internos para as fronteiras
         for t_interno in internos:
-            tropas_excedente = game_state.territorios[t_interno]['tropas'] - 1
+            tropas_excedente = tropas[t_interno] - 1
             if tropas_excedente <= 0:
                 continue
             
             # Encontrar fronteiras conectadas
-            conectados = GameLogic.territorios_conectados(game_state, t_interno, meus_territorios)
-            fronteiras_conectadas = [f for f in fronteiras if f in conectados]
+            fronteiras_conectadas = fronteiras_por_componente.get(rotulos[t_interno])
             
             if not fronteiras_conectadas:
                 continue
@@ -305,22 +691,22 @@ class GameLogic:
                 mover = min(mover, tropas_excedente)
                 
                 if mover > 0:
-                    game_state.territorios[t_interno]['tropas'] -= mover
-                    game_state.territorios[fronteira]['tropas'] += mover
+                    game_state.alterar_tropas(t_interno, -mover)
+                    game_state.alterar_tropas(fronteira, mover)
                     tropas_excedente -= mover
     
     @staticmethod
     def verificar_vencedor(game_state):
         """Verifica se há um vencedor (jogador que controla todos os territórios)."""
-        donos = set(info['dono'] for info in game_state.territorios.values())
-        if len(donos) == 1:
-            return list(donos)[0]
+        for jogador_id, conjunto in game_state.territorios_por_jogador.items():
+            if len(conjunto) == NUM_TERRITORIOS:
+                return jogador_id
         return None
     
     @staticmethod
     def jogador_eliminado(game_state, jogador_id):
         """Verifica se um jogador foi eliminado (não possui territórios)."""
-        return len(game_state.get_territorios_jogador(jogador_id)) == 0
+        return game_state.num_territorios(jogador_id) == 0
 
     @staticmethod
     def mover_tropas(game_state, jogador_id, origem, destino, qtd):     #codigo que implementa realocar tropas do jogador humano
@@ -331,26 +717,26 @@ class GameLogic:
         - Não pode deixar o território de origem com menos de 1 tropa.
         - Deve existir um caminho válido (vizinhança direta ou conectada).
         """
-        from src.config import MAPA_WAR  # importa o mapa de conexões
+        i_origem = INDICE_TERRITORIO[origem]
+        i_destino = INDICE_TERRITORIO[destino]
+        donos = game_state.donos
+        tropas = game_state.tropas
 
         # valida propriedade
-        if (
-            game_state.territorios[origem]['dono'] != jogador_id
-            or game_state.territorios[destino]['dono'] != jogador_id
-        ):
+        if donos[i_origem] != jogador_id or donos[i_destino] != jogador_id:
             raise ValueError("Só é possível mover tropas entre territórios do mesmo jogador.")
 
         # valida quantidade
-        tropas_origem = game_state.territorios[origem]['tropas']
+        tropas_origem = tropas[i_origem]
         if qtd <= 0 or tropas_origem <= 1:
             raise ValueError("Não há tropas suficientes para mover.")
         if qtd >= tropas_origem:
             raise ValueError("Não é permitido mover todas as tropas — deve sobrar ao menos 1.")
 
-        # verifica conexão (direta)
-        if destino not in MAPA_WAR.get(origem, []):
-            raise ValueError(f"{destino} não é vizinho de {origem}.")
+        # verifica conexão (caminho por territórios do próprio jogador)
+        if not game_state.conectados(jogador_id, i_origem, i_destino):
+            raise ValueError(f"{destino} não está conectado a {origem} por territórios seus.")
 
         # efetua movimentação
-        game_state.territorios[origem]['tropas'] -= qtd
-        game_state.territorios[destino]['tropas'] += qtd
+        game_state.alterar_tropas(i_origem, -qtd)
+        game_state.alterar_tropas(i_destino, qtd)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Eventos em tempo real das partidas (Server-Sent Events), no lugar do polling de /state.
+
+Cada gravação da sessão com turnos novos ou status alterado (pausa, auto-play,
+velocidade, vez do humano, tropas a distribuir) publica no canal
+``game:{id}:events`` do Redis os deltas dos turnos novos (formato de
+``HistoricoPartida.replay``: só os territórios alterados) e o status atual; o
+pub/sub entrega a todos os workers, e cada conexão SSE repassa ao cliente:
+
+    event: turn      id = número do turno, data = delta do turno
+    event: status    data = {'turn', 'status', 'auto_play', 'speed', 'human_turn', 'tropas_disponiveis'}
+    event: snapshot  id = turno atual, data = {'turn', 'state'} (estado completo)
+
+O número do turno é a sequência do stream: ao reconectar (``Last-Event-ID`` ou
+``?since=``) os turnos perdidos vêm do histórico, e um salto na sequência faz
+o servidor reenviar o estado completo. Tudo é E/S de socket, compatível com o
+worker gevent.
+"""
+
+import json
+import time
+
+from src.config import EVENTOS_INTERVALO_PING, EVENTOS_DURACAO_MAXIMA, EVENTOS_MAX_RECUPERACAO
+
+
+def canal_eventos(game_id):
+    return f"game:{game_id}:events"
+
+
+CAMPOS_STATUS = ("status", "auto_play", "speed", "human_turn", "tropas_disponiveis")
+
+
+def status_sessao(sessao):
+    """Campos do evento ``status`` (a gravação publica quando algum deles muda)."""
+    gs = sessao.game_state
+    return {
+        "status": sessao.status,
+        "auto_play": sessao.auto_play,
+        "speed": sessao.speed,
+        "human_turn": sessao.is_human_turn(),
+        "tropas_disponiveis": dict(gs.tropas_disponiveis) if gs else {},
+    }
+
+
+def _status(sessao, turno):
+    return {"turn": turno, **status_sessao(sessao)}
+
+
+def mensagem_eventos(sessao, eventos):
+    """Mensagem publicada na gravação: deltas dos turnos novos (pode não haver) + status."""
+    turno = eventos[-1]["turn"] if eventos else len(sessao.history) - 1
+    return json.dumps({"events": eventos, **_status(sessao, turno)},
+                      separators=(",", ":"), ensure_ascii=False)
+
+
+def formatar_sse(evento, dados, id_evento=None):
+    linhas = [f"event: {evento}"]
+    if id_evento is not None:
+        linhas.append(f"id: {id_evento}")
+    linhas.append("data: " + json.dumps(dados, separators=(",", ":"), ensure_ascii=False))
+    return "\n".join(linhas) + "\n\n"
+
+
+def _snapshot(sessao):
+    turno = len(sessao.history) - 1
+    return turno, formatar_sse("snapshot", {"turn": turno, "state": sessao.get_state_dict()}, turno)
+
+
+def transmitir(store, game_id, desde=None, intervalo_ping=EVENTOS_INTERVALO_PING,
+               duracao_maxima=EVENTOS_DURACAO_MAXIMA):
+    """Gerador do stream SSE de uma partida.
+
+    Args:
+        store: ``SessionStore`` (Redis e leitura da sessão).
+        desde: último turno que o cliente já tem; None começa com o estado completo.
+    """
+    pubsub = store.redis.pubsub(ignore_subscribe_messages=True)
+    # inscreve antes de ler a sessão para não perder turnos gravados no meio
+    pubsub.subscribe(canal_eventos(game_id))
+    try:
+        sessao = store.carregar(game_id)
+        if sessao is None:
+            yield formatar_sse("error", {"error": "Jogo não encontrado"})
+            return
+
+        ultimo = len(sessao.history) - 1
+        if desde is not None and ultimo - EVENTOS_MAX_RECUPERACAO <= desde <= ultimo:
+            if desde < ultimo:
+                for turno in sessao.history.replay(desde, ultimo)["turns"]:
+                    yield formatar_sse("turn", turno, turno["turn"])
+                yield formatar_sse("status", _status(sessao, ultimo))
+        else:
+            ultimo, snapshot = _snapshot(sessao)
+            yield snapshot
+        if sessao.status == "finished":
+            return
+
+        fim = time.monotonic() + duracao_maxima
+        while time.monotonic() < fim:
+            mensagem = pubsub.get_message(timeout=intervalo_ping)
+            if mensagem is None:
+                yield ": ping\n\n"
+                continue
+            lote = json.loads(mensagem["data"])
+            novos = [e for e in lote["events"] if e["turn"] > ultimo]
+            status = {key: lote[key] for key in ("turn",) + CAMPOS_STATUS}
+            if not novos and (lote["events"] or lote["turn"] < ultimo):
+                continue  # turnos que o cliente já tem
+            if not novos and lote["turn"] == ultimo:
+                yield formatar_sse("status", status)  # só o status mudou (controle da partida)
+            elif not novos or novos[0]["turn"] != ultimo + 1:
+                # mensagens perdidas (ou gravadas antes da inscrição): reenvia o estado completo
+                sessao = store.carregar(game_id)
+                if sessao is None:
+                    return
+                ultimo, snapshot = _snapshot(sessao)
+                yield snapshot
+            else:
+                for evento in novos:
+                    yield formatar_sse("turn", evento, evento["turn"])
+                ultimo = novos[-1]["turn"]
+                yield formatar_sse("status", status)
+            if lote["status"] == "finished":
+                return
+    finally:
+        pubsub.close()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Sessão de jogo da API: jogadores (bots e humano), estado do tabuleiro e histórico.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from src.bot import WarBot
+from src.game import GameState, GameLogic, NUM_TERRITORIOS
+from src.history import HistoricoPartida, territorios_como_dict
+
+
+# Cores para os jogadores
+PLAYER_COLORS = [
+    "#FF6B6B",  # Vermelho
+    "#4ECDC4",  # Turquesa
+    "#45B7D1",  # Azul
+    "#96CEB4",  # Verde
+    "#FFEAA7",  # Amarelo
+    "#DDA0DD"   # Roxo
+]
+
+
+class HumanPlayer:
+    """Representa o jogador humano (controlado pelo usuário)."""
+    def __init__(self, id_):
+        self.id = id_
+        self.is_human = True
+        # manter nomes compatíveis com fronte/back existente
+        self.estrategia = "Decisão manual"
+        self.strategy = "Decisão manual"
+        self.gene = "HUMANO"
+
+
+class GameSession:
+    """Classe para gerenciar uma sessão de jogo."""
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.status = "waiting"  # waiting, playing, paused, finished
+        self.game_state = None
+        self.bots = []
+        self.current_player_index = 0
+        self.round_number = 0
+        self.last_action = None
+        self.history = HistoricoPartida()
+        self.auto_play = False
+        self.speed = "normal"  # slow, normal, fast
+        self.created_at = datetime.now()
+
+    def initialize_game(self):
+        """Inicializa uma nova partida com 6 bots (padrão)."""
+
+        import random
+
+        # Função auxiliar interna — gera gene de 9 bits (E1 + E2 + P)
+        def gerar_gene_hibrido():
+            e1 = format(random.randint(0, 7), "03b")
+            e2 = format(random.randint(0, 7), "03b")
+            p = format(random.randint(0, 7), "03b")
+            return e1 + e2 + p
+
+        # Cria os 6 bots com genes híbridos
+        self.bots = [WarBot(i, gerar_gene_hibrido()) for i in range(6)]
+
+        # Mantém o fluxo normal de inicialização
+        self._init_state_common()
+
+
+    def initialize_with_human(self):
+        """Inicializa uma nova partida com o jogador humano no id=0 + 5 bots híbridos."""
+        import random
+
+        # Função auxiliar: gera gene de 9 bits (E1 + E2 + P)
+        def gerar_gene_hibrido():
+            e1 = format(random.randint(0, 7), "03b")
+            e2 = format(random.randint(0, 7), "03b")
+            p = format(random.randint(0, 7), "03b")
+            return e1 + e2 + p
+
+        # Jogador humano (id 0)
+        humano = HumanPlayer(0)
+
+        # Cria 5 bots com genes híbridos
+        bots = [WarBot(i, gerar_gene_hibrido()) for i in range(1, 6)]
+
+        self.bots = [humano] + bots
+        self._init_state_common()
+
+
+    def _init_state_common(self):
+        """Inicialização comum do tabuleiro/estado."""
+        self.game_state = GameState()
+        self.game_state.inicializar_tabuleiro(self.bots)
+        self.status = "playing"
+        self.current_player_index = 0
+        self.round_number = 1
+        self._save_state_to_history()
+
+    def is_human_turn(self) -> bool:
+        """True se o jogador atual é humano."""
+        if not self.bots:
+            return False
+        current = self.bots[self.current_player_index]
+        return getattr(current, "is_human", False) is True
+
+    def execute_turn(self):
+        """Executa o turno do jogador atual (apenas bots)."""
+        if self.status != "playing":
+            return False
+
+        # Se for humano, não deixa o backend executar automaticamente
+        if self.is_human_turn():
+            return False
+
+        current_bot = self.bots[self.current_player_index]
+
+        # Verificar se o bot foi eliminado
+        if GameLogic.jogador_eliminado(self.game_state, current_bot.id):
+            self._next_player()
+            self._save_state_to_history()
+            return True
+
+        # Reset do histórico de perdas no início de cada rodada
+        if self.current_player_index == 0:
+            for bot in self.bots:
+                self.game_state.historico_perdas[bot.id] = False
+
+        # Fase 1: Receber tropas
+        tropas_recebidas = GameLogic.calcular_unidades_recebidas(self.game_state, current_bot.id)
+        GameLogic.distribuir_tropas(self.game_state, current_bot.id, tropas_recebidas)
+
+        # Fase 2: Atacar
+        max_ataques = 5
+        ataques_realizados = 0
+        last_attack = None
+
+        while ataques_realizados < max_ataques:
+            jogadas = GameLogic.jogadas_possiveis(self.game_state, current_bot.id)
+            ataque = current_bot.escolher_ataque(self.game_state, jogadas)
+
+            if ataque is None:
+                break
+
+            origem, destino = ataque
+            sucesso = GameLogic.executar_ataque(self.game_state, origem, destino)
+
+            last_attack = {
+                "type": "attack",
+                "player": current_bot.id,
+                "from": origem,
+                "to": destino,
+                "success": sucesso,
+                "troops_moved": self.game_state.get_tropas(destino) if sucesso else 0
+            }
+
+            ataques_realizados += 1
+            if not sucesso:
+                break
+
+        # Fase 3: Redistribuir tropas
+        GameLogic.redistribuir_tropas(self.game_state, current_bot.id)
+
+        # Atualizar última ação
+        if last_attack:
+            self.last_action = last_attack
+        else:
+            self.last_action = {
+                "type": "no_attack",
+                "player": current_bot.id,
+                "reason": "no_valid_attacks"
+            }
+
+        # Verificar vencedor
+        vencedor = GameLogic.verificar_vencedor(self.game_state)
+        if vencedor is not None:
+            self.status = "finished"
+            self.last_action["winner"] = vencedor
+
+        # Próximo jogador
+        self._next_player()
+        self._save_state_to_history()
+        return True
+
+    def execute_turns(self, max_turns):
+        """
+        Executa até ``max_turns`` turnos de bots seguidos, parando na vez do humano
+        ou no fim da partida.
+
+        Returns:
+            lista com o delta de cada turno: {'turn', 'round', 'current_player',
+            'last_action', 'changes'} (mesmo formato do replay do histórico).
+        """
+        gs = self.game_state
+        donos = list(gs.donos)
+        tropas = list(gs.tropas)
+        turns = []
+        while len(turns) < max_turns and self.status == "playing" and not self.is_human_turn():
+            if not self.execute_turn():
+                break
+            mudou = [i for i in range(NUM_TERRITORIOS) if gs.donos[i] != donos[i] or gs.tropas[i] != tropas[i]]
+            turns.append({
+                "turn": len(self.history) - 1,
+                "round": self.round_number,
+                "current_player": self.current_player_index,
+                "last_action": self.last_action,
+                "changes": territorios_como_dict(gs.donos, gs.tropas, mudou),
+            })
+            for i in mudou:
+                donos[i] = gs.donos[i]
+                tropas[i] = gs.tropas[i]
+        return turns
+
+    def _next_player(self):
+        """Avança para o próximo jogador."""
+        self.current_player_index = (self.current_player_index + 1) % len(self.bots)
+        if self.current_player_index == 0:
+            self.round_number += 1
+            # se for o humano, calcular tropas recebidas
+            if self.is_human_turn():
+                tropas = GameLogic.calcular_unidades_recebidas(self.game_state, 0)
+                self.game_state.tropas_disponiveis[0] += tropas + 3 # bônus inicial para facilitar o jogo do usuario
+
+
+    def _save_state_to_history(self):
+        """Salva o estado atual no histórico (delta em relação ao turno anterior)."""
+        self.history.registrar(self.game_state, self.round_number, self.current_player_index, self.last_action)
+
+    def __setstate__(self, state):
+        # Sessões antigas (pickle) guardavam o histórico como lista de tabuleiros completos.
+        if isinstance(state.get("history"), list):
+            state["history"] = HistoricoPartida.de_lista(state["history"])
+        self.__dict__.update(state)
+
+    def get_state_dict(self):
+        """Retorna o estado atual como dicionário."""
+        if not self.game_state:
+            return {
+                "game_id": self.game_id,
+                "status": self.status,
+                "message": "Game not initialized"
+            }
+
+        # Territórios e tropas por jogador (mantidos incrementalmente pelo GameState)
+        gs = self.game_state
+        players_info = []
+        for bot in self.bots:
+            territories_count = gs.num_territorios(bot.id)
+            is_human = getattr(bot, "is_human", False) is True
+            # manter chaves já esperadas pelo front
+            players_info.append({
+                "id": bot.id,
+                "strategy": getattr(bot, "estrategia", None) or getattr(bot, "strategy", ""),
+                "gene": getattr(bot, "gene", ""),
+                "territories_count": territories_count,
+                "total_troops": gs.total_tropas(bot.id),
+                "color": PLAYER_COLORS[bot.id],
+                "eliminated": territories_count == 0,
+                "is_human": is_human,
+            })
+
+        return {
+            "game_id": self.game_id,
+            "status": self.status,
+            "current_round": self.round_number,
+            "current_player": self.current_player_index,
+            "human_turn": self.is_human_turn(),
+            "auto_play": self.auto_play,
+            "speed": self.speed,
+            "territories": self.game_state.territorios_dict(),
+            "players": players_info,
+            "last_action": self.last_action,
+            "total_turns": len(self.history),
+            "tropas_disponiveis": getattr(self.game_state, "tropas_disponiveis", {}),
+
+        }
+
+    def _state_key(self):
+        """Tudo de que get_state_dict depende; muda sempre que a resposta mudaria.
+
+        A ação entra pelo conteúdo (e não pelo ``id`` do dict, que o Python
+        reaproveita e não vê alterações no lugar, como o ``winner``).
+        """
+        gs = self.game_state
+        return (
+            gs.versao if gs else None, self.status, self.round_number, self.current_player_index,
+            self.auto_play, self.speed, len(self.history), json.dumps(self.last_action, sort_keys=True),
+            tuple(getattr(gs, "tropas_disponiveis", {}).items()) if gs else (),
+        )
+
+    def state_json(self):
+        """
+        get_state_dict serializado em JSON e o ETag (hash do conteúdo), guardados
+        até o estado mudar. Com o cache de sessões, polls repetidos de /state
+        não reserializam nada.
+        """
+        key = self._state_key()
+        cached = getattr(self, "_state_cache", None)
+        if cached is None or cached[0] != key:
+            body = json.dumps(self.get_state_dict(), sort_keys=True, separators=(",", ":")).encode("utf-8")
+            cached = self._state_cache = (key, body, hashlib.blake2b(body, digest_size=12).hexdigest())
+        return cached[1], cached[2]
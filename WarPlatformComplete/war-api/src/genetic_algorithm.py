@@ -3,25 +3,55 @@
 Módulo do algoritmo genético para evolução das estratégias dos bots.
 """
 
+import math
 import random
 import time
-from src.bot import WarBot
+from concurrent.futures import ProcessPoolExecutor
+from src import config
+from src.bot import WarBot, gene_para_inteiro
+from src.rng import derivar_semente, semente_aleatoria
 from src.game import GameState, GameLogic
+from src.fitness_cache import FitnessCache
 from src.config import (
     ESTRATEGIAS, NUM_INDIVIDUOS, NUM_GERACOES, TAXA_MUTACAO_INICIAL, 
     TAXA_CROSSOVER_INICIAL, ELITE, NUM_PARTIDAS_SIM, NUM_JOGADORES, MAX_RODADAS
 )
 
 
+def _simular_partida_semeada(genes, ids, semente):
+    """Recria os bots a partir de genes/ids e simula uma partida com a semente dada.
+
+    Função de módulo para poder ser enviada aos processos do ProcessPoolExecutor;
+    o caminho serial usa a mesma função, garantindo resultados idênticos.
+    """
+    bots = [WarBot(bot_id, gene) for bot_id, gene in zip(ids, genes)]
+    return GeneticAlgorithm._simular_partida(bots, random.Random(semente))
+
+
 class GeneticAlgorithm:
-    """Implementa o algoritmo genético para evolução das estratégias dos bots."""
+    """Implementa o algoritmo genético para evolução das estratégias dos bots.
+
+    Toda a aleatoriedade deriva de ``self.semente``: os operadores genéticos usam
+    ``self.rng`` e cada partida recebe a semente ``derivar_semente(semente,
+    geração, partida)``, então uma execução (ou uma partida isolada) pode ser
+    reproduzida exatamente.
+    """
     
-    def __init__(self):
+    def __init__(self, num_processos=None, semente=None, motor=None, cache=None):
         self.populacao = []
         self.geracao_atual = 0
         self.melhor_fitness_por_geracao = []
         self.fitness_medio_por_geracao = []
         self.historico_estrategias = []
+        self.num_processos = num_processos if num_processos is not None else config.NUM_PROCESSOS
+        self.motor = motor or config.MOTOR_SIMULACAO
+        semente = semente if semente is not None else config.SEMENTE_MESTRE
+        self.semente = semente if semente is not None else semente_aleatoria()
+        self.rng = random.Random(derivar_semente(self.semente, "operadores"))
+        self._executor = None
+        if cache is None and config.USAR_CACHE_FITNESS:
+            cache = FitnessCache.carregar(config.CACHE_ARQUIVO)
+        self.cache = cache  # FitnessCache opcional: genes confiáveis recebem só partidas incrementais
     
     def gerar_populacao_inicial(self):
         """Gera a população inicial de bots com genes aleatórios."""
@@ -29,9 +59,9 @@ class GeneticAlgorithm:
 
         # Função auxiliar para gerar um gene de 9 bits (E1 + E2 + P)
         def gerar_gene_hibrido():
-            e1 = format(random.randint(0, 7), "03b")  # primeira estratégia
-            e2 = format(random.randint(0, 7), "03b")  # segunda estratégia
-            p = format(random.randint(0, 7), "03b")   # probabilidade relativa
+            e1 = format(self.rng.randint(0, 7), "03b")  # primeira estratégia
+            e2 = format(self.rng.randint(0, 7), "03b")  # segunda estratégia
+            p = format(self.rng.randint(0, 7), "03b")   # probabilidade relativa
             return e1 + e2 + p
 
         # Criação da população
@@ -53,20 +83,29 @@ class GeneticAlgorithm:
             bot.reset_stats()
         
         # Simular partidas para avaliar cada bot
-        for partida in range(NUM_PARTIDAS_SIM):
-            if partida % 5 == 0:
-                print(f"  Simulando partida {partida + 1}/{NUM_PARTIDAS_SIM}")
-            
-            # Selecionar 6 bots aleatórios para a partida
-            bots_partida = random.sample(self.populacao, NUM_JOGADORES)
-            resultado = self._simular_partida(bots_partida)
-            
+        plano = self._planejar_partidas()
+        resultados = self._executar_partidas(plano)
+        
+        for (bots_partida, _), resultado in zip(plano, resultados):
             # Atualizar estatísticas dos bots
             for bot in bots_partida:
                 bot.partidas_jogadas += 1
                 if resultado['vencedor'] == bot.id:
                     bot.vitorias += 1
                 bot.territorios_conquistados += resultado['territorios_finais'][bot.id]
+                if self.cache is not None:
+                    self.cache.registrar(bot.gene, resultado['vencedor'] == bot.id,
+                                         resultado['territorios_finais'][bot.id])
+        
+        # Com cache, o fitness vem das estatísticas acumuladas do gene
+        if self.cache is not None:
+            for bot in self.populacao:
+                entrada = self.cache.estatisticas(bot.gene)
+                if entrada is not None:
+                    bot.partidas_jogadas = entrada['partidas']
+                    bot.vitorias = entrada['vitorias']
+                    bot.territorios_conquistados = entrada['territorios']
+            self.cache.envelhecer()
         
         # Calcular fitness de cada bot
         for bot in self.populacao:
@@ -86,10 +125,90 @@ class GeneticAlgorithm:
         print(f"  Fitness médio: {fitness_medio:.2f}")
         print(f"  Melhor estratégia: {self.populacao[0].estrategia}")
     
-    def _simular_partida(self, bots):
-        """Simula uma partida completa entre os bots fornecidos."""
+    def _planejar_partidas(self):
+        """Sorteia os 6 participantes e a semente de cada partida da geração."""
+        sorteio = random.Random(derivar_semente(self.semente, self.geracao_atual, "participantes"))
+        
+        num_partidas = NUM_PARTIDAS_SIM
+        pendentes = []
+        if self.cache is not None:
+            # Genes com fitness confiável só recebem partidas incrementais;
+            # as vagas vão preferencialmente para os genes ainda pouco avaliados
+            pendentes = [bot for bot in self.populacao if not self.cache.confiavel(bot.gene)]
+            fracao = len(pendentes) / len(self.populacao)
+            num_partidas = max(config.CACHE_PARTIDAS_INCREMENTAIS, math.ceil(NUM_PARTIDAS_SIM * fracao))
+            print(f"  Cache de fitness: {1 - fracao:.0%} de acertos, {len(pendentes)} genes pendentes, "
+                  f"{num_partidas} partidas")
+        
+        plano = []
+        for partida in range(num_partidas):
+            if pendentes:
+                escolhidos = sorteio.sample(pendentes, min(NUM_JOGADORES, len(pendentes)))
+                outros = [bot for bot in self.populacao if bot not in escolhidos]
+                bots_partida = escolhidos + sorteio.sample(outros, NUM_JOGADORES - len(escolhidos))
+            else:
+                bots_partida = sorteio.sample(self.populacao, NUM_JOGADORES)
+            semente = derivar_semente(self.semente, self.geracao_atual, partida)
+            plano.append((bots_partida, semente))
+        return plano
+    
+    def _executar_partidas(self, plano):
+        """Simula as partidas do plano (em série ou no pool de processos), na ordem do plano."""
+        genes = [[bot.gene for bot in bots] for bots, _ in plano]
+        ids = [[bot.id for bot in bots] for bots, _ in plano]
+        sementes = [semente for _, semente in plano]
+        
+        if self.motor == "lote":
+            return self._executar_partidas_em_lote(genes, ids, sementes)
+        
+        if self.num_processos <= 1:
+            resultados = []
+            for partida, args in enumerate(zip(genes, ids, sementes)):
+                if partida % 5 == 0:
+                    print(f"  Simulando partida {partida + 1}/{len(plano)}")
+                resultados.append(_simular_partida_semeada(*args))
+            return resultados
+        
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_processos)
+        print(f"  Simulando {len(plano)} partidas em {self.num_processos} processos")
+        chunksize = max(1, len(plano) // (self.num_processos * 4))
+        return list(self._executor.map(_simular_partida_semeada, genes, ids, sementes, chunksize=chunksize))
+    
+    @staticmethod
+    def _executar_partidas_em_lote(genes, ids, sementes):
+        """Simula todas as partidas da geração numa única chamada do BatchSimulator."""
+        from src.batch_simulator import BatchSimulator
+        
+        print(f"  Simulando {len(genes)} partidas em lote")
+        matriz_genes = [[gene_para_inteiro(g) for g in genes_partida] for genes_partida in genes]
+        saida = BatchSimulator(semente=sementes).simular(matriz_genes)
+        
+        resultados = []
+        for partida, ids_partida in enumerate(ids):
+            territorios = saida['territorios_finais'][partida]
+            resultados.append({
+                'vencedor': ids_partida[int(saida['vencedor'][partida])],
+                'territorios_finais': {bot_id: int(territorios[pos]) for pos, bot_id in enumerate(ids_partida)},
+                'rodadas': int(saida['rodadas'][partida])
+            })
+        return resultados
+    
+    def encerrar(self):
+        """Encerra o pool de processos, se houver."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    @staticmethod
+    def _simular_partida(bots, rng=None):
+        """Simula uma partida completa entre os bots fornecidos.
+
+        ``rng`` é o gerador da partida; se omitido, a partida usa um gerador novo.
+        """
         # Inicializar estado do jogo
-        game_state = GameState()
+        game_state = GameState(rng)
+        rng = game_state.rng
         game_state.inicializar_tabuleiro(bots)
         
         rodada = 0
@@ -115,13 +234,13 @@ class GeneticAlgorithm:
                 
                 while ataques_realizados < max_ataques:
                     jogadas = GameLogic.jogadas_possiveis(game_state, bot.id)
-                    ataque = bot.escolher_ataque(game_state, jogadas)
+                    ataque = bot.escolher_ataque(game_state, jogadas, rng)
                     
                     if ataque is None:
                         break
                     
                     origem, destino = ataque
-                    sucesso = GameLogic.executar_ataque(game_state, origem, destino)
+                    sucesso = GameLogic.executar_ataque(game_state, origem, destino, rng)
                     ataques_realizados += 1
                     
                     if not sucesso:
@@ -153,7 +272,7 @@ class GeneticAlgorithm:
             vencedor_id = max(territorios_por_bot, key=territorios_por_bot.get)
         else:
             # Caso extremo - escolhe um bot aleatório
-            vencedor_id = random.choice(bots).id
+            vencedor_id = rng.choice(bots).id
         
         # Contar territórios finais de cada bot
         territorios_finais = {}
@@ -177,8 +296,17 @@ class GeneticAlgorithm:
         pais_selecionados = elite_bots.copy()
         
         while len(pais_selecionados) < NUM_INDIVIDUOS // 2:
+            # Sem fitness restante fora dos já escolhidos a roleta nunca terminaria:
+            # completa com os próximos melhores
+            restantes = [bot for bot in self.populacao if bot not in pais_selecionados]
+            if not restantes:
+                break
+            if sum(bot.fitness for bot in restantes) <= 0:
+                pais_selecionados.append(restantes[0])
+                continue
+            
             # Seleção por roleta
-            valor_roleta = random.uniform(0, fitness_total)
+            valor_roleta = self.rng.uniform(0, fitness_total)
             soma_fitness = 0
             
             for bot in self.populacao:
@@ -192,12 +320,12 @@ class GeneticAlgorithm:
     
     def crossover(self, pai1, pai2):
         """Realiza crossover entre dois pais para gerar dois filhos."""
-        if random.random() > self._taxa_crossover_atual():
+        if self.rng.random() > self._taxa_crossover_atual():
             # Sem crossover, retorna cópias dos pais
             return pai1.gene, pai2.gene
         
         # Crossover de ponto único
-        ponto_corte = random.randint(1, len(pai1.gene) - 1)
+        ponto_corte = self.rng.randint(1, len(pai1.gene) - 1)
         
         filho1 = pai1.gene[:ponto_corte] + pai2.gene[ponto_corte:]
         filho2 = pai2.gene[:ponto_corte] + pai1.gene[ponto_corte:]
@@ -206,11 +334,11 @@ class GeneticAlgorithm:
     
     def mutacao(self, gene):
         """Aplica mutação em um gene."""
-        if random.random() > self._taxa_mutacao_atual():
+        if self.rng.random() > self._taxa_mutacao_atual():
             return gene
         
         # Mutação de bit flip
-        posicao = random.randint(0, len(gene) - 1)
+        posicao = self.rng.randint(0, len(gene) - 1)
         gene_lista = list(gene)
         gene_lista[posicao] = '1' if gene_lista[posicao] == '0' else '0'
         
@@ -240,7 +368,7 @@ class GeneticAlgorithm:
         
         # Gerar novos indivíduos
         while len(nova_populacao) < NUM_INDIVIDUOS:
-            pai1, pai2 = random.sample(pais, 2)
+            pai1, pai2 = self.rng.sample(pais, 2)
             filho1_gene, filho2_gene = self.crossover(pai1, pai2)
             
             # Aplicar mutação
@@ -265,14 +393,31 @@ class GeneticAlgorithm:
         
         print(f"Iniciando evolução por {NUM_GERACOES} gerações...")
         print(f"População: {NUM_INDIVIDUOS}, Partidas por avaliação: {NUM_PARTIDAS_SIM}")
+        print(f"Semente mestre: {self.semente}")
         print("-" * 60)
         
         # Gerar população inicial
         self.gerar_populacao_inicial()
         
-        for geracao in range(NUM_GERACOES):
+        try:
+            self._evoluir_geracoes(NUM_GERACOES)
+        finally:
+            self.encerrar()
+            if self.cache is not None and config.CACHE_ARQUIVO:
+                self.cache.salvar(config.CACHE_ARQUIVO)
+        
+        print("\n" + "=" * 60)
+        print("EVOLUÇÃO CONCLUÍDA!")
+        print(f"Melhor bot: {self.populacao[0]}")
+        print(f"Fitness final: {self.populacao[0].fitness:.2f}")
+        
+        return self.populacao[0]
+    
+    def _evoluir_geracoes(self, num_geracoes):
+        """Laço principal: avalia, registra e reproduz a população a cada geração."""
+        for geracao in range(num_geracoes):
             self.geracao_atual = geracao
-            print(f"\n=== GERAÇÃO {geracao + 1}/{NUM_GERACOES} ===")
+            print(f"\n=== GERAÇÃO {geracao + 1}/{num_geracoes} ===")
             
             # Avaliar população atual
             self.avaliar_populacao()
@@ -287,15 +432,22 @@ class GeneticAlgorithm:
             self.historico_estrategias.append(estrategias_geracao)
             
             # Gerar próxima geração (exceto na última)
-            if geracao < NUM_GERACOES - 1:
+            if geracao < num_geracoes - 1:
                 self.gerar_nova_geracao()
-        
-        print("\n" + "=" * 60)
-        print("EVOLUÇÃO CONCLUÍDA!")
-        print(f"Melhor bot: {self.populacao[0]}")
-        print(f"Fitness final: {self.populacao[0].fitness:.2f}")
-        
-        return self.populacao[0]
+    
+    @staticmethod
+    def melhores_genes_tabelados(top=1, caminho=None):
+        """Consulta os melhores genes na tabela do torneio exaustivo (src/tournament.py).
+
+        Retorna a lista de ``{'gene', 'fitness', 'taxa_vitoria', 'partidas'}`` ou
+        None se a tabela ainda não foi gerada.
+        """
+        import os
+        caminho = caminho or config.TABELA_GENES
+        if not caminho or not os.path.exists(caminho):
+            return None
+        from src.tournament import TorneioGenotipos
+        return TorneioGenotipos.carregar(caminho).ranking(top=top)
     
     def get_estatisticas(self):
         """Retorna estatísticas da evolução."""
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico de turnos de uma partida, codificado em deltas com keyframes.
+
+Cada entrada guarda a rodada, o jogador da vez, o horário, a última ação e só
+os territórios que mudaram desde a entrada anterior; a cada
+``intervalo_keyframe`` entradas o tabuleiro completo é gravado, de modo que o
+tabuleiro de qualquer turno é reconstruído a partir do keyframe anterior.
+
+As entradas ficam codificadas em bytes e podem ser guardadas fora da sessão
+(uma lista no Redis): a sessão só precisa do total de entradas, do último
+tabuleiro registrado e das entradas ainda não persistidas (``novas``); as
+antigas são lidas sob demanda pelo ``carregador``. Cada turno registrado também
+gera um delta legível (``eventos``), publicado para os clientes em tempo real.
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta
+
+from src.config import TERRITORIOS, HISTORICO_INTERVALO_KEYFRAME
+from src.game import NUM_TERRITORIOS, INDICE_TERRITORIO, SEM_DONO
+
+_EPOCA = datetime(1970, 1, 1)
+_MICRO = timedelta(microseconds=1)
+_CABECALHO = struct.Struct("<IBBqI")  # rodada, jogador, keyframe, timestamp (µs), tamanho da ação
+_MUDANCA = struct.Struct("<BBI")  # índice, dono + 1, tropas
+
+
+def codificar_entrada(rodada, jogador_atual, timestamp, acao, mudancas, keyframe):
+    """Codifica uma entrada; ``mudancas`` é uma lista de (índice, dono, tropas)."""
+    acao_bruta = json.dumps(acao, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    partes = [
+        _CABECALHO.pack(rodada, jogador_atual, keyframe, (timestamp - _EPOCA) // _MICRO, len(acao_bruta)),
+        acao_bruta,
+        bytes([len(mudancas)]),
+    ]
+    partes.extend(_MUDANCA.pack(idx, dono + 1, tropas) for idx, dono, tropas in mudancas)
+    return b"".join(partes)
+
+
+def decodificar_entrada(dados):
+    """Inverso de ``codificar_entrada``: retorna um dict com os campos e as mudanças."""
+    rodada, jogador_atual, keyframe, micro, tamanho = _CABECALHO.unpack_from(dados)
+    pos = _CABECALHO.size
+    acao = json.loads(dados[pos:pos + tamanho])
+    pos += tamanho
+    n = dados[pos]
+    pos += 1
+    mudancas = [(idx, dono - 1, tropas)
+                for idx, dono, tropas in _MUDANCA.iter_unpack(dados[pos:pos + n * _MUDANCA.size])]
+    return {
+        "round": rodada,
+        "current_player": jogador_atual,
+        "keyframe": bool(keyframe),
+        "timestamp": (_EPOCA + micro * _MICRO).isoformat(),
+        "last_action": acao,
+        "mudancas": mudancas,
+    }
+
+
+def territorios_como_dict(donos, tropas, indices=None):
+    """Tabuleiro no formato da API ({nome: {'dono', 'tropas'}}), opcionalmente só de ``indices``."""
+    indices = range(NUM_TERRITORIOS) if indices is None else indices
+    return {
+        TERRITORIOS[i]: {"dono": None if donos[i] == SEM_DONO else donos[i], "tropas": tropas[i]}
+        for i in indices
+    }
+
+
+class HistoricoPartida:
+    """Sequência de turnos de uma partida, com acesso aleatório e replay.
+
+    Compatível com o uso antigo de lista: ``len(h)``, ``h[i]`` e ``for e in h``
+    devolvem entradas completas {'round', 'current_player', 'territories',
+    'last_action', 'timestamp'}.
+    """
+
+    def __init__(self, intervalo_keyframe=HISTORICO_INTERVALO_KEYFRAME):
+        self.intervalo_keyframe = intervalo_keyframe
+        self.total = 0
+        self.novas = []  # entradas codificadas ainda não persistidas
+        self.eventos = []  # deltas dos turnos novos ainda não publicados (ver ``src.game_events``)
+        self.carregador = None  # (inicio, fim) -> entradas persistidas codificadas, fim inclusivo
+        self.ultimos_donos = [SEM_DONO] * NUM_TERRITORIOS
+        self.ultimas_tropas = [0] * NUM_TERRITORIOS
+
+    @classmethod
+    def de_lista(cls, entradas, **kwargs):
+        """Converte o histórico antigo (lista de dicts com o tabuleiro completo)."""
+        historico = cls(**kwargs)
+        for entrada in entradas:
+            donos = [SEM_DONO] * NUM_TERRITORIOS
+            tropas = [0] * NUM_TERRITORIOS
+            for nome, info in entrada["territories"].items():
+                idx = INDICE_TERRITORIO[nome]
+                donos[idx] = SEM_DONO if info["dono"] is None else info["dono"]
+                tropas[idx] = info["tropas"]
+            historico._registrar_vetores(donos, tropas, entrada["round"], entrada["current_player"],
+                                         entrada["last_action"], datetime.fromisoformat(entrada["timestamp"]))
+        historico.eventos = []
+        return historico
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+    def registrar(self, game_state, rodada, jogador_atual, acao, timestamp=None):
+        """Acrescenta o turno atual (só os territórios alterados, ou keyframe)."""
+        self._registrar_vetores(game_state.donos, game_state.tropas, rodada, jogador_atual, acao,
+                                timestamp or datetime.now())
+
+    def _registrar_vetores(self, donos, tropas, rodada, jogador_atual, acao, timestamp):
+        keyframe = self.total % self.intervalo_keyframe == 0
+        ultimos_donos = self.ultimos_donos
+        ultimas_tropas = self.ultimas_tropas
+        mudou = [i for i in range(NUM_TERRITORIOS)
+                 if donos[i] != ultimos_donos[i] or tropas[i] != ultimas_tropas[i]]
+        indices = range(NUM_TERRITORIOS) if keyframe else mudou
+        mudancas = [(i, donos[i], tropas[i]) for i in indices]
+        self.novas.append(codificar_entrada(rodada, jogador_atual, timestamp, acao, mudancas, keyframe))
+        self.eventos.append({
+            "turn": self.total,
+            "round": rodada,
+            "current_player": jogador_atual,
+            "last_action": acao,
+            "timestamp": timestamp.isoformat(),
+            "changes": territorios_como_dict(donos, tropas, mudou),
+        })
+        self.ultimos_donos = list(donos)
+        self.ultimas_tropas = list(tropas)
+        self.total += 1
+
+    def marcar_persistidas(self):
+        """Retorna e esquece as entradas novas (depois de gravadas no armazenamento externo)."""
+        novas, self.novas = self.novas, []
+        return novas
+
+    def marcar_publicados(self):
+        """Retorna e esquece os deltas dos turnos novos (no formato de ``replay``)."""
+        eventos, self.eventos = self.eventos, []
+        return eventos
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self.total
+
+    def _brutas(self, inicio, fim):
+        """Entradas codificadas de ``inicio`` a ``fim`` (inclusive)."""
+        persistidas = self.total - len(self.novas)
+        resultado = []
+        if inicio < persistidas:
+            if self.carregador is None:
+                raise LookupError("Histórico persistido indisponível (carregador não configurado)")
+            resultado.extend(self.carregador(inicio, min(fim, persistidas - 1)))
+        if fim >= persistidas:
+            resultado.extend(self.novas[max(inicio - persistidas, 0):fim - persistidas + 1])
+        return resultado
+
+    def _normalizar(self, turno):
+        if turno < 0:
+            turno += self.total
+        if not 0 <= turno < self.total:
+            raise IndexError("Turno fora do histórico")
+        return turno
+
+    def tabuleiro_em(self, turno):
+        """(donos, tropas) do tabuleiro registrado no ``turno``."""
+        turno = self._normalizar(turno)
+        keyframe = turno - turno % self.intervalo_keyframe
+        donos = [SEM_DONO] * NUM_TERRITORIOS
+        tropas = [0] * NUM_TERRITORIOS
+        for bruta in self._brutas(keyframe, turno):
+            for idx, dono, qtd in decodificar_entrada(bruta)["mudancas"]:
+                donos[idx] = dono
+                tropas[idx] = qtd
+        return donos, tropas
+
+    def acao_em(self, turno):
+        """``last_action`` registrada no ``turno`` (sem montar o tabuleiro)."""
+        turno = self._normalizar(turno)
+        return decodificar_entrada(self._brutas(turno, turno)[0])["last_action"]
+
+    def __getitem__(self, turno):
+        turno = self._normalizar(turno)
+        entrada = decodificar_entrada(self._brutas(turno, turno)[0])
+        donos, tropas = self.tabuleiro_em(turno)
+        return {
+            "round": entrada["round"],
+            "current_player": entrada["current_player"],
+            "territories": territorios_como_dict(donos, tropas),
+            "last_action": entrada["last_action"],
+            "timestamp": entrada["timestamp"],
+        }
+
+    def __iter__(self):
+        donos = [SEM_DONO] * NUM_TERRITORIOS
+        tropas = [0] * NUM_TERRITORIOS
+        for bruta in self._brutas(0, self.total - 1):
+            entrada = decodificar_entrada(bruta)
+            for idx, dono, qtd in entrada.pop("mudancas"):
+                donos[idx] = dono
+                tropas[idx] = qtd
+            entrada.pop("keyframe")
+            entrada["territories"] = territorios_como_dict(donos, tropas)
+            yield entrada
+
+    def replay(self, inicio, fim):
+        """Tabuleiro no turno ``inicio`` e os deltas de cada turno até ``fim`` (inclusive).
+
+        Returns:
+            dict com ``territories`` (tabuleiro em ``inicio``) e ``turns``: lista de
+            {'turn', 'round', 'current_player', 'last_action', 'timestamp', 'changes'}.
+        """
+        inicio = self._normalizar(inicio)
+        fim = self._normalizar(fim)
+        donos, tropas = self.tabuleiro_em(inicio)
+        tabuleiro_inicial = territorios_como_dict(donos, tropas)
+        turnos = []
+        for deslocamento, bruta in enumerate(self._brutas(inicio + 1, fim)):
+            entrada = decodificar_entrada(bruta)
+            # keyframes repetem o tabuleiro inteiro; no replay só interessa o que mudou
+            mudou = [idx for idx, dono, qtd in entrada["mudancas"] if (dono, qtd) != (donos[idx], tropas[idx])]
+            for idx, dono, qtd in entrada["mudancas"]:
+                donos[idx] = dono
+                tropas[idx] = qtd
+            turnos.append({
+                "turn": inicio + 1 + deslocamento,
+                "round": entrada["round"],
+                "current_player": entrada["current_player"],
+                "last_action": entrada["last_action"],
+                "timestamp": entrada["timestamp"],
+                "changes": territorios_como_dict(donos, tropas, mudou),
+            })
+        return {"territories": tabuleiro_inicial, "turns": turnos}
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente compartilhado do LLM, com respostas completas ou em stream de tokens.
+
+Antes cada requisição criava o próprio ``OpenAI`` (nova conexão TLS a cada
+mensagem do chat). Agora cada worker tem um transporte só, com pool de
+conexões keep-alive (``LLM_MAX_CONEXOES``), e os endpoints podem repassar os
+tokens ao cliente conforme chegam (``transmitir``).
+
+O transporte é trocável (``LLM_TRANSPORT``):
+
+- ``openai``: API da OpenAI; ``OPENAI_BASE_URL`` aponta para qualquer servidor
+  compatível (por exemplo um servidor falso local nos testes);
+- ``eco``: responde localmente, em pedaços, sem rede nem chave.
+"""
+
+import os
+import threading
+import time
+
+from src.config import (
+    LLM_MODELO, LLM_TIMEOUT, LLM_TIMEOUT_CONEXAO, LLM_MAX_CONEXOES, LLM_MAX_CONEXOES_OCIOSAS, LLM_TENTATIVAS
+)
+
+
+class TransporteOpenAI:
+    """Chat completions da OpenAI sobre um ``httpx.Client`` com pool, criado na primeira chamada."""
+
+    nome = "openai"
+
+    def __init__(self, api_key=None, base_url=None):
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.base_url = base_url or os.environ.get("OPENAI_BASE_URL")
+        self._cliente = None
+        self._trava = threading.Lock()
+
+    @property
+    def configurado(self):
+        return bool(self.api_key)
+
+    def cliente(self):
+        if self._cliente is None:
+            with self._trava:
+                if self._cliente is None:
+                    if not self.api_key:
+                        raise RuntimeError("Chave da API OpenAI não configurada (OPENAI_API_KEY)")
+                    import httpx
+                    from openai import OpenAI
+                    http = httpx.Client(
+                        limits=httpx.Limits(max_connections=LLM_MAX_CONEXOES,
+                                            max_keepalive_connections=LLM_MAX_CONEXOES_OCIOSAS),
+                        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_TIMEOUT_CONEXAO),
+                    )
+                    self._cliente = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http,
+                                           max_retries=LLM_TENTATIVAS)
+        return self._cliente
+
+    def completar(self, mensagens, modelo=LLM_MODELO, **parametros):
+        resposta = self.cliente().chat.completions.create(model=modelo, messages=mensagens, **parametros)
+        return resposta.choices[0].message.content or ""
+
+    def transmitir(self, mensagens, modelo=LLM_MODELO, **parametros):
+        stream = self.cliente().chat.completions.create(model=modelo, messages=mensagens, stream=True,
+                                                        **parametros)
+        try:
+            for pedaco in stream:
+                if pedaco.choices and pedaco.choices[0].delta.content:
+                    yield pedaco.choices[0].delta.content
+        finally:
+            stream.close()  # cliente desconectou: libera a conexão de volta ao pool
+
+
+class TransporteEco:
+    """Transporte local: devolve a última mensagem do usuário, palavra a palavra."""
+
+    nome = "eco"
+    configurado = True
+
+    def __init__(self, atraso=0.0):
+        self.atraso = atraso  # segundos entre pedaços, para simular a latência do modelo
+
+    def transmitir(self, mensagens, modelo=LLM_MODELO, **parametros):
+        texto = next((m["content"] for m in reversed(mensagens) if m["role"] == "user"), "")
+        palavras = texto.split(" ")
+        for i, palavra in enumerate(palavras):
+            if self.atraso:
+                time.sleep(self.atraso)
+            yield palavra if i == len(palavras) - 1 else palavra + " "
+
+    def completar(self, mensagens, modelo=LLM_MODELO, **parametros):
+        return "".join(self.transmitir(mensagens, modelo, **parametros))
+
+
+TRANSPORTES = {"openai": TransporteOpenAI, "eco": TransporteEco}
+
+_transporte = None
+
+
+def criar_transporte(nome):
+    try:
+        return TRANSPORTES[nome]()
+    except KeyError:
+        raise ValueError(f"Transporte de LLM desconhecido: {nome} (use {', '.join(TRANSPORTES)})")
+
+
+def obter_transporte():
+    """Transporte compartilhado do worker (``LLM_TRANSPORT``, padrão ``openai``)."""
+    global _transporte
+    if _transporte is None:
+        _transporte = criar_transporte(os.environ.get("LLM_TRANSPORT", "openai"))
+    return _transporte
+
+
+def definir_transporte(transporte):
+    """Troca o transporte compartilhado (testes, servidor falso)."""
+    global _transporte
+    _transporte = transporte
@@ -3,13 +3,13 @@
 Servidor Flask para a API do jogo WAR.
 """
 import random
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import uuid
 from datetime import datetime
 import os
-import pickle
 from redis import Redis
+from redis.exceptions import RedisError
 
 REDIS_HOST = os.environ.get("REDIS_HOST")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", "6379"))
@@ -28,13 +28,19 @@ redis_client = Redis(
 # Importar módulos do jogo WAR
 from src.bot import WarBot
 from src.game import GameState, GameLogic
+from src.game_session import GameSession, HumanPlayer, PLAYER_COLORS
 from src.genetic_algorithm import GeneticAlgorithm
 from src.config import ESTRATEGIAS, TERRITORIOS
-from src.config import MAPA_WAR
-from src.chatbot_service import analyze_move_with_gpt
+from src.config import MAPA_WAR, TABELA_GENES, SESSAO_CACHE_TAMANHO, SESSAO_CACHE_TTL
+from src.analysis import PipelineAnalises, LimiteAnalises, FilaAnalisesCheia, criar_backend
+from src.move_analyzer import avaliar_jogada
+from src.move_evaluator import ExecutorAvaliacoes, AvaliacoesOcupadas
+from src.config import AVALIACAO_TEMPO_MAXIMO, AVALIACAO_TEMPO_LIMITE
+from src.game_events import transmitir, formatar_sse
+from src.chatbot_service import general_reply, stream_general_reply
+from src.autoplay import EscalonadorAutoPlay, sincronizar_agenda
 
-# CHAVE DA OPENAI (mantido como você já usava)
-MINHACHAVEAPI = os.environ.get("OPENAI_API_KEY")  # INSIRA SUA CHAVE AQUI SE NÃO USAR VARIÁVEL DE AMBIENTE
+# Chave da OpenAI: variável OPENAI_API_KEY (cliente compartilhado em src/llm_client.py)
 
 app = Flask(__name__, static_folder="static", static_url_path="/")
 CORS(app)  # Permitir requisições de qualquer origem
@@ -46,268 +52,92 @@ def serve_index():
 
 
 # Armazenar jogos ativos
-import pickle
+from src.session_cache import CacheSessoes
+from src.session_store import SessionStore, ConflitoSessao, STATUS_SESSAO
+
+# SESSION_LOCK=true serializa as requisições de cada jogo com uma trava curta no Redis
+SESSION_LOCK = os.environ.get("SESSION_LOCK", "false").lower() == "true"
+# Cache de sessões decodificadas por worker (SESSION_CACHE_SIZE=0 desliga); SESSION_WRITE_BEHIND=true
+# agrupa as gravações do auto-play (só com roteamento fixo por jogo ou um único worker)
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", SESSAO_CACHE_TAMANHO))
+SESSION_CACHE_TTL = float(os.environ.get("SESSION_CACHE_TTL", SESSAO_CACHE_TTL))
+SESSION_WRITE_BEHIND = os.environ.get("SESSION_WRITE_BEHIND", "false").lower() == "true"
+
+session_cache = CacheSessoes(SESSION_CACHE_SIZE, SESSION_CACHE_TTL, SESSION_WRITE_BEHIND) if SESSION_CACHE_SIZE > 0 else None
+store = SessionStore(redis_client, trava=SESSION_LOCK, cache=session_cache)
+store.iniciar_descarga()
+
+# Auto-play no servidor: iniciado por start_background_workers (wsgi), não no import
+AUTO_PLAY_SCHEDULER = os.environ.get("AUTO_PLAY_SCHEDULER", "true").lower() == "true"
+autoplay_scheduler = EscalonadorAutoPlay(store)
+
+# Análise de jogadas em segundo plano, com cache no Redis (ANALYSIS_BACKEND=local responde só com o
+# motor local, sem chamar o LLM)
+ANALYSIS_BACKEND = os.environ.get("ANALYSIS_BACKEND", "openai")
+analysis_pipeline = PipelineAnalises(redis_client, criar_backend(ANALYSIS_BACKEND))
+MAX_ANALYSIS_WAIT = 30
+
+# Avaliação Monte Carlo é só CPU: roda em threads nativas (fora do loop do gevent), poucas de cada vez
+evaluation_executor = ExecutorAvaliacoes()
+
+def start_background_workers():
+    if AUTO_PLAY_SCHEDULER:
+        autoplay_scheduler.iniciar()
 
 # Funções utilitárias para salvar/carregar sessões
-def save_game_session(game_id, session):
+def create_game_session(game_id, session):
     try:
-        redis_client.setex(f"game:{game_id}", 86400, pickle.dumps(session))  # expira em 24h
+        store.criar(session)
     except Exception as e:
-        print(f"[Redis] Falha ao salvar jogo {game_id}: {e}")
+        print(f"[Redis] Falha ao criar jogo {game_id}: {e}")
 
 def load_game_session(game_id):
     try:
-        data = redis_client.get(f"game:{game_id}")
-        if data:
-            return pickle.loads(data)
-        return None
+        return store.carregar(game_id)
     except Exception as e:
         print(f"[Redis] Falha ao carregar jogo {game_id}: {e}")
         return None
 
-def delete_game_session(game_id):
+def update_game_session(game_id, mutate, schedule=False):
+    """
+    Carrega o jogo, aplica ``mutate(session)`` e grava com controle de concorrência.
+    ``mutate`` devolve a resposta do endpoint e pode rodar mais de uma vez se
+    outra requisição alterar o jogo no meio (sempre sobre o estado mais recente),
+    então não deve ter efeitos fora da sessão. Com ``schedule`` a agenda do
+    auto-play é sincronizada uma vez, com o estado já gravado.
+    """
     try:
-        redis_client.delete(f"game:{game_id}")
-    except Exception as e:
-        print(f"[Redis] Falha ao deletar jogo {game_id}: {e}")
-
-
-
-# Cores para os jogadores
-PLAYER_COLORS = [
-    "#FF6B6B",  # Vermelho
-    "#4ECDC4",  # Turquesa
-    "#45B7D1",  # Azul
-    "#96CEB4",  # Verde
-    "#FFEAA7",  # Amarelo
-    "#DDA0DD"   # Roxo
-]
-
-
-class HumanPlayer:
-    """Representa o jogador humano (controlado pelo usuário)."""
-    def __init__(self, id_):
-        self.id = id_
-        self.is_human = True
-        # manter nomes compatíveis com fronte/back existente
-        self.estrategia = "Decisão manual"
-        self.strategy = "Decisão manual"
-        self.gene = "HUMANO"
-
-
-class GameSession:
-    """Classe para gerenciar uma sessão de jogo."""
-    def __init__(self, game_id):
-        self.game_id = game_id
-        self.status = "waiting"  # waiting, playing, paused, finished
-        self.game_state = None
-        self.bots = []
-        self.current_player_index = 0
-        self.round_number = 0
-        self.last_action = None
-        self.history = []
-        self.auto_play = False
-        self.speed = "normal"  # slow, normal, fast
-        self.created_at = datetime.now()
-
-    def initialize_game(self):
-        """Inicializa uma nova partida com 6 bots (padrão)."""
-
-        import random
-
-        # Função auxiliar interna — gera gene de 9 bits (E1 + E2 + P)
-        def gerar_gene_hibrido():
-            e1 = format(random.randint(0, 7), "03b")
-            e2 = format(random.randint(0, 7), "03b")
-            p = format(random.randint(0, 7), "03b")
-            return e1 + e2 + p
-
-        # Cria os 6 bots com genes híbridos
-        self.bots = [WarBot(i, gerar_gene_hibrido()) for i in range(6)]
-
-        # Mantém o fluxo normal de inicialização
-        self._init_state_common()
-
-
-    def initialize_with_human(self):
-        """Inicializa uma nova partida com o jogador humano no id=0 + 5 bots híbridos."""
-        import random
-
-        # Função auxiliar: gera gene de 9 bits (E1 + E2 + P)
-        def gerar_gene_hibrido():
-            e1 = format(random.randint(0, 7), "03b")
-            e2 = format(random.randint(0, 7), "03b")
-            p = format(random.randint(0, 7), "03b")
-            return e1 + e2 + p
-
-        # Jogador humano (id 0)
-        humano = HumanPlayer(0)
-
-        # Cria 5 bots com genes híbridos
-        bots = [WarBot(i, gerar_gene_hibrido()) for i in range(1, 6)]
-
-        self.bots = [humano] + bots
-        self._init_state_common()
-
-
-    def _init_state_common(self):
-        """Inicialização comum do tabuleiro/estado."""
-        self.game_state = GameState()
-        self.game_state.inicializar_tabuleiro(self.bots)
-        self.status = "playing"
-        self.current_player_index = 0
-        self.round_number = 1
-        self._save_state_to_history()
-
-    def is_human_turn(self) -> bool:
-        """True se o jogador atual é humano."""
-        if not self.bots:
-            return False
-        current = self.bots[self.current_player_index]
-        return getattr(current, "is_human", False) is True
-
-    def execute_turn(self):
-        """Executa o turno do jogador atual (apenas bots)."""
-        if self.status != "playing":
-            return False
-
-        # Se for humano, não deixa o backend executar automaticamente
-        if self.is_human_turn():
-            return False
-
-        current_bot = self.bots[self.current_player_index]
-
-        # Verificar se o bot foi eliminado
-        if GameLogic.jogador_eliminado(self.game_state, current_bot.id):
-            self._next_player()
-            self._save_state_to_history()
-            return True
-
-        # Reset do histórico de perdas no início de cada rodada
-        if self.current_player_index == 0:
-            for bot in self.bots:
-                self.game_state.historico_perdas[bot.id] = False
-
-        # Fase 1: Receber tropas
-        tropas_recebidas = GameLogic.calcular_unidades_recebidas(self.game_state, current_bot.id)
-        GameLogic.distribuir_tropas(self.game_state, current_bot.id, tropas_recebidas)
-
-        # Fase 2: Atacar
-        max_ataques = 5
-        ataques_realizados = 0
-        last_attack = None
-
-        while ataques_realizados < max_ataques:
-            jogadas = GameLogic.jogadas_possiveis(self.game_state, current_bot.id)
-            ataque = current_bot.escolher_ataque(self.game_state, jogadas)
-
-            if ataque is None:
-                break
-
-            origem, destino = ataque
-            sucesso = GameLogic.executar_ataque(self.game_state, origem, destino)
-
-            last_attack = {
-                "type": "attack",
-                "player": current_bot.id,
-                "from": origem,
-                "to": destino,
-                "success": sucesso,
-                "troops_moved": self.game_state.territorios[destino]['tropas'] if sucesso else 0
-            }
-
-            ataques_realizados += 1
-            if not sucesso:
-                break
-
-        # Fase 3: Redistribuir tropas
-        GameLogic.redistribuir_tropas(self.game_state, current_bot.id)
-
-        # Atualizar última ação
-        if last_attack:
-            self.last_action = last_attack
-        else:
-            self.last_action = {
-                "type": "no_attack",
-                "player": current_bot.id,
-                "reason": "no_valid_attacks"
-            }
+        session, response = store.atualizar(game_id, mutate)
+    except ConflitoSessao as e:
+        return jsonify({"error": "Jogo alterado por outra requisição, tente novamente", "message": str(e)}), 409
+    except RedisError as e:
+        print(f"[Redis] Falha ao atualizar jogo {game_id}: {e}")
+        return jsonify({"error": "Armazenamento de jogos indisponível"}), 503
+    if session is None:
+        return jsonify({"error": "Jogo não encontrado"}), 404
+    if schedule:
+        schedule_auto_play(session)
+    return response
 
-        # Verificar vencedor
-        vencedor = GameLogic.verificar_vencedor(self.game_state)
-        if vencedor is not None:
-            self.status = "finished"
-            self.last_action["winner"] = vencedor
-
-        # Próximo jogador
-        self._next_player()
-        self._save_state_to_history()
-        return True
-
-    def _next_player(self):
-        """Avança para o próximo jogador."""
-        self.current_player_index = (self.current_player_index + 1) % len(self.bots)
-        if self.current_player_index == 0:
-            self.round_number += 1
-            # se for o humano, calcular tropas recebidas
-            if self.is_human_turn():
-                tropas = GameLogic.calcular_unidades_recebidas(self.game_state, 0)
-                self.game_state.tropas_disponiveis[0] += tropas + 3 # bônus inicial para facilitar o jogo do usuario
-
-
-    def _save_state_to_history(self):
-        """Salva o estado atual no histórico."""
-        state_copy = {
-            "round": self.round_number,
-            "current_player": self.current_player_index,
-            "territories": dict(self.game_state.territorios),
-            "last_action": self.last_action,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.history.append(state_copy)
-
-    def get_state_dict(self):
-        """Retorna o estado atual como dicionário."""
-        if not self.game_state:
-            return {
-                "game_id": self.game_id,
-                "status": self.status,
-                "message": "Game not initialized"
-            }
+def schedule_auto_play(session):
+    """Põe/tira o jogo da agenda do auto-play no servidor conforme status e auto_play."""
+    try:
+        sincronizar_agenda(store.redis, session)
+    except Exception as e:
+        print(f"[Redis] Falha ao agendar auto-play do jogo {session.game_id}: {e}")
 
-        # Contar territórios e tropas por jogador
-        players_info = []
-        for bot in self.bots:
-            territories = self.game_state.get_territorios_jogador(bot.id)
-            total_troops = sum(self.game_state.territorios[t]['tropas'] for t in territories)
-            is_human = getattr(bot, "is_human", False) is True
-            # manter chaves já esperadas pelo front
-            players_info.append({
-                "id": bot.id,
-                "strategy": getattr(bot, "estrategia", None) or getattr(bot, "strategy", ""),
-                "gene": getattr(bot, "gene", ""),
-                "territories_count": len(territories),
-                "total_troops": total_troops,
-                "color": PLAYER_COLORS[bot.id],
-                "eliminated": len(territories) == 0,
-                "is_human": is_human,
-            })
+def sse_response(events):
+    return Response(events, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # proxies (nginx do EB) não devem segurar o stream
+    })
 
-        return {
-            "game_id": self.game_id,
-            "status": self.status,
-            "current_round": self.round_number,
-            "current_player": self.current_player_index,
-            "human_turn": self.is_human_turn(),
-            "auto_play": self.auto_play,
-            "speed": self.speed,
-            "territories": self.game_state.territorios,
-            "players": players_info,
-            "last_action": self.last_action,
-            "total_turns": len(self.history),
-            "tropas_disponiveis": getattr(self.game_state, "tropas_disponiveis", {}),
+def delete_game_session(game_id):
+    try:
+        store.excluir(game_id)
+    except Exception as e:
+        print(f"[Redis] Falha ao deletar jogo {game_id}: {e}")
 
-        }
 
 
 @app.route('/<path:path>')
@@ -340,7 +170,8 @@ def start_game():
         game_session.initialize_game()
 
     # Armazenar sessão
-    save_game_session(game_id, game_session)
+    create_game_session(game_id, game_session)
+    schedule_auto_play(game_session)
 
 
     return jsonify({
@@ -352,12 +183,73 @@ def start_game():
 
 @app.route('/api/game/<game_id>/state', methods=['GET'])
 def get_game_state(game_id):
-    """Obtém o estado atual do jogo."""
+    """Obtém o estado atual do jogo (ETag/If-None-Match: 304 se nada mudou)."""
     game_session = load_game_session(game_id)
     if not game_session:
         return jsonify({"error": "Jogo não encontrado"}), 404
 
-    return jsonify(game_session.get_state_dict())
+    body, etag = game_session.state_json()
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"  # o navegador revalida sempre (If-None-Match)
+    return response.make_conditional(request)
+
+
+@app.route('/api/game/<game_id>/history', methods=['GET'])
+def get_game_history(game_id):
+    """Replay do histórico: tabuleiro no turno `from` e os deltas até `to`."""
+    game_session = load_game_session(game_id)
+    if not game_session:
+        return jsonify({"error": "Jogo não encontrado"}), 404
+
+    total = len(game_session.history)
+    if total == 0:
+        return jsonify({"total_turns": 0, "territories": {}, "turns": []})
+
+    start = request.args.get('from', 0, type=int)
+    end = request.args.get('to', total - 1, type=int)
+    try:
+        replay = game_session.history.replay(start, end)
+    except IndexError:
+        return jsonify({"error": "Turno fora do histórico", "total_turns": total}), 400
+
+    return jsonify({"total_turns": total, "from": start, "to": end, **replay})
+
+
+@app.route('/api/game/<game_id>/history/<int:turn>', methods=['GET'])
+def get_game_history_turn(game_id, turn):
+    """Tabuleiro e ação registrados em um turno do histórico."""
+    game_session = load_game_session(game_id)
+    if not game_session:
+        return jsonify({"error": "Jogo não encontrado"}), 404
+
+    try:
+        entry = game_session.history[turn]
+    except IndexError:
+        return jsonify({"error": "Turno fora do histórico", "total_turns": len(game_session.history)}), 400
+
+    return jsonify({"turn": turn, **entry})
+
+
+@app.route('/api/game/<game_id>/events', methods=['GET'])
+def game_events(game_id):
+    """
+    Stream SSE com os deltas de cada turno (substitui o polling de /state).
+    Reconexão: header Last-Event-ID ou ?since=<turno> reenviam só os turnos perdidos.
+    """
+    since = request.headers.get('Last-Event-ID', request.args.get('since'))
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        return jsonify({"error": "since deve ser um número de turno"}), 400
+
+    return sse_response(transmitir(store, game_id, since))
+
+
+@app.route('/api/metrics/autoplay', methods=['GET'])
+def autoplay_metrics():
+    """Estado do escalonador de auto-play deste worker e tamanho da agenda."""
+    return jsonify({"enabled": AUTO_PLAY_SCHEDULER, **autoplay_scheduler.estatisticas()})
 
 
 @app.route("/health")
@@ -365,81 +257,123 @@ def health():
     return "OK", 200
 
 
+@app.route('/api/metrics/sessions', methods=['GET'])
+def session_metrics():
+    """Contadores de gravação e disputa das sessões (todos os workers)."""
+    return jsonify({
+        "lock_enabled": store.trava,
+        "counters": store.metricas(),
+        # contadores do cache são deste worker
+        "cache": session_cache.estatisticas() if session_cache else None,
+        "write_behind": SESSION_WRITE_BEHIND
+    })
+
+
 @app.route('/api/game/<game_id>/next-turn', methods=['POST'])
 def next_turn(game_id):
     """Executa o próximo turno (bloqueia se for a vez do humano)."""
-    game_session = load_game_session(game_id)
-    if not game_session:
-        return jsonify({"error": "Jogo não encontrado"}), 404
+    def play_turn(game_session):
+        if game_session.status != "playing":
+            return jsonify({"error": "Game is not in playing state"}), 400
+
+        if game_session.is_human_turn():
+            return jsonify({"error": "Human turn - aguarde ação do jogador"}), 400
+
+        if game_session.execute_turn():
+            return jsonify({
+                "success": True,
+                "state": game_session.get_state_dict()
+            })
+        return jsonify({"error": "Failed to execute turn"}), 500
+
+    return update_game_session(game_id, play_turn)
 
 
-    if game_session.status != "playing":
-        return jsonify({"error": "Game is not in playing state"}), 400
+MAX_BATCH_TURNS = 100
 
-    if game_session.is_human_turn():
-        return jsonify({"error": "Human turn - aguarde ação do jogador"}), 400
 
-    success = game_session.execute_turn()
-    save_game_session(game_id, game_session)
-    if success:
+@app.route('/api/game/<game_id>/next-turns', methods=['POST'])
+def next_turns(game_id):
+    """
+    Executa vários turnos de bots numa só requisição (uma leitura e uma gravação).
+    Body: { "turns": N }  (padrão 10, máximo MAX_BATCH_TURNS)
+    Para antes de N turnos na vez do humano ou no fim da partida.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        max_turns = int(data.get('turns', 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "turns deve ser um inteiro"}), 400
+    if not 1 <= max_turns <= MAX_BATCH_TURNS:
+        return jsonify({"error": f"turns deve estar entre 1 e {MAX_BATCH_TURNS}"}), 400
+
+    def play_turns(game_session):
+        if game_session.status != "playing":
+            return jsonify({"error": "Game is not in playing state"}), 400
+
+        if game_session.is_human_turn():
+            return jsonify({"error": "Human turn - aguarde ação do jogador"}), 400
+
+        turns = game_session.execute_turns(max_turns)
+        if game_session.status == "finished":
+            stopped = "finished"
+        elif game_session.is_human_turn():
+            stopped = "human_turn"
+        else:
+            stopped = "limit"
         return jsonify({
             "success": True,
+            "executed": len(turns),
+            "stopped_reason": stopped,
+            "turns": turns,
             "state": game_session.get_state_dict()
         })
-    else:
-        return jsonify({"error": "Failed to execute turn"}), 500
+
+    return update_game_session(game_id, play_turns)
 
 
 @app.route('/api/game/<game_id>/control', methods=['POST'])
 def control_game(game_id):
     """Controla o jogo (pause, resume, etc.)."""
-    game_session = load_game_session(game_id)
-    if not game_session:
-        return jsonify({"error": "Jogo não encontrado"}), 404
-
-
     data = request.get_json() or {}
     action = data.get('action')
 
+    def apply_control(game_session):
+        if action == 'pause':
+            game_session.status = "paused"
+        elif action == 'resume':
+            if game_session.status == "paused":
+                game_session.status = "playing"
+        elif action == 'toggle_auto_play':
+            game_session.auto_play = not game_session.auto_play
+        elif action == 'set_speed':
+            speed = data.get('speed', 'normal')
+            if speed in ['slow', 'normal', 'fast']:
+                game_session.speed = speed
 
+        return jsonify({
+            "success": True,
+            "state": game_session.get_state_dict()
+        })
 
-    if action == 'pause':
-        game_session.status = "paused"
-    elif action == 'resume':
-        if game_session.status == "paused":
-            game_session.status = "playing"
-    elif action == 'toggle_auto_play':
-        game_session.auto_play = not game_session.auto_play
-    elif action == 'set_speed':
-        speed = data.get('speed', 'normal')
-        if speed in ['slow', 'normal', 'fast']:
-            game_session.speed = speed
-
-    save_game_session(game_id, game_session)
-    return jsonify({
-        "success": True,
-        "state": game_session.get_state_dict()
-    })
+    # pausa/retomada valem já: a agenda é acertada depois de gravar e o escalonador relê o estado
+    return update_game_session(game_id, apply_control, schedule=True)
 
 
 @app.route('/api/games', methods=['GET'])
 def list_games():
-    """Lista todos os jogos ativos."""
-    # Lista todas as chaves de jogos no Redis
-    games_list = []
-    for key in redis_client.keys("game:*"):
-        data = redis_client.get(key)
-        if not data:
-            continue
-        session = pickle.loads(data)
-        games_list.append({
-            "game_id": session.game_id,
-            "status": session.status,
-            "round": session.round_number,
-            "created_at": session.created_at.isoformat()
-        })
+    """Lista os jogos ativos, paginados por cursor (?limit=&cursor=&status=)."""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    cursor = request.args.get('cursor')
+    status = request.args.get('status')
+    if status is not None and status not in STATUS_SESSAO:
+        return jsonify({"error": f"Status inválido. Use um de: {', '.join(STATUS_SESSAO)}"}), 400
 
-    return jsonify({"games": games_list})
+    try:
+        games_list, next_cursor = store.listar(limit, cursor, status)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"games": games_list, "next_cursor": next_cursor})
 
 
 @app.route('/api/territories', methods=['GET'])
@@ -451,6 +385,36 @@ def get_territories():
     })
 
 
+_tabela_genes = {"mtime": None, "torneio": None}
+
+
+def load_gene_table():
+    """Carrega a tabela do torneio de genes (recarrega só se o arquivo mudar)."""
+    path = os.getenv("TABELA_GENES", TABELA_GENES)
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    if _tabela_genes["mtime"] != mtime:
+        from src.tournament import TorneioGenotipos
+        _tabela_genes["torneio"] = TorneioGenotipos.carregar(path)
+        _tabela_genes["mtime"] = mtime
+    return _tabela_genes["torneio"]
+
+
+@app.route('/api/genes/best', methods=['GET'])
+def best_genes():
+    """Retorna os melhores genes segundo a tabela do torneio exaustivo."""
+    table = load_gene_table()
+    if table is None:
+        return jsonify({"error": "Tabela de genes não gerada (rode python -m src.tournament)"}), 404
+
+    top = min(max(request.args.get('top', 1, type=int), 1), 512)
+    return jsonify({
+        "rounds": table.rodadas_concluidas,
+        "genes": table.ranking(top=top)
+    })
+
+
 @app.route('/api/general/chat', methods=['POST'])
 def general_chat():
     """Chat livre com o General (NLP)"""
@@ -461,28 +425,48 @@ def general_chat():
         return jsonify({"error": "Mensagem vazia"}), 400
 
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=MINHACHAVEAPI)  # usa sua chave
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Você é o General WAR, um estrategista militar cartunesco. Responda de forma didática, curta e engraçada, dando dicas ou comentários sobre qualquer assunto que o jogador traga."},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=300,
-        )
-
-        reply = response.choices[0].message.content.strip()
+        reply = general_reply(message)
         return jsonify({"reply": reply})
 
     except Exception as e:
         return jsonify({"error": "Erro ao processar mensagem", "message": str(e)}), 500
 
 
+def text_stream(chunks, done):
+    """
+    SSE com o texto do LLM conforme chega: ``token`` ({'text'}) a cada pedaço,
+    depois ``done`` (``done(texto_completo)``) ou ``error`` ({'error', 'message'}).
+    """
+    text = []
+    try:
+        for chunk in chunks:
+            text.append(chunk)
+            yield formatar_sse("token", {"text": chunk})
+    except Exception as e:
+        yield formatar_sse("error", {"error": "Erro ao gerar resposta", "message": str(e)})
+        return
+    yield formatar_sse("done", done("".join(text).strip()))
+
+
+@app.route('/api/general/chat/stream', methods=['POST'])
+def general_chat_stream():
+    """Chat com o General em stream SSE (token a token), mesmo corpo de /api/general/chat."""
+    data = request.get_json() or {}
+    message = data.get("message", "")
+
+    if not message:
+        return jsonify({"error": "Mensagem vazia"}), 400
+
+    return sse_response(text_stream(stream_general_reply(message), lambda reply: {"reply": reply}))
+
+
 @app.route('/api/game/<game_id>/analyze-move', methods=['POST'])
 def analyze_move(game_id):
-    """Analisa a última jogada usando IA com Teoria dos Jogos."""
+    """
+    Analisa a última jogada usando IA com Teoria dos Jogos.
+    Devolve a análise na hora se já está em cache; senão 202 com o job_id para
+    consultar em /api/analysis/<job_id> (ou espera até ?wait= segundos).
+    """
     game_session = load_game_session(game_id)
     if not game_session:
         return jsonify({"error": "Jogo não encontrado"}), 404
@@ -492,9 +476,6 @@ def analyze_move(game_id):
     if not game_session.game_state:
         return jsonify({"error": "Game not initialized"}), 400
 
-    # Obter estado atual do jogo
-    current_state = game_session.get_state_dict()
-
     # Verificar se há uma última ação para analisar
     if not game_session.last_action:
         return jsonify({
@@ -502,20 +483,111 @@ def analyze_move(game_id):
             "message": "Execute pelo menos um turno antes de solicitar análise"
         }), 400
 
+    evaluation = evaluate_last_move(game_session)
+    if evaluation is None:
+        return jsonify({"error": "Jogada não encontrada no histórico"}), 400
+
+    client_id = request.headers.get("X-Forwarded-For", request.remote_addr or "").split(",")[0].strip()
     try:
-        analysis = analyze_move_with_gpt(current_state, game_session.last_action)
+        job = analysis_pipeline.solicitar(game_session, evaluation, client_id)
+        wait = min(float(request.args.get("wait", 0)), MAX_ANALYSIS_WAIT)
+        if job["status"] == "pending" and wait > 0:
+            job = {**job, **analysis_pipeline.aguardar(job["job_id"], wait)}
+    except LimiteAnalises as e:
+        return jsonify({"error": "Muitas análises solicitadas", "message": str(e)}), 429
+    except FilaAnalisesCheia as e:
+        return jsonify({"error": "Análises ocupadas", "message": str(e)}), 503
+    except ValueError:
+        return jsonify({"error": "wait deve ser um número"}), 400
+    except RedisError as e:
+        print(f"[Redis] Falha na análise do jogo {game_id}: {e}")
+        return jsonify({"error": "Armazenamento de jogos indisponível"}), 503
+
+    return analysis_response(job, evaluation)
+
+
+@app.route('/api/game/<game_id>/analyze-move/stream', methods=['POST'])
+def analyze_move_stream(game_id):
+    """Análise da última jogada em stream SSE (``token``... ``done`` com o mesmo corpo de /analyze-move)."""
+    game_session = load_game_session(game_id)
+    if not game_session:
+        return jsonify({"error": "Jogo não encontrado"}), 404
+    if not game_session.game_state:
+        return jsonify({"error": "Game not initialized"}), 400
+    if not game_session.last_action:
         return jsonify({
-            "success": True,
-            "analysis": analysis,
-            "analyzed_action": game_session.last_action,
-            "game_round": game_session.round_number
-        })
+            "error": "Nenhuma jogada para analisar",
+            "message": "Execute pelo menos um turno antes de solicitar análise"
+        }), 400
 
-    except Exception as e:
-        return jsonify({
-            "error": "Erro interno do servidor",
-            "message": str(e)
-        }), 500
+    evaluation = evaluate_last_move(game_session)
+    if evaluation is None:
+        return jsonify({"error": "Jogada não encontrada no histórico"}), 400
+
+    client_id = request.headers.get("X-Forwarded-For", request.remote_addr or "").split(",")[0].strip()
+    try:
+        cached, chunks = analysis_pipeline.transmitir(game_session, evaluation, client_id)
+    except LimiteAnalises as e:
+        return jsonify({"error": "Muitas análises solicitadas", "message": str(e)}), 429
+    except FilaAnalisesCheia as e:
+        return jsonify({"error": "Análises ocupadas", "message": str(e)}), 503
+    except RedisError as e:
+        print(f"[Redis] Falha na análise do jogo {game_id}: {e}")
+        return jsonify({"error": "Armazenamento de jogos indisponível"}), 503
+
+    if cached is not None:
+        chunks = [cached["analysis"]]
+    response = sse_response(text_stream(chunks, lambda analysis: {
+        "success": True,
+        "analysis": analysis,
+        "analyzed_action": game_session.last_action,
+        "game_round": game_session.round_number,
+        "evaluation": evaluation,
+        "cached": cached is not None,
+    }))
+    if cached is None:
+        # libera a vaga e o job mesmo se o cliente cair antes do primeiro pedaço
+        response.call_on_close(chunks.close)
+    return response
+
+
+@app.route('/api/analysis/<job_id>', methods=['GET'])
+def analysis_status(job_id):
+    """Status de uma análise pedida em /analyze-move."""
+    try:
+        job = analysis_pipeline.consultar(job_id)
+    except RedisError as e:
+        print(f"[Redis] Falha ao consultar análise {job_id}: {e}")
+        return jsonify({"error": "Armazenamento de jogos indisponível"}), 503
+    if job is None:
+        return jsonify({"error": "Análise não encontrada"}), 404
+    return analysis_response(job)
+
+
+def evaluate_last_move(game_session):
+    """Avaliação local da última jogada (move_analyzer); None se o histórico não a alcança."""
+    try:
+        return avaliar_jogada(game_session)
+    except (LookupError, IndexError) as e:
+        print(f"[Análise] Histórico indisponível para o jogo {game_session.game_id}: {e}")
+        return None
+
+
+def analysis_response(job, evaluation=None):
+    """Corpo de /analyze-move e /api/analysis; a avaliação local vai junto mesmo com o job pendente."""
+    if job["status"] == "done":
+        return jsonify({"success": True, **job["result"], "cached": job.get("cached", False)})
+    if job["status"] == "error":
+        return jsonify({"error": "Erro ao analisar jogada", "message": job["error"], "job_id": job["job_id"]}), 500
+    body = {
+        "success": True,
+        "status": "pending",
+        "job_id": job["job_id"],
+        "status_url": f"/api/analysis/{job['job_id']}",
+    }
+    if evaluation is not None:
+        body["evaluation"] = evaluation
+    return jsonify(body), 202
 
 
 # ---------------------- NOVOS ENDPOINTS P/ HUMANO ----------------------
@@ -536,19 +608,13 @@ def player_action():
     action = data.get('action')
     params = data.get('params', {}) or {}
 
-    game_session = load_game_session(game_id)
-    if not game_session:
-        return jsonify({"error": "Jogo não encontrado"}), 404
-
-
-
-    if not game_session.is_human_turn():
-        return jsonify({"error": "Não é a vez do humano"}), 400
+    def apply_action(game_session):
+        if not game_session.is_human_turn():
+            return jsonify({"error": "Não é a vez do humano"}), 400
 
-    gs = game_session.game_state
-    player_id = 0  # humano sempre id=0 neste modo
+        gs = game_session.game_state
+        player_id = 0  # humano sempre id=0 neste modo
 
-    try:
         if action == "deploy":
             import unicodedata
 
@@ -587,9 +653,8 @@ def player_action():
             GameLogic.adicionar_tropas(gs, player_id, territorio, qtd)
             game_session.game_state.tropas_disponiveis[player_id] -= qtd
 
-            # FIX CRÍTICO (persistência antes de responder)
+            # FIX CRÍTICO (histórico registrado antes de responder; update_game_session grava)
             game_session._save_state_to_history()
-            save_game_session(game_id, game_session)
 
             # Retorna estado completo e mensagem amigável
             return jsonify({
@@ -599,8 +664,6 @@ def player_action():
                 "state": game_session.get_state_dict()
             }), 200
 
-        
-
         elif action == "attack":
             origem = params.get('origem')
             destino = params.get('destino')
@@ -654,10 +717,11 @@ def player_action():
             game_session.status = "finished"
             game_session.last_action["winner"] = vencedor
 
-        save_game_session(game_id, game_session)
         game_session._save_state_to_history()
         return jsonify({"success": True, "state": game_session.get_state_dict()})
 
+    try:
+        return update_game_session(game_id, apply_action)
     except Exception as e:
         return jsonify({"error": "Falha ao executar ação", "message": str(e)}), 500
 
@@ -671,18 +735,53 @@ def player_end_turn():
     data = request.get_json() or {}
     game_id = data.get('game_id')
 
+    def end_turn(game_session):
+        if not game_session.is_human_turn():
+            return jsonify({"error": "Não é a vez do humano"}), 400
+
+        game_session._next_player()
+        game_session._save_state_to_history()
+        return jsonify({"success": True, "state": game_session.get_state_dict()})
+
+    return update_game_session(game_id, end_turn, schedule=True)
+
+
+@app.route('/api/game/<game_id>/evaluate-moves', methods=['GET'])
+def evaluate_moves(game_id):
+    """
+    Avalia por Monte Carlo cada ataque possível do humano no tabuleiro atual.
+    Query: ?budget_ms= (orçamento de tempo, até AVALIACAO_TEMPO_LIMITE) e ?top= (quantas jogadas devolver).
+    """
     game_session = load_game_session(game_id)
     if not game_session:
         return jsonify({"error": "Jogo não encontrado"}), 404
-
-
-    if not game_session.is_human_turn():
+    if not game_session.game_state:
+        return jsonify({"error": "Game not initialized"}), 400
+    if game_session.status != "playing" or not game_session.is_human_turn():
         return jsonify({"error": "Não é a vez do humano"}), 400
 
-    game_session._next_player()
-    game_session._save_state_to_history()
-    save_game_session(game_id, game_session)
-    return jsonify({"success": True, "state": game_session.get_state_dict()})
+    try:
+        budget = float(request.args.get("budget_ms", AVALIACAO_TEMPO_MAXIMO * 1000)) / 1000
+        top = int(request.args.get("top", 0))
+    except ValueError:
+        return jsonify({"error": "budget_ms e top devem ser números"}), 400
+    budget = min(max(budget, 0.0), AVALIACAO_TEMPO_LIMITE)
+
+    try:
+        evaluation = evaluation_executor.avaliar(game_session, game_session.current_player_index, budget)
+    except AvaliacoesOcupadas as e:
+        return jsonify({"error": "Avaliações ocupadas", "message": str(e)}), 503
+    except TimeoutError as e:
+        return jsonify({"error": "Avaliação demorou demais", "message": str(e)}), 504
+
+    if top > 0:
+        evaluation["jogadas"] = evaluation["jogadas"][:top]
+    return jsonify({
+        "success": True,
+        "game_round": game_session.round_number,
+        "tropas_disponiveis": game_session.game_state.tropas_disponiveis.get(game_session.current_player_index, 0),
+        **evaluation,
+    })
 
 # ----------------------------------------------------------------------
 
@@ -690,5 +789,6 @@ def player_end_turn():
 if __name__ == '__main__':
     print("Iniciando servidor Flask para WAR Game API...")
     print("Acesse http://localhost:5000 para a API")
+    start_background_workers()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Análise local e determinística da última jogada de uma partida.
+
+Avalia a jogada com as próprias regras do jogo, em milissegundos e sem rede:
+
+- ataque: chance de vitória e perdas esperadas (``GameLogic.resultado_esperado_ataque``,
+  a mesma tabela usada pelos sorteios);
+- fronteira: força de fronteira do jogador antes e depois (BSTx/NBSRx), isto é,
+  quanta tropa inimiga encosta em cada tropa própria e qual território ficou
+  mais ameaçado;
+- continentes: bônus de ``BONUS_CONTINENTES`` ganhos ou perdidos na jogada;
+- alternativas: todos os ataques de ``GameLogic.jogadas_possiveis`` no mesmo
+  tabuleiro, ordenados pelo valor esperado.
+
+O valor esperado de um ataque é medido em tropas:
+
+    p * ANALISE_LOCAL_HORIZONTE * (0.5 + bônus completado + bônus tirado do defensor) - perda esperada
+
+(cada território a mais rende meia tropa por turno; os bônus de continente
+entram inteiros).
+
+O tabuleiro anterior à jogada vem do histórico: o primeiro turno em que a
+``last_action`` atual aparece é o "depois", e o turno anterior é o "antes".
+Nos turnos dos bots o "antes" ainda recebe a distribuição de tropas do início
+do turno (determinística), chegando ao tabuleiro em que os ataques começaram;
+com vários ataques no mesmo turno, a avaliação do último usa esse tabuleiro
+(``aproximado``).
+"""
+
+from src.config import ANALISE_LOCAL_HORIZONTE, ANALISE_LOCAL_ALTERNATIVAS, ANALISE_LOCAL_MAX_RECUO
+from src.config import TERRITORIOS
+from src.game import (
+    GameLogic, GameState, INDICE_TERRITORIO, CONTINENTE_DO_TERRITORIO, NOMES_CONTINENTES,
+    TAMANHO_CONTINENTE, BONUS_CONTINENTE_IDX
+)
+
+GANHO_POR_TERRITORIO = 0.5  # tropas por turno: a base recebida é territórios // 2
+
+CLASSIFICACOES = {
+    "melhor": "melhor opção disponível",
+    "boa": "ataque com valor esperado positivo, mas havia opção melhor",
+    "arriscada": "ataque com mais chance de falhar do que de vencer",
+    "custosa": "ataque provável, mas que custa mais tropas do que rende",
+    "passiva": "não atacou, embora houvesse ataque com valor esperado positivo",
+    "prudente": "não atacou, e nenhum ataque disponível compensava",
+    "sem_opcoes": "não havia ataques possíveis",
+}
+
+
+def _rodada(valor):
+    return round(valor, 3)
+
+
+# ----------------------------------------------------------------------
+# Tabuleiros antes/depois
+# ----------------------------------------------------------------------
+def _turno_da_jogada(historico, acao):
+    """Turno do histórico em que ``acao`` foi registrada pela primeira vez (ou None)."""
+    fim = len(historico) - 1
+    if fim < 1 or historico.acao_em(fim) != acao:
+        return None
+    turno = fim
+    limite = max(1, fim - ANALISE_LOCAL_MAX_RECUO)
+    while turno > limite and historico.acao_em(turno - 1) == acao:
+        turno -= 1
+    return turno
+
+
+def _estado(sessao, donos, tropas):
+    return GameState.restaurar(donos, tropas, sessao.bots)
+
+
+def _eh_bot(sessao, jogador_id):
+    return any(j.id == jogador_id and getattr(j, "is_human", False) is not True for j in sessao.bots)
+
+
+# ----------------------------------------------------------------------
+# Medidas
+# ----------------------------------------------------------------------
+def valor_ataque(gs, jogador_id, origem, destino):
+    """Chance, perdas e valor esperado (em tropas) do ataque ``origem -> destino`` em ``gs``."""
+    j = INDICE_TERRITORIO[destino]
+    c = CONTINENTE_DO_TERRITORIO[j]
+    esperado = GameLogic.resultado_esperado_ataque(gs, origem, destino)
+    p = esperado["probabilidade_vitoria"]
+
+    meus = gs.contagem_continente.get(jogador_id)
+    do_defensor = gs.contagem_continente.get(gs.donos[j])
+    bonus_ganho = BONUS_CONTINENTE_IDX[c] if meus and meus[c] == TAMANHO_CONTINENTE[c] - 1 else 0
+    bonus_tirado = BONUS_CONTINENTE_IDX[c] if do_defensor and do_defensor[c] == TAMANHO_CONTINENTE[c] else 0
+    ganho = GANHO_POR_TERRITORIO + bonus_ganho + bonus_tirado
+    return {
+        "origem": origem,
+        "destino": destino,
+        "tropas_atacante": gs.get_tropas(origem),
+        "tropas_defensor": gs.get_tropas(destino),
+        "defensor": gs.get_dono(destino),
+        "probabilidade_vitoria": _rodada(p),
+        "perda_esperada": _rodada(esperado["perda_esperada"]),
+        "tropas_ocupantes": _rodada(esperado["tropas_ocupantes"]),
+        "bonus_em_jogo": bonus_ganho + bonus_tirado,
+        "valor_esperado": _rodada(p * ANALISE_LOCAL_HORIZONTE * ganho - esperado["perda_esperada"]),
+    }
+
+
+def _fronteira(gs, jogador_id, destaques=()):
+    """Força de fronteira do jogador: pressão inimiga total e NBSRx dos territórios mais expostos."""
+    fronteiras = [TERRITORIOS[i] for i in gs.get_fronteiras_jogador(jogador_id)]
+    if not fronteiras:
+        return {"territorios": 0, "pressao": 0.0, "mais_ameacado": None, "nbsrx": {}}
+    inimigos = set(gs.get_inimigos_jogador(jogador_id))
+    nbsrx = GameLogic.calcular_NBSRx(gs, fronteiras, inimigos)
+    mais_ameacado = max(fronteiras, key=nbsrx.__getitem__)
+    tropas = sum(gs.get_tropas(t) for t in fronteiras)
+    ameaca = sum(GameLogic.calcular_BSTx(gs, t, inimigos) for t in fronteiras)
+    return {
+        "territorios": len(fronteiras),
+        "pressao": _rodada(ameaca / tropas) if tropas else 0.0,  # tropas inimigas vizinhas por tropa própria
+        "mais_ameacado": {"territorio": mais_ameacado, "nbsrx": _rodada(nbsrx[mais_ameacado])},
+        "nbsrx": {t: _rodada(nbsrx[t]) for t in destaques if t in nbsrx},
+    }
+
+
+def _bonus(gs, jogadores):
+    return {j.id: GameLogic.bonus_continentes(gs, j.id) for j in jogadores}
+
+
+def _continente(antes, depois, jogador_id, territorio):
+    c = CONTINENTE_DO_TERRITORIO[INDICE_TERRITORIO[territorio]]
+    contagem = lambda gs: (gs.contagem_continente.get(jogador_id) or [0] * len(NOMES_CONTINENTES))[c]
+    return {
+        "nome": NOMES_CONTINENTES[c],
+        "bonus": BONUS_CONTINENTE_IDX[c],
+        "tamanho": TAMANHO_CONTINENTE[c],
+        "territorios_antes": contagem(antes),
+        "territorios_depois": contagem(depois),
+    }
+
+
+def _classificar(acao, avaliada, alternativas):
+    melhor = alternativas[0]["valor_esperado"] if alternativas else None
+    if acao.get("type") == "attack":
+        if avaliada is None:
+            return None
+        if melhor is None or avaliada["valor_esperado"] >= melhor - 0.25:
+            return "melhor"
+        if avaliada["valor_esperado"] > 0:
+            return "boa"
+        return "arriscada" if avaliada["probabilidade_vitoria"] < 0.5 else "custosa"
+    if acao.get("type") == "no_attack":
+        if melhor is None:
+            return "sem_opcoes"
+        return "passiva" if melhor > 0 else "prudente"
+    return None
+
+
+# ----------------------------------------------------------------------
+# Avaliação
+# ----------------------------------------------------------------------
+def avaliar_jogada(sessao, max_alternativas=ANALISE_LOCAL_ALTERNATIVAS):
+    """Avaliação estruturada da ``last_action`` da sessão (dict serializável em JSON).
+
+    Returns:
+        None se não há jogada para avaliar (ou o histórico não a alcança).
+    """
+    acao = sessao.last_action
+    if not acao or sessao.game_state is None:
+        return None
+    turno = _turno_da_jogada(sessao.history, acao)
+    if turno is None:
+        return None
+    jogador_id = acao.get("player")
+    antes = _estado(sessao, *sessao.history.tabuleiro_em(turno - 1))
+    depois = _estado(sessao, *sessao.history.tabuleiro_em(turno))
+
+    # tabuleiro em que o jogador escolheu o ataque
+    no_ataque = antes
+    if acao.get("type") in ("attack", "no_attack") and _eh_bot(sessao, jogador_id):
+        no_ataque = antes.copy()
+        GameLogic.distribuir_tropas(no_ataque, jogador_id, GameLogic.calcular_unidades_recebidas(no_ataque, jogador_id))
+
+    candidatos = [valor_ataque(no_ataque, jogador_id, o, d)
+                  for o, d in GameLogic.jogadas_possiveis(no_ataque, jogador_id)]
+    candidatos.sort(key=lambda a: a["valor_esperado"], reverse=True)
+
+    avaliada = posicao = None
+    aproximado = False
+    destaques = [t for t in (acao.get("from"), acao.get("to")) if t in INDICE_TERRITORIO]
+    if acao.get("type") == "attack":
+        par = (acao.get("from"), acao.get("to"))
+        posicao = next((k + 1 for k, a in enumerate(candidatos) if (a["origem"], a["destino"]) == par), None)
+        if posicao is not None:
+            avaliada = candidatos[posicao - 1]
+            # outro ataque no mesmo turno mudou o tabuleiro antes deste?
+            aproximado = any(no_ataque.donos[i] != depois.donos[i] for i in range(len(TERRITORIOS))
+                             if TERRITORIOS[i] != acao.get("to"))
+
+    bonus_antes = _bonus(antes, sessao.bots)
+    bonus_depois = _bonus(depois, sessao.bots)
+    return {
+        "jogada": acao,
+        "jogador": jogador_id,
+        "turno": turno,
+        "aproximado": aproximado,
+        "ataque": avaliada,
+        "posicao": posicao,
+        "opcoes": len(candidatos),
+        "classificacao": _classificar(acao, avaliada, candidatos),
+        "alternativas": [a for a in candidatos if a is not avaliada][:max_alternativas],
+        "continente": _continente(antes, depois, jogador_id, acao["to"]) if acao.get("to") in INDICE_TERRITORIO else None,
+        "bonus": {
+            "antes": bonus_antes.get(jogador_id, 0),
+            "depois": bonus_depois.get(jogador_id, 0),
+            "perdidos": {j: bonus_antes[j] - bonus_depois[j] for j in bonus_antes
+                         if j != jogador_id and bonus_depois[j] < bonus_antes[j]},
+        },
+        "fronteira": {
+            "antes": _fronteira(no_ataque, jogador_id, destaques),
+            "depois": _fronteira(depois, jogador_id, destaques),
+        },
+        "territorios": {"antes": antes.num_territorios(jogador_id), "depois": depois.num_territorios(jogador_id)},
+        "tropas": {"antes": no_ataque.total_tropas(jogador_id), "depois": depois.total_tropas(jogador_id)},
+    }
+
+
+# ----------------------------------------------------------------------
+# Texto
+# ----------------------------------------------------------------------
+def _pct(p):
+    return f"{round(p * 100)}%"
+
+
+def _descrever_ataque(a):
+    return (f"{a['origem']} ({a['tropas_atacante']}) → {a['destino']} ({a['tropas_defensor']}): "
+            f"chance {_pct(a['probabilidade_vitoria'])}, perda esperada {a['perda_esperada']:.1f}, "
+            f"valor {a['valor_esperado']:+.1f}")
+
+
+def resumo_texto(avaliacao):
+    """Resumo curto da avaliação em linhas de texto (resposta local e contexto do LLM)."""
+    acao = avaliacao["jogada"]
+    jogador = f"Jogador {avaliacao['jogador']}"
+    linhas = []
+    ataque = avaliacao["ataque"]
+    if acao.get("type") == "attack":
+        resultado = "conquistou" if acao.get("success") else "não conquistou"
+        if ataque:
+            linhas.append(f"{jogador} atacou {_descrever_ataque(ataque)} — {resultado}.")
+        else:
+            linhas.append(f"{jogador} atacou {acao.get('to')} a partir de {acao.get('from')} — {resultado}.")
+    elif acao.get("type") == "no_attack":
+        linhas.append(f"{jogador} não atacou neste turno.")
+    elif acao.get("type") == "fortify":
+        linhas.append(f"{jogador} moveu {acao.get('troops')} tropa(s) de {acao.get('from')} para {acao.get('to')}.")
+
+    continente = avaliacao["continente"]
+    if continente and continente["territorios_antes"] != continente["territorios_depois"]:
+        linhas.append(f"{continente['nome']} (bônus {continente['bonus']}): {continente['territorios_antes']} → "
+                      f"{continente['territorios_depois']} de {continente['tamanho']} territórios.")
+    bonus = avaliacao["bonus"]
+    if bonus["antes"] != bonus["depois"]:
+        linhas.append(f"Bônus de continentes de {jogador}: {bonus['antes']} → {bonus['depois']}.")
+    for perdedor, valor in bonus["perdidos"].items():
+        linhas.append(f"Jogador {perdedor} perdeu {valor} de bônus de continente.")
+
+    fr_antes, fr_depois = avaliacao["fronteira"]["antes"], avaliacao["fronteira"]["depois"]
+    texto = (f"Fronteira: {fr_antes['territorios']} → {fr_depois['territorios']} territórios, pressão inimiga "
+             f"{fr_antes['pressao']:.2f} → {fr_depois['pressao']:.2f} tropas por tropa própria")
+    if fr_depois["mais_ameacado"]:
+        texto += (f"; mais ameaçado: {fr_depois['mais_ameacado']['territorio']} "
+                  f"(NBSRx {fr_depois['mais_ameacado']['nbsrx']:.2f})")
+    linhas.append(texto + ".")
+    linhas.append(f"Territórios: {avaliacao['territorios']['antes']} → {avaliacao['territorios']['depois']}; "
+                  f"tropas: {avaliacao['tropas']['antes']} → {avaliacao['tropas']['depois']}.")
+
+    if avaliacao["alternativas"]:
+        linhas.append("Alternativas: " + "; ".join(_descrever_ataque(a) for a in avaliacao["alternativas"]) + ".")
+    classificacao = avaliacao["classificacao"]
+    if classificacao:
+        texto = f"Avaliação: {CLASSIFICACOES[classificacao]}"
+        if avaliacao["posicao"]:
+            texto += f" ({avaliacao['posicao']}ª de {avaliacao['opcoes']} opções)"
+        linhas.append(texto + ".")
+    if avaliacao["aproximado"]:
+        linhas.append("(Houve outros ataques no mesmo turno: números calculados no tabuleiro do início dos ataques.)")
+    return "\n".join(linhas)
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Avaliação Monte Carlo dos ataques possíveis de um jogador (o humano, id 0).
+
+Cada ataque de ``GameLogic.jogadas_possiveis`` é aberto nos seus resultados
+exatos — vitória ou derrota, com as perdas da tabela de ataque
+(``TABELA_ATAQUE.distribuicao_perda``) — e cada tabuleiro resultante é
+continuado por rollouts curtos no simulador em lote (``BatchSimulator``): os
+adversários jogam com os genes dos seus WarBots até o fim da rodada e mais
+``AVALIACAO_RODADAS - 1`` rodadas, e o humano, nas rodadas seguintes, só
+reforça e redistribui (gene pacifista).
+
+Os tabuleiros são deduplicados entre os candidatos: a derrota a partir da
+mesma origem com a mesma perda, por exemplo, dá o mesmo tabuleiro para todos
+os destinos, e "não atacar" (o tabuleiro atual) serve de referência para
+todos. Todos os rollouts de uma onda rodam juntos, em lockstep; novas ondas
+são disparadas enquanto couberem no orçamento de tempo.
+
+As medidas de cada candidato são a média ponderada (pela probabilidade de
+cada resultado) das médias dos seus tabuleiros ao fim do horizonte:
+territórios, tropas, bônus de continente, ``renda`` (tropas recebidas no
+próximo reforço: ``max(3, territórios // 2)`` + bônus), chance de ser
+eliminado e chance de controlar cada continente.
+
+A avaliação é só CPU (NumPy) e nunca cede ao loop do gevent: na API ela roda
+pelo ``ExecutorAvaliacoes``, em threads nativas, com vagas limitadas e tempo
+máximo de espera.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import numpy as np
+
+try:
+    from gevent import monkey as gevent_monkey
+    from gevent import Timeout as GeventTimeout
+    from gevent.threadpool import ThreadPool as GeventThreadPool
+except ImportError:  # pragma: no cover - gevent só é usado no servidor
+    gevent_monkey = None
+
+from src.config import (
+    AVALIACAO_TEMPO_MAXIMO, AVALIACAO_RODADAS, AVALIACAO_LOTE, AVALIACAO_MAX_ROLLOUTS,
+    AVALIACAO_MAX_CANDIDATOS, AVALIACAO_MAX_SIMULTANEAS, AVALIACAO_TIMEOUT
+)
+from src.attack_table import TABELA_ATAQUE, FAIXA_VITORIA, FAIXA_DERROTA
+from src.batch_simulator import BatchSimulator, MEMBRO_CONTINENTE, TAMANHOS, BONUS
+from src.bot import gene_para_inteiro
+from src.game import GameLogic, INDICE_TERRITORIO, NOMES_CONTINENTES
+
+GENE_PASSIVO = 0  # '000000000': pacifista absoluto — reforça e redistribui, nunca ataca
+
+
+def resultados_ataque(donos, tropas, perdeu, origem, destino):
+    """Resultados exatos de um ataque: lista ``[((donos, tropas, perdeu), probabilidade)]``.
+
+    Aplica as mesmas regras de ``GameLogic.executar_ataque`` a cada perda
+    possível da tabela de ataque, sem sortear nada.
+    """
+    i_origem = INDICE_TERRITORIO[origem]
+    i_destino = INDICE_TERRITORIO[destino]
+    atacante = tropas[i_origem]
+    defensor = tropas[i_destino]
+    p = TABELA_ATAQUE.probabilidade(atacante, defensor)
+    resultados = []
+
+    if p > 0:
+        derrotado = donos[i_destino]
+        novos_donos = list(donos)
+        novos_donos[i_destino] = donos[i_origem]
+        novo_perdeu = list(perdeu)
+        if 0 <= derrotado < len(novo_perdeu):
+            novo_perdeu[derrotado] = True
+        for perda, q in TABELA_ATAQUE.distribuicao_perda(defensor, FAIXA_VITORIA):
+            novas_tropas = list(tropas)
+            novas_tropas[i_destino] = max(1, atacante - perda - 1)
+            novas_tropas[i_origem] = 1
+            resultados.append(((tuple(novos_donos), tuple(novas_tropas), tuple(novo_perdeu)), p * q))
+
+    if p < 1:
+        for perda, q in TABELA_ATAQUE.distribuicao_perda(atacante, FAIXA_DERROTA):
+            novas_tropas = list(tropas)
+            novas_tropas[i_origem] = max(1, atacante - perda)
+            resultados.append(((tuple(donos), tuple(novas_tropas), tuple(perdeu)), (1 - p) * q))
+
+    return [(tabuleiro, peso) for tabuleiro, peso in resultados if peso > 0]
+
+
+def genes_da_sessao(sessao):
+    """Genes (inteiros de 9 bits) por posição; humanos jogam com o gene passivo nos rollouts."""
+    return np.array([
+        GENE_PASSIVO if getattr(jogador, "is_human", False) else gene_para_inteiro(jogador.gene)
+        for jogador in sessao.bots
+    ], dtype=np.int64)
+
+
+def medidas(donos, tropas, jogador):
+    """Medidas do jogador em cada linha de ``donos``/``tropas`` (N, 42)."""
+    meus = donos == jogador
+    territorios = meus.sum(axis=1)
+    completos = (meus.astype(np.int64) @ MEMBRO_CONTINENTE) == TAMANHOS
+    bonus = (completos * BONUS).sum(axis=1)
+    return {
+        "territorios": territorios,
+        "tropas": np.where(meus, tropas, 0).sum(axis=1),
+        "bonus": bonus,
+        "renda": np.where(territorios > 0, np.maximum(3, territorios // 2) + bonus, 0),
+        "eliminacao": territorios == 0,
+        "continentes": completos,
+    }
+
+
+class _Acumulador:
+    """Somas por tabuleiro das medidas dos rollouts (médias e variância da renda)."""
+
+    def __init__(self, num_tabuleiros):
+        self.n = np.zeros(num_tabuleiros, dtype=np.int64)
+        self.somas = {}
+        self.soma_quadrados_renda = np.zeros(num_tabuleiros)
+
+    def adicionar(self, indices, valores):
+        tamanho = len(self.n)
+        self.n += np.bincount(indices, minlength=tamanho)
+        for nome, valor in valores.items():
+            if valor.ndim == 1:
+                soma = np.bincount(indices, weights=valor, minlength=tamanho)
+            else:
+                soma = np.stack([np.bincount(indices, weights=coluna, minlength=tamanho) for coluna in valor.T], axis=1)
+            self.somas[nome] = self.somas.get(nome, 0) + soma
+        self.soma_quadrados_renda += np.bincount(indices, weights=valores["renda"].astype(np.float64) ** 2, minlength=tamanho)
+
+    def medias(self):
+        n = np.maximum(self.n, 1)
+        medias = {nome: soma / (n if soma.ndim == 1 else n[:, None]) for nome, soma in self.somas.items()}
+        variancia = np.maximum(self.soma_quadrados_renda / n - medias["renda"] ** 2, 0)
+        # Correção de Bessel; com um só rollout a variância fica zerada
+        medias["variancia_renda"] = variancia * self.n / np.maximum(self.n - 1, 1)
+        return medias
+
+
+def _resumo(medias, partes, rollouts):
+    """Combina as médias dos tabuleiros ``partes`` = [(índice, peso)] de um candidato."""
+    indices = np.array([i for i, _ in partes])
+    pesos = np.array([peso for _, peso in partes])
+    pesos = pesos / pesos.sum()
+
+    def media(nome):
+        return float(pesos @ medias[nome][indices])
+
+    erro = math.sqrt(float((pesos ** 2 * medias["variancia_renda"][indices] / np.maximum(rollouts[indices], 1)).sum()))
+    continentes = pesos @ medias["continentes"][indices]
+    return {
+        "territorios": round(media("territorios"), 2),
+        "tropas": round(media("tropas"), 2),
+        "bonus": round(media("bonus"), 2),
+        "renda": round(media("renda"), 2),
+        "renda_erro": round(erro, 2),
+        "eliminacao": round(media("eliminacao"), 3),
+        "continentes": {
+            nome: round(float(prob), 3) for nome, prob in zip(NOMES_CONTINENTES, continentes) if prob > 0
+        },
+        "rollouts": int(rollouts[indices].sum()),
+    }
+
+
+def avaliar_jogadas(sessao, jogador=0, tempo_maximo=AVALIACAO_TEMPO_MAXIMO, rodadas=AVALIACAO_RODADAS,
+                    semente=None):
+    """Avalia cada ataque possível de ``jogador`` no tabuleiro atual da sessão.
+
+    Args:
+        sessao: GameSession na vez de ``jogador``.
+        tempo_maximo: orçamento em segundos; a primeira onda de rollouts roda sempre.
+        rodadas: horizonte dos rollouts (1 = só até o fim da rodada atual).
+        semente: semente dos rollouts (None = aleatória).
+
+    Returns:
+        dict com ``atual`` (medidas do tabuleiro de agora), ``sem_ataque``,
+        ``jogadas`` (candidatos do melhor para o pior pela renda esperada, cada
+        um com ``origem``, ``destino``, ``probabilidade_vitoria`` e ``ganho_renda``
+        sobre não atacar), ``rollouts``, ``tabuleiros`` e ``tempo_ms``.
+    """
+    inicio = time.perf_counter()
+    gs = sessao.game_state
+    genes = genes_da_sessao(sessao)
+    num_jogadores = len(genes)
+    donos = tuple(gs.donos)
+    tropas = tuple(gs.tropas)
+    perdeu = tuple(bool(gs.historico_perdas.get(j, False)) for j in range(num_jogadores))
+
+    # Candidatos mais prováveis primeiro quando há mais do que o limite
+    jogadas = GameLogic.jogadas_possiveis(gs, jogador)
+    chances = {
+        jogada: TABELA_ATAQUE.probabilidade(tropas[INDICE_TERRITORIO[jogada[0]]], tropas[INDICE_TERRITORIO[jogada[1]]])
+        for jogada in jogadas
+    }
+    jogadas = sorted(jogadas, key=lambda j: -chances[j])[:AVALIACAO_MAX_CANDIDATOS]
+
+    # Tabuleiros distintos e, por tabuleiro, o maior peso que tem em algum candidato
+    indices = {}
+    peso_maximo = []
+
+    def registrar(tabuleiro, peso):
+        i = indices.setdefault(tabuleiro, len(indices))
+        if i == len(peso_maximo):
+            peso_maximo.append(0.0)
+        peso_maximo[i] = max(peso_maximo[i], peso)
+        return i
+
+    sem_ataque = [(registrar((donos, tropas, perdeu), 1.0), 1.0)]
+    candidatos = []
+    for origem, destino in jogadas:
+        partes = {}
+        for tabuleiro, peso in resultados_ataque(donos, tropas, perdeu, origem, destino):
+            i = registrar(tabuleiro, peso)
+            partes[i] = partes.get(i, 0.0) + peso
+        candidatos.append((origem, destino, list(partes.items())))
+
+    tabuleiros = list(indices)
+    matriz_donos = np.array([t[0] for t in tabuleiros], dtype=np.int64)
+    matriz_tropas = np.array([t[1] for t in tabuleiros], dtype=np.int64)
+    matriz_perdeu = np.array([t[2] for t in tabuleiros], dtype=bool)
+
+    # Rollouts por onda proporcionais ao peso: resultados raros pesam pouco na média
+    por_onda = np.maximum(1, np.ceil(AVALIACAO_LOTE * np.array(peso_maximo))).astype(np.int64)
+    linhas = np.repeat(np.arange(len(tabuleiros)), por_onda)
+    ondas = max(1, math.ceil(AVALIACAO_MAX_ROLLOUTS / AVALIACAO_LOTE))
+    sementes = np.random.SeedSequence(semente).spawn(ondas)
+    acumulador = _Acumulador(len(tabuleiros))
+
+    duracao_onda = 0.0
+    for onda in range(ondas):
+        decorrido = time.perf_counter() - inicio
+        if onda and decorrido + duracao_onda > tempo_maximo:
+            break
+        comeco = time.perf_counter()
+        simulador = BatchSimulator(semente=sementes[onda])
+        finais_donos, finais_tropas = simulador.continuar(
+            np.broadcast_to(genes, (len(linhas), num_jogadores)),
+            matriz_donos[linhas], matriz_tropas[linhas], rodadas,
+            primeiro=jogador + 1, perdeu=matriz_perdeu[linhas],
+        )
+        acumulador.adicionar(linhas, medidas(finais_donos, finais_tropas, jogador))
+        duracao_onda = time.perf_counter() - comeco
+
+    medias = acumulador.medias()
+    base = _resumo(medias, sem_ataque, acumulador.n)
+    resultado_jogadas = []
+    for origem, destino, partes in candidatos:
+        resumo = _resumo(medias, partes, acumulador.n)
+        resultado_jogadas.append({
+            "origem": origem,
+            "destino": destino,
+            "probabilidade_vitoria": round(chances[(origem, destino)], 3),
+            **resumo,
+            "ganho_renda": round(resumo["renda"] - base["renda"], 2),
+        })
+    resultado_jogadas.sort(key=lambda j: (-j["renda"], -j["territorios"]))
+
+    atual = {nome: valor[0].item() for nome, valor in medidas(matriz_donos[:1], matriz_tropas[:1], jogador).items()
+             if nome != "continentes"}
+    return {
+        "jogador": jogador,
+        "rodadas": rodadas,
+        "atual": atual,
+        "sem_ataque": base,
+        "jogadas": resultado_jogadas,
+        "rollouts": int(acumulador.n.sum()),
+        "tabuleiros": len(tabuleiros),
+        "tempo_ms": round((time.perf_counter() - inicio) * 1000, 1),
+    }
+
+
+# ----------------------------------------------------------------------
+# Execução fora do loop do gevent
+# ----------------------------------------------------------------------
+class AvaliacoesOcupadas(Exception):
+    """O worker já roda ``AVALIACAO_MAX_SIMULTANEAS`` avaliações."""
+
+
+class ExecutorAvaliacoes:
+    """Roda ``avaliar_jogadas`` em threads nativas, sem congelar os outros greenlets do worker.
+
+    Com o ``threading`` do gevent (worker ``-k gevent``) usa o pool de threads
+    nativas do gevent e espera o resultado sem bloquear o loop; sem ele (servidor
+    de desenvolvimento, testes), um ``ThreadPoolExecutor`` comum.
+
+    A espera é limitada a ``timeout`` segundos; uma avaliação que passou do
+    tempo continua na thread até terminar (o orçamento de ``avaliar_jogadas``
+    a encerra logo) e segura a vaga até lá.
+    """
+
+    def __init__(self, max_simultaneas=AVALIACAO_MAX_SIMULTANEAS, timeout=AVALIACAO_TIMEOUT):
+        self.max_simultaneas = max_simultaneas
+        self.timeout = timeout
+        self.em_andamento = 0
+        self._trava = threading.Lock()
+        self._pool = None
+        self._pool_gevent = None
+
+    @staticmethod
+    def _usa_gevent():
+        return gevent_monkey is not None and gevent_monkey.is_module_patched("threading")
+
+    def _reservar(self):
+        with self._trava:
+            if self.em_andamento >= self.max_simultaneas:
+                raise AvaliacoesOcupadas("Avaliações ocupadas, tente novamente em instantes")
+            self.em_andamento += 1
+
+    def _liberar(self, *_):
+        with self._trava:
+            self.em_andamento -= 1
+
+    def avaliar(self, sessao, jogador=0, tempo_maximo=AVALIACAO_TEMPO_MAXIMO, semente=None):
+        """``avaliar_jogadas(sessao, jogador, tempo_maximo, semente=semente)`` numa thread nativa.
+
+        Raises:
+            AvaliacoesOcupadas: sem vaga livre no worker.
+            TimeoutError: a avaliação não terminou em ``timeout`` segundos.
+        """
+        self._reservar()
+        try:
+            if self._usa_gevent():
+                if self._pool_gevent is None:
+                    self._pool_gevent = GeventThreadPool(self.max_simultaneas)
+                tarefa = self._pool_gevent.spawn(avaliar_jogadas, sessao, jogador, tempo_maximo, semente=semente)
+            else:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.max_simultaneas, thread_name_prefix="avaliacao")
+                tarefa = self._pool.submit(avaliar_jogadas, sessao, jogador, tempo_maximo, semente=semente)
+        except BaseException:
+            self._liberar()
+            raise
+
+        # a vaga só volta quando a thread termina, mesmo depois do timeout
+        if self._usa_gevent():
+            tarefa.rawlink(self._liberar)
+            try:
+                return tarefa.get(timeout=self.timeout)
+            except GeventTimeout:
+                raise TimeoutError(f"Avaliação passou de {self.timeout}s") from None
+        tarefa.add_done_callback(self._liberar)
+        try:
+            return tarefa.result(timeout=self.timeout)
+        except FuturesTimeout:
+            raise TimeoutError(f"Avaliação passou de {self.timeout}s") from None
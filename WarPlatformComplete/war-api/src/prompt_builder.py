@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Montagem compacta dos prompts de análise de jogada.
+
+O prompt antigo interpolava o ``repr`` de um dict com a lista de territórios de
+cada jogador. Aqui o tabuleiro vira poucas linhas de texto:
+
+- jogada analisada (e, se houver, a avaliação do ``move_analyzer``);
+- continentes: quantos territórios cada jogador tem em cada um e quem domina;
+- fronteiras mais ameaçadas de quem jogou (BSTx/BSRx: tropas inimigas vizinhas
+  contra tropas próprias);
+- totais por jogador.
+
+O prompt começa sempre por ``PREFIXO_ANALISE``, texto fixo (sem nada
+interpolado, byte a byte igual em toda chamada) para o cache de prompt do
+provedor reaproveitar o prefixo; tudo que varia vem depois. As seções entram
+em ordem de prioridade até ``PROMPT_ORCAMENTO_TOKENS``.
+
+A contagem de tokens usa o ``tiktoken`` quando instalado e, sem ele, uma
+estimativa por palavras. ``python -m src.prompt_builder`` compara o tamanho do
+prompt antigo e do novo sobre estados de partidas gravados (ou simulados).
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+
+from src.config import PROMPT_ORCAMENTO_TOKENS, PROMPT_MAX_AMEACAS, LLM_MODELO
+from src.config import TERRITORIOS
+from src.game import (
+    GameLogic, GameState, INDICE_TERRITORIO, NOMES_CONTINENTES, TAMANHO_CONTINENTE, BONUS_CONTINENTE_IDX,
+    CONTINENTE_DO_TERRITORIO, ADJACENCIAS_IDX, NUM_TERRITORIOS, SEM_DONO
+)
+from src.move_analyzer import resumo_texto
+
+try:
+    import tiktoken
+except ImportError:  # opcional: sem ele a contagem é estimada
+    tiktoken = None
+
+PREFIXO_ANALISE = """
+Você é um especialista em Teoria dos Jogos que analisa jogadas de WAR, jogo de estratégia em que os jogadores \
+disputam territórios e continentes com tropas; o objetivo é conquistar o máximo de territórios, dominar \
+continentes (que rendem bônus de tropas) e eliminar os adversários.
+
+Analise a jogada descrita abaixo com base no tabuleiro resumido: por que pode ter sido feita, qual era o objetivo \
+estratégico e se foi uma decisão racional ou subótima. Compare com as alternativas e mostre como decisões \
+diferentes levariam a resultados distintos.
+
+Use conceitos como equilíbrio de Nash, estratégias dominantes e dominadas, payoff esperado, risco versus \
+recompensa, ameaças e alianças implícitas, controle de territórios críticos e fronteiras vulneráveis. Explique \
+cada termo técnico de forma intuitiva, com exemplos do cotidiano, como um professor para alunos do ensino médio, \
+e use analogias simples (por exemplo, "fortalecer uma região antes de atacar").
+
+Resposta clara e educativa, sem jargões nem matemática excessiva, com no máximo 300 palavras, em tom analítico \
+e objetivo de relatório tático e sem perguntas diretas ao jogador. Termine com uma breve conclusão sobre o que \
+poderia ser otimizado na jogada.
+
+Atenção:
+- Use apenas a seção "Jogada analisada" para identificar quem executou a jogada.
+- Quando houver chance, perda esperada e "valor" (ganho esperado do ataque em tropas), os números foram \
+calculados pelo motor do jogo: use-os em vez de estimar por conta própria.
+- "J3" abrevia "Jogador 3".
+
+"""
+
+_PALAVRAS = re.compile(r"\w+|[^\w\s]+")
+_codificador = None
+
+
+# ----------------------------------------------------------------------
+# Tokens
+# ----------------------------------------------------------------------
+def contar_tokens(texto):
+    """Tokens de ``texto`` no tokenizador do modelo (ou estimativa: ~4 caracteres por token em cada palavra)."""
+    codificador = _tokenizador()
+    if codificador is not None:
+        return len(codificador.encode(texto))
+    return sum(math.ceil(len(p) / 4) for p in _PALAVRAS.findall(texto))
+
+
+def _tokenizador():
+    """Codificador do ``tiktoken`` para ``LLM_MODELO`` (None sem o pacote ou sem o arquivo do vocabulário)."""
+    global _codificador
+    if _codificador is None:
+        _codificador = False
+        if tiktoken is not None:
+            try:
+                _codificador = tiktoken.encoding_for_model(LLM_MODELO)
+            except KeyError:
+                _codificador = tiktoken.get_encoding("o200k_base")
+            except Exception as e:  # o vocabulário é baixado no primeiro uso
+                print(f"[Prompt] tiktoken indisponível ({e}); usando estimativa de tokens")
+    return _codificador or None
+
+
+# ----------------------------------------------------------------------
+# Seções
+# ----------------------------------------------------------------------
+def vetores_do_estado(estado):
+    """(donos, tropas) a partir do dict de ``get_state_dict`` (territórios com 'dono' e 'tropas')."""
+    donos = [SEM_DONO] * NUM_TERRITORIOS
+    tropas = [0] * NUM_TERRITORIOS
+    for nome, info in estado.get("territories", {}).items():
+        i = INDICE_TERRITORIO.get(nome)
+        if i is not None:
+            donos[i] = SEM_DONO if info.get("dono") is None else info["dono"]
+            tropas[i] = info.get("tropas", 0)
+    return donos, tropas
+
+
+def descrever_acao(acao):
+    """Uma linha com a jogada (quando não há avaliação do motor local)."""
+    if not acao:
+        return "Nenhuma jogada registrada."
+    jogador = f"Jogador {acao.get('player')}"
+    if acao.get("type") == "attack":
+        resultado = "conquistou" if acao.get("success") else "não conquistou"
+        return f"{jogador} atacou {acao.get('to')} a partir de {acao.get('from')} — {resultado}."
+    if acao.get("type") == "fortify":
+        return f"{jogador} moveu {acao.get('troops')} tropa(s) de {acao.get('from')} para {acao.get('to')}."
+    return f"{jogador} não atacou neste turno."
+
+
+def linhas_continentes(gs, primeiro=None):
+    """Uma linha por continente: bônus, territórios de cada jogador e dono do bônus."""
+    ordem = list(range(len(NOMES_CONTINENTES)))
+    if primeiro is not None:
+        ordem.sort(key=lambda c: c != primeiro)
+    linhas = []
+    for c in ordem:
+        partes = []
+        dominado = None
+        for jogador_id in sorted(gs.contagem_continente):
+            n = gs.contagem_continente[jogador_id][c]
+            if n:
+                partes.append(f"J{jogador_id}={n}")
+            if n == TAMANHO_CONTINENTE[c]:
+                dominado = jogador_id
+        linha = f"{NOMES_CONTINENTES[c]} +{BONUS_CONTINENTE_IDX[c]}/{TAMANHO_CONTINENTE[c]}: {' '.join(partes)}"
+        if dominado is not None:
+            linha += " (dominado)"
+        linhas.append(linha)
+    return linhas
+
+
+def linhas_ameacas(gs, jogador_id, limite=PROMPT_MAX_AMEACAS):
+    """Fronteiras do jogador com mais tropas inimigas vizinhas por tropa própria (BSRx)."""
+    donos = gs.donos
+    tropas = gs.tropas
+    fronteiras = [i for i in gs.get_fronteiras_jogador(jogador_id) if gs.bst[i]]
+    fronteiras.sort(key=lambda i: gs.bst[i] / tropas[i] if tropas[i] else math.inf, reverse=True)
+    linhas = []
+    for i in fronteiras[:limite]:
+        por_inimigo = {}
+        for j in ADJACENCIAS_IDX[i]:
+            if donos[j] != jogador_id and donos[j] != SEM_DONO:
+                por_inimigo[donos[j]] = por_inimigo.get(donos[j], 0) + tropas[j]
+        detalhe = " ".join(f"J{d}={n}" for d, n in sorted(por_inimigo.items(), key=lambda x: -x[1]))
+        linhas.append(f"{TERRITORIOS[i]} {tropas[i]}: {detalhe}")
+    return linhas
+
+
+def linhas_jogadores(gs):
+    """Uma linha por jogador vivo: territórios/tropas (e bônus de continente, se tiver)."""
+    linhas = []
+    for j in sorted(gs.territorios_por_jogador):
+        if gs.num_territorios(j):
+            bonus = GameLogic.bonus_continentes(gs, j)
+            linhas.append(f"J{j} {gs.num_territorios(j)}/{gs.total_tropas(j)}" + (f" +{bonus}" if bonus else ""))
+    return [" ".join(linhas)] if linhas else []
+
+
+# ----------------------------------------------------------------------
+# Prompt
+# ----------------------------------------------------------------------
+def construir_prompt_analise(donos, tropas, acao, avaliacao=None, orcamento=PROMPT_ORCAMENTO_TOKENS):
+    """Prompt de análise: ``PREFIXO_ANALISE`` + seções do tabuleiro até o ``orcamento`` de tokens.
+
+    A primeira linha da jogada entra sempre; o resto de cada seção, linha a
+    linha, enquanto couber (as seções seguintes ficam de fora quando uma não cabe).
+    """
+    gs = GameState.restaurar(donos, tropas)
+    jogador_id = acao.get("player") if acao else None
+    destino = INDICE_TERRITORIO.get(acao.get("to")) if acao else None
+
+    secoes = [("Jogada analisada:", resumo_texto(avaliacao).splitlines() if avaliacao else [descrever_acao(acao)])]
+    secoes.append(("Continentes (+bônus/tamanho: territórios de cada jogador):",
+                   linhas_continentes(gs, CONTINENTE_DO_TERRITORIO[destino] if destino is not None else None)))
+    if jogador_id is not None and gs.num_territorios(jogador_id):
+        secoes.append((f"Fronteiras mais ameaçadas de J{jogador_id} (território tropas: tropas inimigas vizinhas):",
+                       linhas_ameacas(gs, jogador_id)))
+    secoes.append(("Jogadores (territórios/tropas +bônus):", linhas_jogadores(gs)))
+
+    partes = [PREFIXO_ANALISE]
+    usados = contar_tokens(PREFIXO_ANALISE)
+    for k, (titulo, linhas) in enumerate(secoes):
+        bloco = [titulo]
+        custo = contar_tokens(titulo + "\n")
+        cortou = False
+        for linha in linhas:
+            custo_linha = contar_tokens(linha + "\n")
+            if usados + custo + custo_linha > orcamento and (k > 0 or len(bloco) > 1):
+                cortou = True
+                break
+            bloco.append(linha)
+            custo += custo_linha
+        if len(bloco) == 1:
+            break
+        partes.append("\n".join(bloco) + "\n\n")
+        usados += custo
+        if cortou:
+            break
+    return "".join(partes).rstrip("\n") + "\n"
+
+
+# Instruções do prompt antigo, só como referência no benchmark
+_INSTRUCOES_ANTIGAS = """Você é um especialista em Teoria dos Jogos e Inteligência Artificial, com profundo conhecimento em jogos de estratégia como WAR. 
+Sua função é analisar criticamente o estado de um tabuleiro de WAR fornecido pelo usuário e explicar, com base na Teoria dos Jogos, 
+o raciocínio estratégico por trás de uma jogada específica que foi realizada.
+
+O jogo WAR é um jogo de estratégia onde os jogadores competem por territórios e continentes, utilizando tropas para atacar e defender. 
+As decisões tomadas pelos jogadores são influenciadas por fatores como alianças, controle de territórios e a dinâmica de poder entre os jogadores.
+
+O objetivo é adquirir o máximo de territórios possíveis, focando em dominar continentes e eliminar os adversários.
+
+Utilize conceitos como:  
+- Equilíbrio de Nash  
+- Estratégias dominantes e dominadas  
+- Payoff esperado  
+- Risco versus recompensa  
+- Ameaças e alianças implícitas  
+- Controle de territórios críticos e fronteiras vulneráveis  
+
+Ao explicar os conceitos, use uma linguagem simples e educativa, como se estivesse ensinando alunos do ensino médio. 
+Sempre que mencionar um termo técnico, explique-o de forma intuitiva e com exemplos cotidianos.
+
+Instruções:  
+Analise a jogada descrita abaixo com base no estado atual do tabuleiro. 
+Explique por que essa jogada pode ter sido feita, qual era o objetivo estratégico dela, e se foi uma decisão racional ou subótima, com base nos princípios da Teoria dos Jogos. 
+A explicação deve ter tom de professor e incentivar o aluno a refletir sobre o raciocínio por trás da jogada.
+
+Se possível, compare com alternativas que o jogador poderia ter feito e analise os possíveis desdobramentos estratégicos dessa ação.  
+Mostre como diferentes decisões poderiam levar a resultados distintos.
+
+Sua resposta deve ser clara, educativa e acessível, evitando jargões técnicos e linguagem excessivamente matemática. 
+Use analogias simples quando possível (por exemplo, comparar defender um território a “fortalecer uma região antes de atacar”). 
+Não use mais de 300 palavras.
+
+Finalize sua análise com uma breve conclusão profissional e estratégica, resumindo o que poderia ser otimizado na jogada. 
+Evite perguntas diretas ao jogador. Use um tom analítico e objetivo, semelhante ao de um relatório tático.
+
+
+Atenção:
+- Use apenas as informações da seção "Jogada analisada" para identificar quem executou a jogada.
+- O campo "jogador_que_atacou" representa o jogador que realizou a ação. 
+- O campo "current_player" no estado do jogo refere-se ao próximo jogador e não deve ser usado.
+
+"""
+
+
+def prompt_tabuleiro_completo(estado, acao):
+    """Prompt antigo (dict com a lista de territórios de cada jogador); só como referência no benchmark."""
+    tabuleiro = {}
+    for territorio, info in estado.get("territories", {}).items():
+        if info.get("dono") is not None:
+            tabuleiro.setdefault(f"Jogador {info['dono']}", []).append(territorio)
+    if acao and acao.get("type") == "attack":
+        jogada = {"jogador_que_atacou": f"Jogador {acao.get('player', 0)}", "origem": acao.get("from"),
+                  "destino": acao.get("to"), "sucesso": acao.get("success", False)}
+    else:
+        jogada = {"Nenhum ataque realizado": "Jogador não atacou neste turno"}
+    return f"\n{_INSTRUCOES_ANTIGAS}Configuração atual do tabuleiro:\n{tabuleiro}\n\nJogada analisada:\n{jogada}\n"
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+def estados_simulados(partidas, semente, intervalo=5):
+    """Estados (``get_state_dict``) a cada ``intervalo`` turnos de partidas de bots semeadas."""
+    from src.game_session import GameSession
+    for n in range(partidas):
+        random.seed(semente + n)  # genes dos bots
+        sessao = GameSession(f"bench-{n}")
+        sessao.initialize_game()
+        sessao.game_state = GameState(rng=random.Random(semente + n))
+        sessao.game_state.inicializar_tabuleiro(sessao.bots)
+        turno = 0
+        while sessao.status == "playing" and turno < 300:
+            sessao.execute_turn()
+            turno += 1
+            if turno % intervalo == 0:
+                yield sessao.get_state_dict()
+
+
+def estados_gravados(caminho):
+    """Estados de um arquivo JSON Lines (um ``get_state_dict`` ou entrada de histórico por linha)."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))]
+
+
+def main():
+    """Compara os tokens do prompt antigo e do compacto sobre vários estados de partida."""
+    parser = argparse.ArgumentParser(description="Tokens dos prompts de análise (antigo x compacto)")
+    parser.add_argument("--arquivo", help="JSON Lines com estados gravados (padrão: partidas simuladas)")
+    parser.add_argument("--partidas", type=int, default=20, help="partidas simuladas (sem --arquivo)")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--orcamento", type=int, default=PROMPT_ORCAMENTO_TOKENS)
+    args = parser.parse_args()
+
+    estados = estados_gravados(args.arquivo) if args.arquivo else estados_simulados(args.partidas, args.semente)
+    antigos, novos, cortados = [], [], 0
+    for estado in estados:
+        acao = estado.get("last_action")
+        antigos.append(contar_tokens(prompt_tabuleiro_completo(estado, acao)))
+        donos, tropas = vetores_do_estado(estado)
+        novo = construir_prompt_analise(donos, tropas, acao, orcamento=args.orcamento)
+        novos.append(contar_tokens(novo))
+        cortados += novo != construir_prompt_analise(donos, tropas, acao, orcamento=math.inf)
+    if not antigos:
+        print("Nenhum estado encontrado")
+        return
+
+    print(f"Tokenizador: {'tiktoken (' + LLM_MODELO + ')' if _tokenizador() else 'estimativa por palavras'}")
+    print(f"Estados: {len(antigos)}  orçamento: {args.orcamento}")
+    for nome, valores, prefixo in (("antigo", antigos, contar_tokens("\n" + _INSTRUCOES_ANTIGAS)),
+                                   ("compacto", novos, contar_tokens(PREFIXO_ANALISE))):
+        print(f"  {nome:9s} média {sum(valores) / len(valores):7.1f}  p50 {_percentil(valores, 0.5):5d}  "
+              f"p95 {_percentil(valores, 0.95):5d}  máx {max(valores):5d}  (instruções {prefixo}, "
+              f"tabuleiro e jogada {sum(valores) / len(valores) - prefixo:.1f})")
+    print(f"  redução média: {1 - sum(novos) / sum(antigos):.1%}  prompts cortados pelo orçamento: {cortados}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Geradores de números aleatórios explícitos para a simulação.
+
+Cada partida usa seu próprio ``random.Random``; as sementes são derivadas de
+forma hierárquica (semente mestre → geração → partida), de modo que qualquer
+partida pode ser reproduzida isoladamente e processos diferentes nunca
+compartilham estado aleatório.
+"""
+
+import hashlib
+import random
+
+
+def derivar_semente(*componentes):
+    """Deriva uma semente de 64 bits estável a partir de uma sequência de componentes.
+
+    Exemplo: ``derivar_semente(mestre, geracao, partida)``. O resultado não
+    depende do processo nem de PYTHONHASHSEED.
+    """
+    dados = ":".join(str(c) for c in componentes).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(dados).digest()[:8], "little")
+
+
+def criar_rng(*componentes):
+    """Cria um ``random.Random`` semeado com ``derivar_semente(*componentes)``."""
+    return random.Random(derivar_semente(*componentes))
+
+
+def semente_aleatoria():
+    """Sorteia uma semente mestre nova (usada quando nenhuma é informada)."""
+    return random.SystemRandom().getrandbits(64)
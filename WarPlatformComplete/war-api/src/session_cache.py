@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em processo das sessões decodificadas, na frente do Redis.
+
+Cada entrada guarda a sessão, os bytes gravados no Redis e a versão da partida
+(``game:{id}:version``, incrementada a cada gravação). A entrada só é usada se
+a versão no Redis for a mesma, então workers diferentes continuam coerentes: a
+checagem custa um GET pequeno no lugar de GET + decodificação do estado.
+
+Com ``escrita_adiada`` as alterações em sequência (auto-play) ficam só no
+cache e são gravadas juntas depois de ``max_alteracoes`` alterações ou
+``max_espera`` segundos. Enquanto isso outros workers veem a versão anterior e,
+se gravarem no meio, as alterações adiadas são descartadas; só vale ligar com
+roteamento fixo por partida (ou um único worker).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from src.config import (
+    SESSAO_CACHE_TAMANHO, SESSAO_CACHE_TTL, SESSAO_ADIAR_MAX_ALTERACOES, SESSAO_ADIAR_MAX_ESPERA
+)
+
+
+class EntradaCache:
+    """Sessão decodificada e o estado dela no Redis."""
+
+    __slots__ = ("versao", "sessao", "dados", "usada_em", "pendentes", "suja_desde")
+
+    def __init__(self, versao, sessao, dados):
+        self.versao = versao  # versão no Redis quando ``dados`` foi gravado/lido
+        self.sessao = sessao
+        self.dados = dados  # bytes gravados no Redis (None se há alterações adiadas)
+        self.usada_em = time.monotonic()
+        self.pendentes = 0  # alterações adiadas ainda não gravadas
+        self.suja_desde = None
+
+
+class CacheSessoes:
+    """LRU de ``EntradaCache`` por game_id, com validade e contadores.
+
+    As sessões guardadas são só de leitura. ``tomar`` retira a entrada do
+    cache para quem vai alterar a partida, que trabalha numa cópia e a devolve
+    com ``guardar`` depois de gravar; leituras concorrentes nesse meio tempo
+    decodificam do Redis, e quem já tinha a sessão anterior continua com ela
+    intacta.
+    """
+
+    def __init__(self, tamanho=SESSAO_CACHE_TAMANHO, ttl=SESSAO_CACHE_TTL, escrita_adiada=False,
+                 max_alteracoes=SESSAO_ADIAR_MAX_ALTERACOES, max_espera=SESSAO_ADIAR_MAX_ESPERA):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self.escrita_adiada = escrita_adiada
+        self.max_alteracoes = max_alteracoes
+        self.max_espera = max_espera
+        self.entradas = OrderedDict()
+        self.trava = threading.Lock()
+        self.contadores = {"acertos": 0, "falhas": 0, "invalidadas": 0, "expiradas": 0,
+                           "removidas_lru": 0, "escritas_adiadas": 0, "descartadas": 0}
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def contar(self, campo):
+        self.contadores[campo] += 1
+
+    def _valida(self, game_id, versao, retirar):
+        """Entrada de ``game_id`` se ainda corresponde à ``versao`` do Redis (ou None)."""
+        with self.trava:
+            entrada = self.entradas.get(game_id)
+            if entrada is None:
+                self.contar("falhas")
+                return None
+            if entrada.versao != versao:
+                del self.entradas[game_id]
+                self.contar("descartadas" if entrada.pendentes else "invalidadas")
+                self.contar("falhas")
+                return None
+            if entrada.pendentes == 0 and time.monotonic() - entrada.usada_em > self.ttl:
+                del self.entradas[game_id]
+                self.contar("expiradas")
+                self.contar("falhas")
+                return None
+            self.contar("acertos")
+            if retirar:
+                return self.entradas.pop(game_id)
+            self.entradas.move_to_end(game_id)
+            entrada.usada_em = time.monotonic()
+            return entrada
+
+    def obter(self, game_id, versao):
+        """Entrada válida para leitura (continua no cache)."""
+        return self._valida(game_id, versao, retirar=False)
+
+    def tomar(self, game_id, versao):
+        """Retira a entrada válida para alterar a sessão (devolver com ``guardar``)."""
+        return self._valida(game_id, versao, retirar=True)
+
+    def guardar(self, game_id, entrada):
+        """Põe a entrada no cache; retorna as entradas sujas expulsas pelo LRU (para gravar)."""
+        entrada.usada_em = time.monotonic()
+        expulsas = []
+        with self.trava:
+            self.entradas[game_id] = entrada
+            self.entradas.move_to_end(game_id)
+            while len(self.entradas) > self.tamanho:
+                antigo_id, antiga = self.entradas.popitem(last=False)
+                self.contar("removidas_lru")
+                if antiga.pendentes:
+                    expulsas.append((antigo_id, antiga))
+        return expulsas
+
+    def remover(self, game_id):
+        with self.trava:
+            return self.entradas.pop(game_id, None)
+
+    def adiar(self, entrada, status_mudou):
+        """True se a alteração pode ficar só no cache (e a marca como pendente)."""
+        if not self.escrita_adiada or status_mudou:
+            return False
+        agora = time.monotonic()
+        if entrada.pendentes + 1 >= self.max_alteracoes or (
+                entrada.suja_desde is not None and agora - entrada.suja_desde >= self.max_espera):
+            return False
+        entrada.pendentes += 1
+        entrada.dados = None
+        if entrada.suja_desde is None:
+            entrada.suja_desde = agora
+        self.contar("escritas_adiadas")
+        return True
+
+    def vencidas(self):
+        """game_ids com alterações adiadas há ``max_espera`` segundos ou mais."""
+        limite = time.monotonic() - self.max_espera
+        with self.trava:
+            return [game_id for game_id, entrada in self.entradas.items()
+                    if entrada.pendentes and entrada.suja_desde <= limite]
+
+    def sujas(self):
+        with self.trava:
+            return [game_id for game_id, entrada in self.entradas.items() if entrada.pendentes]
+
+    def estatisticas(self):
+        with self.trava:
+            consultas = self.contadores["acertos"] + self.contadores["falhas"]
+            return {
+                **self.contadores,
+                "tamanho": len(self.entradas),
+                "capacidade": self.tamanho,
+                "taxa_acerto": self.contadores["acertos"] / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Serialização binária compacta de GameSession (substitui o pickle no Redis).
+
+Formato (little-endian), versão 3:
+
+    cabeçalho   b"WARS" + versão (u8)
+    sessão      game_id, status, speed (texto), auto_play (u8),
+                jogador atual (u8), rodada (u32), last_action (JSON)
+    jogadores   n (u8) + por jogador: humano (u8), id (u8), gene (u16, 9 bits;
+                0xFFFF + texto para genes fora do padrão)
+    tabuleiro   presença (u8) + donos (42 x u8, dono + 1) + largura das tropas
+                (u8: 2 ou 4 bytes) + tropas (42 x u16/u32) + rodada do estado
+                (u32) + historico_perdas e tropas_disponiveis (pares id/valor)
+    histórico   intervalo de keyframes (u16), total de entradas (u32), último
+                tabuleiro registrado (donos + tropas, como acima) e as entradas
+                ainda não persistidas (n u32 + tamanho u32 + bytes; ver
+                ``src.history``). As entradas já persistidas ficam fora da sessão.
+
+Só o estado quente da partida é codificado; ``created_at`` e os demais
+metadados ficam fora (ver ``src.session_store``). Sessões gravadas antes deste
+formato continuam legíveis pelo fallback em pickle de ``src.session_store``.
+
+A decodificação não chama os construtores das classes (``__new__`` +
+atributos); o ``rng`` da partida não é persistido e é recriado ao carregar.
+"""
+
+import json
+import random
+import struct
+
+from src.bot import WarBot
+from src.config import ESTRATEGIAS
+from src.game import GameState, NUM_TERRITORIOS
+from src.game_session import GameSession, HumanPlayer
+from src.history import HistoricoPartida
+
+MAGICO = b"WARS"
+VERSAO = 3
+GENE_TEXTO = 0xFFFF
+
+
+class _Escritor:
+    """Acumula campos binários num bytearray."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def pack(self, formato, *valores):
+        self.buffer += struct.pack("<" + formato, *valores)
+
+    def texto(self, valor):
+        dados = valor.encode("utf-8")
+        self.pack("H", len(dados))
+        self.buffer += dados
+
+    def json(self, valor):
+        dados = json.dumps(valor, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self.pack("I", len(dados))
+        self.buffer += dados
+
+
+class _Leitor:
+    """Lê campos binários sequencialmente de um buffer."""
+
+    def __init__(self, dados):
+        self.dados = memoryview(dados)
+        self.pos = 0
+
+    def unpack(self, formato):
+        formato = "<" + formato
+        valores = struct.unpack_from(formato, self.dados, self.pos)
+        self.pos += struct.calcsize(formato)
+        return valores
+
+    def um(self, formato):
+        return self.unpack(formato)[0]
+
+    def bruto(self, tamanho):
+        dados = bytes(self.dados[self.pos:self.pos + tamanho])
+        self.pos += tamanho
+        return dados
+
+    def texto(self):
+        return self.bruto(self.um("H")).decode("utf-8")
+
+    def json_bruto(self):
+        return self.bruto(self.um("I"))
+
+
+def eh_sessao_binaria(dados):
+    """True se ``dados`` estão no formato deste módulo (e não em pickle)."""
+    return dados[:len(MAGICO)] == MAGICO
+
+
+# ----------------------------------------------------------------------
+# Codificação
+# ----------------------------------------------------------------------
+def codificar_sessao(sessao):
+    """Serializa uma GameSession em bytes."""
+    w = _Escritor()
+    w.buffer += MAGICO
+    w.pack("B", VERSAO)
+
+    w.texto(sessao.game_id)
+    w.texto(sessao.status)
+    w.texto(sessao.speed)
+    w.pack("BBI", bool(sessao.auto_play), sessao.current_player_index, sessao.round_number)
+    w.json(sessao.last_action)
+
+    _codificar_jogadores(w, sessao.bots)
+    _codificar_tabuleiro(w, sessao.game_state)
+    _codificar_historico(w, sessao.history)
+    return bytes(w.buffer)
+
+
+def _codificar_jogadores(w, jogadores):
+    w.pack("B", len(jogadores))
+    for jogador in jogadores:
+        humano = getattr(jogador, "is_human", False) is True
+        w.pack("BB", humano, jogador.id)
+        if humano:
+            continue
+        gene = jogador.gene
+        if isinstance(gene, str) and len(gene) == 9 and set(gene) <= {"0", "1"}:
+            w.pack("H", int(gene, 2))
+        else:
+            w.pack("H", GENE_TEXTO)
+            w.texto(str(gene))
+
+
+def _codificar_vetores(w, donos, tropas):
+    w.buffer += bytes(d + 1 for d in donos)
+    largura = 2 if max(tropas) <= 0xFFFF else 4
+    w.pack("B", largura)
+    w.pack(f"{NUM_TERRITORIOS}{'H' if largura == 2 else 'I'}", *tropas)
+
+
+def _codificar_tabuleiro(w, gs):
+    w.pack("B", gs is not None)
+    if gs is None:
+        return
+    _codificar_vetores(w, gs.donos, gs.tropas)
+    w.pack("I", gs.rodada_atual)
+    for mapa, formato in ((gs.historico_perdas, "BB"), (gs.tropas_disponiveis, "Bi")):
+        w.pack("B", len(mapa))
+        for jogador_id, valor in mapa.items():
+            w.pack(formato, jogador_id, valor)
+
+
+def _codificar_historico(w, historico):
+    w.pack("HI", historico.intervalo_keyframe, historico.total)
+    _codificar_vetores(w, historico.ultimos_donos, historico.ultimas_tropas)
+    w.pack("I", len(historico.novas))
+    for entrada in historico.novas:
+        w.pack("I", len(entrada))
+        w.buffer += entrada
+
+
+# ----------------------------------------------------------------------
+# Decodificação
+# ----------------------------------------------------------------------
+def decodificar_sessao(dados):
+    """Reconstrói uma GameSession a partir de ``codificar_sessao``."""
+    r = _Leitor(dados)
+    if r.bruto(len(MAGICO)) != MAGICO:
+        raise ValueError("Dados não estão no formato binário de sessão")
+    versao = r.um("B")
+    if versao != VERSAO:
+        raise ValueError(f"Versão de sessão não suportada: {versao}")
+
+    sessao = GameSession.__new__(GameSession)
+    sessao.game_id = r.texto()
+    sessao.status = r.texto()
+    sessao.speed = r.texto()
+    auto_play, sessao.current_player_index, sessao.round_number = r.unpack("BBI")
+    sessao.auto_play = bool(auto_play)
+    sessao.created_at = None
+    sessao.last_action = json.loads(r.json_bruto())
+
+    sessao.bots = _decodificar_jogadores(r)
+    sessao.game_state = _decodificar_tabuleiro(r, sessao.bots)
+    sessao.history = _decodificar_historico(r)
+    return sessao
+
+
+def _novo_humano(jogador_id):
+    humano = HumanPlayer.__new__(HumanPlayer)
+    humano.id = jogador_id
+    humano.is_human = True
+    humano.estrategia = humano.strategy = "Decisão manual"
+    humano.gene = "HUMANO"
+    return humano
+
+
+def _novo_bot(jogador_id, gene):
+    bot = WarBot.__new__(WarBot)
+    bot.id = jogador_id
+    bot.gene = gene
+    bot.estrategia = ESTRATEGIAS.get(gene, "Estratégia desconhecida")
+    bot.vitorias = 0
+    bot.territorios_conquistados = 0
+    bot.partidas_jogadas = 0
+    bot.fitness = 0.0
+    return bot
+
+
+def _decodificar_jogadores(r):
+    jogadores = []
+    for _ in range(r.um("B")):
+        humano, jogador_id = r.unpack("BB")
+        if humano:
+            jogadores.append(_novo_humano(jogador_id))
+            continue
+        codigo = r.um("H")
+        gene = r.texto() if codigo == GENE_TEXTO else format(codigo, "09b")
+        jogadores.append(_novo_bot(jogador_id, gene))
+    return jogadores
+
+
+def _decodificar_vetores(r):
+    donos = [d - 1 for d in r.bruto(NUM_TERRITORIOS)]
+    largura = r.um("B")
+    tropas = list(r.unpack(f"{NUM_TERRITORIOS}{'H' if largura == 2 else 'I'}"))
+    return donos, tropas
+
+
+def _decodificar_tabuleiro(r, jogadores):
+    if not r.um("B"):
+        return None
+    donos, tropas = _decodificar_vetores(r)
+    rodada_atual = r.um("I")
+    historico_perdas = {}
+    for _ in range(r.um("B")):
+        jogador_id, perdeu = r.unpack("BB")
+        historico_perdas[jogador_id] = bool(perdeu)
+    tropas_disponiveis = {}
+    for _ in range(r.um("B")):
+        jogador_id, valor = r.unpack("Bi")
+        tropas_disponiveis[jogador_id] = valor
+    return GameState.restaurar(donos, tropas, jogadores, rodada_atual, historico_perdas,
+                               tropas_disponiveis, random.Random())
+
+
+def _decodificar_historico(r):
+    historico = HistoricoPartida(intervalo_keyframe=r.um("H"))
+    historico.total = r.um("I")
+    historico.ultimos_donos, historico.ultimas_tropas = _decodificar_vetores(r)
+    historico.novas = [r.bruto(r.um("I")) for _ in range(r.um("I"))]
+    return historico
+
@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+"""
+Armazenamento das sessões de jogo no Redis, separado em chaves quentes e frias.
+
+    game:{id}           estado quente (``session_codec``): tabuleiro, jogador
+                        da vez, rodada, tropas disponíveis, genes e o resumo do
+                        histórico. É a única chave lida por /state e /next-turn.
+    game:{id}:meta      hash frio com os metadados da partida (criação, modo,
+                        configuração inicial), gravado só na criação.
+    game:{id}:history   lista fria com as entradas do histórico (``src.history``),
+                        lida sob demanda.
+    game:{id}:summary   hash com o resumo listado em /api/games (id, status,
+                        rodada, criação), atualizado a cada gravação.
+    game:{id}:version   contador incrementado a cada gravação do estado quente,
+                        usado para validar o cache em processo (``src.session_cache``).
+    game:{id}:events    canal pub/sub com os deltas de cada gravação (``src.game_events``).
+
+Todas as chaves têm o mesmo TTL, renovado a cada gravação.
+
+O registro de partidas substitui o ``KEYS game:*``: ``games:index`` é um
+sorted set dos ids pontuado pelo horário de criação e ``games:index:{status}``
+repete o mesmo índice por status, para filtrar sem varrer. Ids de partidas já
+expiradas são retirados do registro quando a listagem não encontra o resumo.
+
+Alterações concorrentes na mesma partida (vários workers/threads do gunicorn)
+passam por ``atualizar``: leitura e gravação numa transação otimista (WATCH
+em ``game:{id}``), repetida com espera exponencial quando outra requisição
+grava no meio. Opcionalmente uma trava curta por partida (``game:{id}:lock``)
+serializa as requisições antes do WATCH, evitando retrabalho sob disputa. Os
+contadores de disputa ficam no hash ``metrics:sessions``.
+
+Com um ``CacheSessoes``, as leituras reaproveitam a sessão já decodificada
+pelo worker enquanto a versão no Redis não mudar. A sessão em cache nunca é
+alterada no lugar: ``atualizar`` altera uma cópia e só a põe no cache depois
+que a transação é confirmada.
+"""
+
+import atexit
+import pickle
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from redis.exceptions import WatchError
+
+from src.config import SESSAO_TENTATIVAS, SESSAO_ESPERA_BASE, SESSAO_TRAVA_TIMEOUT, SESSAO_TRAVA_ESPERA
+from src.game_events import canal_eventos, mensagem_eventos, status_sessao
+from src.session_cache import EntradaCache
+from src.session_codec import codificar_sessao, decodificar_sessao, eh_sessao_binaria
+
+SESSION_TTL = 86400  # expira em 24h
+STATUS_SESSAO = ("waiting", "playing", "paused", "finished")
+CHAVE_REGISTRO = "games:index"
+CHAVE_METRICAS = "metrics:sessions"
+
+
+class ConflitoSessao(Exception):
+    """A partida foi alterada por outras requisições em todas as tentativas."""
+
+
+def chave_sessao(game_id):
+    return f"game:{game_id}"
+
+
+def chave_metadados(game_id):
+    return f"game:{game_id}:meta"
+
+
+def chave_historico(game_id):
+    return f"game:{game_id}:history"
+
+
+def chave_resumo(game_id):
+    return f"game:{game_id}:summary"
+
+
+def chave_versao(game_id):
+    return f"game:{game_id}:version"
+
+
+def chave_trava(game_id):
+    return f"game:{game_id}:lock"
+
+
+def chave_registro(status=None):
+    return CHAVE_REGISTRO if status is None else f"{CHAVE_REGISTRO}:{status}"
+
+
+def _versao(valor):
+    return None if valor is None else int(valor)
+
+
+def _ler_cursor(cursor):
+    """(horário, id em bytes) de um cursor ``"horário:id"`` de ``SessionStore.listar``."""
+    pontuacao, separador, game_id = cursor.partition(":")
+    if not separador or not game_id:
+        raise ValueError(f"Cursor inválido: {cursor!r}")
+    return float(pontuacao), game_id.encode()
+
+
+def decodificar(dados):
+    """Decodifica o estado quente; sessões antigas ainda podem estar em pickle."""
+    if eh_sessao_binaria(dados):
+        return decodificar_sessao(dados)
+    return pickle.loads(dados)
+
+
+class SessionStore:
+    """Lê e grava GameSession no Redis com o layout quente/frio descrito no módulo."""
+
+    def __init__(self, redis, ttl=SESSION_TTL, trava=False, tentativas=SESSAO_TENTATIVAS, cache=None):
+        self.redis = redis
+        self.ttl = ttl
+        self.trava = trava
+        self.tentativas = tentativas
+        self.cache = cache
+        self._descarga = None
+
+    def criar(self, sessao):
+        """Grava uma sessão nova: metadados frios + estado quente + histórico inicial + registro."""
+        game_id = sessao.game_id
+        sessao.created_at = sessao.created_at or datetime.now()
+        pontuacao = sessao.created_at.timestamp()
+        pipe = self.redis.pipeline()
+        pipe.hset(chave_metadados(game_id), mapping=self.metadados(sessao))
+        pipe.hset(chave_resumo(game_id), mapping={"game_id": game_id,
+                                                  "created_at": sessao.created_at.isoformat()})
+        pipe.zadd(chave_registro(), {game_id: pontuacao})
+        pipe.zadd(chave_registro(sessao.status), {game_id: pontuacao})
+        dados, versao = self._salvar(pipe, sessao)
+        self._guardar(game_id, EntradaCache(versao, self._preparar(sessao), dados))
+
+    @staticmethod
+    def metadados(sessao):
+        """Campos do hash frio de metadados."""
+        humano = any(getattr(b, "is_human", False) is True for b in sessao.bots)
+        return {
+            "created_at": (sessao.created_at or datetime.now()).isoformat(),
+            "mode": "human" if humano else "bots",
+            "genes": ",".join(str(getattr(b, "gene", "")) for b in sessao.bots),
+            "initial_speed": sessao.speed,
+            "initial_auto_play": int(bool(sessao.auto_play)),
+        }
+
+    def salvar(self, sessao):
+        """Grava o estado quente, as entradas novas do histórico e o resumo em um único round trip.
+
+        Se o status mudou desde o carregamento, a partida troca de índice de
+        status (uma leitura a mais, só nessa gravação).
+        """
+        pipe = self.redis.pipeline()
+        self._mudar_status(pipe, sessao)
+        self._salvar(pipe, sessao)
+        if self.cache is not None:
+            self.cache.remover(sessao.game_id)
+
+    def _mudar_status(self, pipe, sessao):
+        anterior = getattr(sessao, "status_registrado", sessao.status)
+        if anterior != sessao.status:
+            pontuacao = self.redis.zscore(chave_registro(), sessao.game_id)
+            if pontuacao is not None:
+                pipe.zrem(chave_registro(anterior), sessao.game_id)
+                pipe.zadd(chave_registro(sessao.status), {sessao.game_id: pontuacao})
+
+    def _salvar(self, pipe, sessao, dados=None):
+        """Enfileira a gravação em ``pipe`` e executa; retorna (bytes gravados, nova versão).
+
+        ``dados`` reaproveita uma codificação já feita pelo chamador; só vale se
+        o histórico não tinha entradas novas (elas saem da sessão antes de codificar).
+        """
+        game_id = sessao.game_id
+        historico = sessao.history
+        novas = historico.marcar_persistidas()
+        eventos = historico.marcar_publicados()
+        status = status_sessao(sessao)
+        try:
+            if novas:
+                pipe.rpush(chave_historico(game_id), *novas)
+            if eventos or status != getattr(sessao, "status_publicado", None):
+                # turnos novos, ou só o status (pausa, auto-play, velocidade...) para quem está no stream
+                pipe.publish(canal_eventos(game_id), mensagem_eventos(sessao, eventos))
+            if dados is None:
+                dados = codificar_sessao(sessao)
+            pipe.setex(chave_sessao(game_id), self.ttl, dados)
+            posicao_versao = len(pipe)
+            pipe.incr(chave_versao(game_id))
+            pipe.hset(chave_resumo(game_id), mapping={"status": sessao.status,
+                                                      "round": sessao.round_number})
+            for chave in (chave_historico(game_id), chave_metadados(game_id), chave_resumo(game_id),
+                          chave_versao(game_id)):
+                pipe.expire(chave, self.ttl)
+            resultados = pipe.execute()
+        except Exception:
+            historico.novas = novas + historico.novas
+            historico.eventos = eventos + historico.eventos
+            raise
+        sessao.status_registrado = sessao.status
+        sessao.status_publicado = status
+        return dados, resultados[posicao_versao]
+
+    def carregar(self, game_id):
+        """Carrega só o estado quente (histórico e metadados ficam sob demanda).
+
+        Com cache, versão e estado vêm na mesma transação e a sessão já
+        decodificada é reaproveitada se a versão bater. Ela é compartilhada com
+        outras requisições e não deve ser alterada (use ``atualizar``).
+        """
+        if self.cache is None:
+            return self._decodificar(game_id, self.redis.get(chave_sessao(game_id)))
+        pipe = self.redis.pipeline()
+        pipe.get(chave_versao(game_id))
+        pipe.get(chave_sessao(game_id))
+        versao, dados = pipe.execute()
+        versao = _versao(versao)
+        entrada = self.cache.obter(game_id, versao)
+        if entrada is not None:
+            return entrada.sessao
+        sessao = self._decodificar(game_id, dados)
+        if sessao is not None:
+            self._guardar(game_id, EntradaCache(versao, sessao, dados))
+        return sessao
+
+    def _decodificar(self, game_id, dados):
+        if not dados:
+            return None
+        return self._preparar(decodificar(dados))
+
+    def _preparar(self, sessao):
+        """Liga o histórico à lista no Redis e marca o status já registrado."""
+        chave = chave_historico(sessao.game_id)
+        sessao.history.carregador = lambda inicio, fim: self.redis.lrange(chave, inicio, fim)
+        sessao.status_registrado = sessao.status
+        sessao.status_publicado = status_sessao(sessao)
+        return sessao
+
+    # ------------------------------------------------------------------
+    # Alterações concorrentes
+    # ------------------------------------------------------------------
+    def atualizar(self, game_id, alterar):
+        """Carrega a partida, aplica ``alterar(sessao)`` e grava, se nada mudou no meio.
+
+        ``alterar`` pode ser chamada mais de uma vez (uma por tentativa), sempre
+        sobre o estado mais recente; a gravação é pulada quando a sessão sai
+        igual. Com ``trava`` ligada, a trava da partida é pedida antes.
+
+        Returns:
+            (sessão, retorno de ``alterar``), ou (None, None) se a partida não existe.
+
+        Raises:
+            ConflitoSessao: a partida mudou durante todas as ``tentativas``.
+        """
+        token = self._travar(game_id) if self.trava else None
+        try:
+            for tentativa in range(self.tentativas):
+                if tentativa:
+                    time.sleep(SESSAO_ESPERA_BASE * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5))
+                with self.redis.pipeline() as pipe:
+                    try:
+                        return self._tentar_atualizar(pipe, game_id, alterar)
+                    except WatchError:
+                        self.redis.hincrby(CHAVE_METRICAS, "conflitos", 1)
+            self.redis.hincrby(CHAVE_METRICAS, "esgotadas", 1)
+            raise ConflitoSessao(f"Jogo {game_id} alterado por outras requisições em "
+                                 f"{self.tentativas} tentativas")
+        finally:
+            if token:
+                self._destravar(game_id, token)
+
+    def _tentar_atualizar(self, pipe, game_id, alterar):
+        pipe.watch(chave_sessao(game_id), chave_versao(game_id))
+        entrada = versao = None
+        if self.cache is not None:
+            versao = _versao(pipe.get(chave_versao(game_id)))
+            entrada = self.cache.tomar(game_id, versao)
+        if entrada is None:
+            dados = pipe.get(chave_sessao(game_id))
+            sessao = self._decodificar(game_id, dados)
+            if sessao is None:
+                return None, None
+            entrada = EntradaCache(versao, sessao, dados)
+        else:
+            entrada = self._copiar(entrada)
+        sessao = entrada.sessao
+        # a entrada só volta ao cache depois de gravada (ou adiada); se ``alterar``
+        # falhar ou a transação for descartada, o cache fica sem ela
+        resultado = alterar(sessao)
+
+        dados = None
+        if entrada.dados is not None and not sessao.history.novas:
+            dados = codificar_sessao(sessao)
+        if dados is not None and dados == entrada.dados:
+            pipe.unwatch()
+            self.redis.hincrby(CHAVE_METRICAS, "sem_alteracao", 1)
+            self._guardar(game_id, entrada)
+            return sessao, resultado
+        if self.cache is not None and self.cache.adiar(entrada, sessao.status != sessao.status_registrado):
+            pipe.unwatch()
+            self._guardar(game_id, entrada)
+            return sessao, resultado
+
+        pipe.multi()
+        self._mudar_status(pipe, sessao)
+        pipe.hincrby(CHAVE_METRICAS, "gravacoes", 1)
+        entrada.dados, entrada.versao = self._salvar(pipe, sessao, dados)
+        entrada.pendentes = 0
+        entrada.suja_desde = None
+        self._guardar(game_id, entrada)
+        return sessao, resultado
+
+    # ------------------------------------------------------------------
+    # Cache em processo e escrita adiada
+    # ------------------------------------------------------------------
+    def _copiar(self, entrada):
+        """Entrada com uma cópia da sessão do cache, para alterar sem afetar quem já a leu.
+
+        A sessão em cache é compartilhada com as leituras (``carregar``) e nunca é
+        alterada no lugar; a cópia sai dos bytes gravados (ou da sessão, se há
+        alterações adiadas) e mantém os deltas ainda não publicados.
+        """
+        original = entrada.sessao
+        dados = entrada.dados if entrada.dados is not None else codificar_sessao(original)
+        copia = self._preparar(decodificar_sessao(dados))
+        copia.status_registrado = original.status_registrado
+        copia.status_publicado = original.status_publicado
+        copia.history.eventos = list(original.history.eventos)
+        nova = EntradaCache(entrada.versao, copia, entrada.dados)
+        nova.pendentes = entrada.pendentes
+        nova.suja_desde = entrada.suja_desde
+        return nova
+
+    def _guardar(self, game_id, entrada):
+        """Devolve a entrada ao cache e grava as entradas sujas que o LRU expulsar."""
+        if self.cache is None or entrada.versao is None:
+            return
+        for expulsa_id, expulsa in self.cache.guardar(game_id, entrada):
+            self._gravar_adiada(expulsa_id, expulsa)
+
+    def descarregar(self, game_id=None):
+        """Grava as alterações adiadas de ``game_id`` (ou de todas as partidas no cache)."""
+        if self.cache is None:
+            return
+        for gid in [game_id] if game_id is not None else self.cache.sujas():
+            entrada = self.cache.remover(gid)
+            if entrada is not None and entrada.pendentes:
+                self._gravar_adiada(gid, entrada)
+            elif entrada is not None:
+                self._guardar(gid, entrada)
+
+    def _gravar_adiada(self, game_id, entrada):
+        """Grava uma entrada suja se a versão no Redis ainda é a dela; senão a descarta."""
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(chave_sessao(game_id), chave_versao(game_id))
+                if _versao(pipe.get(chave_versao(game_id))) != entrada.versao:
+                    pipe.unwatch()
+                    self.cache.contar("descartadas")
+                    return
+                pipe.multi()
+                self._mudar_status(pipe, entrada.sessao)
+                pipe.hincrby(CHAVE_METRICAS, "gravacoes", 1)
+                entrada.dados, entrada.versao = self._salvar(pipe, entrada.sessao)
+            except WatchError:
+                self.cache.contar("descartadas")
+                return
+        entrada.pendentes = 0
+        entrada.suja_desde = None
+        self._guardar(game_id, entrada)
+
+    def iniciar_descarga(self):
+        """Com escrita adiada, grava em segundo plano as partidas paradas há ``max_espera``."""
+        if self.cache is None or not self.cache.escrita_adiada or self._descarga is not None:
+            return
+
+        def descarregar_vencidas():
+            while True:
+                time.sleep(self.cache.max_espera / 2)
+                for game_id in self.cache.vencidas():
+                    try:
+                        self.descarregar(game_id)
+                    except Exception as e:
+                        print(f"[Redis] Falha ao gravar alterações adiadas do jogo {game_id}: {e}")
+
+        self._descarga = threading.Thread(target=descarregar_vencidas, name="descarga-sessoes", daemon=True)
+        self._descarga.start()
+        atexit.register(self.descarregar)
+
+    def _travar(self, game_id):
+        """Pede a trava da partida; retorna o token, ou None se esgotar a espera."""
+        token = uuid.uuid4().hex
+        limite = time.monotonic() + SESSAO_TRAVA_ESPERA
+        espera = SESSAO_ESPERA_BASE
+        while not self.redis.set(chave_trava(game_id), token, nx=True, px=int(SESSAO_TRAVA_TIMEOUT * 1000)):
+            if time.monotonic() >= limite:
+                # segue só com o controle otimista, que continua garantindo a consistência
+                self.redis.hincrby(CHAVE_METRICAS, "travas_esgotadas", 1)
+                return None
+            time.sleep(espera)
+            espera = min(espera * 2, 0.2)
+        return token
+
+    def _destravar(self, game_id, token):
+        """Libera a trava só se ainda for deste token (pode ter expirado e sido retomada)."""
+        chave = chave_trava(game_id)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(chave)
+                if pipe.get(chave) == token.encode():
+                    pipe.multi()
+                    pipe.delete(chave)
+                    pipe.execute()
+            except WatchError:
+                pass
+
+    def metricas(self):
+        """Contadores de gravação e disputa acumulados por todos os workers."""
+        return {k.decode(): int(v) for k, v in self.redis.hgetall(CHAVE_METRICAS).items()}
+
+    def carregar_metadados(self, game_id):
+        """Hash frio de metadados, com ``created_at`` como datetime (ou None)."""
+        bruto = self.redis.hgetall(chave_metadados(game_id))
+        metadados = {k.decode(): v.decode() for k, v in bruto.items()}
+        if "created_at" in metadados:
+            metadados["created_at"] = datetime.fromisoformat(metadados["created_at"])
+        return metadados
+
+    def excluir(self, game_id):
+        if self.cache is not None:
+            self.cache.remover(game_id)
+        pipe = self.redis.pipeline()
+        pipe.delete(chave_sessao(game_id), chave_metadados(game_id), chave_historico(game_id),
+                    chave_resumo(game_id), chave_versao(game_id))
+        self._desregistrar(pipe, [game_id])
+        pipe.execute()
+
+    @staticmethod
+    def _desregistrar(pipe, game_ids):
+        for status in (None,) + STATUS_SESSAO:
+            pipe.zrem(chave_registro(status), *game_ids)
+
+    # ------------------------------------------------------------------
+    # Registro de partidas
+    # ------------------------------------------------------------------
+    def listar(self, limite=50, cursor=None, status=None):
+        """Resumos das partidas, da mais nova para a mais antiga.
+
+        No registro, partidas com o mesmo horário de criação ficam em ordem
+        decrescente de id; o cursor guarda os dois (``"horário:id"``), de modo
+        que a página seguinte começa exatamente depois da última partida
+        listada, sem repetir nem pular empates.
+
+        Args:
+            limite: máximo de partidas na página.
+            cursor: ``next_cursor`` da página anterior; None para começar do início.
+            status: filtra por um dos ``STATUS_SESSAO``.
+
+        Returns:
+            (resumos, próximo cursor ou None se não houver mais páginas).
+
+        Raises:
+            ValueError: cursor malformado.
+        """
+        chave = chave_registro(status)
+        if cursor is None:
+            ids = self.redis.zrevrangebyscore(chave, "+inf", "-inf", start=0, num=limite, withscores=True)
+        else:
+            pontuacao, ultimo = _ler_cursor(cursor)
+            pipe = self.redis.pipeline()
+            pipe.zrevrangebyscore(chave, pontuacao, pontuacao, withscores=True)
+            pipe.zrevrangebyscore(chave, f"({pontuacao!r}", "-inf", start=0, num=limite, withscores=True)
+            empatados, anteriores = pipe.execute()
+            ids = ([(game_id, p) for game_id, p in empatados if game_id < ultimo] + anteriores)[:limite]
+        if not ids:
+            return [], None
+
+        pipe = self.redis.pipeline()
+        for game_id, _ in ids:
+            pipe.hgetall(chave_resumo(game_id.decode()))
+        resumos = []
+        expiradas = []
+        for (game_id, _), bruto in zip(ids, pipe.execute()):
+            if not bruto:
+                expiradas.append(game_id)
+                continue
+            resumo = {k.decode(): v.decode() for k, v in bruto.items()}
+            resumo["round"] = int(resumo.get("round", 0))
+            resumos.append(resumo)
+        if expiradas:
+            pipe = self.redis.pipeline()
+            self._desregistrar(pipe, expiradas)
+            pipe.execute()
+
+        ultimo, pontuacao = ids[-1]
+        proximo = f"{pontuacao!r}:{ultimo.decode()}" if len(ids) == limite else None
+        return resumos, proximo
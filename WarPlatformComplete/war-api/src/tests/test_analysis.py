@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Pipeline de análises: cache, deduplicação, limites e erros, com o backend local."""
+import random
+
+import fakeredis
+import pytest
+
+from src.analysis import (
+    PipelineAnalises, BackendLocal, LimiteAnalises, FilaAnalisesCheia, chave_analise, chave_resultado,
+    chave_em_andamento
+)
+from src.game_session import GameSession
+from src.move_analyzer import avaliar_jogada
+from src.session_store import SessionStore
+
+
+class BackendContado(BackendLocal):
+    """Backend local que conta as chamadas e pode falhar nas primeiras."""
+
+    def __init__(self, atraso=0.0, falhas=0):
+        super().__init__(atraso)
+        self.chamadas = 0
+        self.falhas = falhas
+
+    def analisar(self, avaliacao, tabuleiro=None):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas:
+            raise RuntimeError("modelo indisponível")
+        return super().analisar(avaliacao, tabuleiro)
+
+
+def nova_sessao(turnos=4):
+    random.seed(3)
+    sessao = GameSession("analise")
+    sessao.initialize_game()
+    for _ in range(turnos):
+        sessao.execute_turn()
+    return sessao
+
+
+def pipeline(backend=None, **opcoes):
+    return PipelineAnalises(fakeredis.FakeRedis(), backend or BackendContado(), **opcoes)
+
+
+def test_resultado_fica_em_cache():
+    p = pipeline()
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+
+    job = p.solicitar(sessao, avaliacao, "cliente")
+    assert job["status"] == "pending" and not job["coalesced"]
+    feito = p.aguardar(job["job_id"], 5)
+    assert feito["status"] == "done"
+    assert feito["result"]["analysis"] == BackendLocal().analisar(avaliacao)
+
+    de_novo = p.solicitar(sessao, avaliacao, "outro")
+    assert de_novo == {"status": "done", "cached": True, "result": feito["result"]}
+    assert p.backend.chamadas == 1
+
+
+def test_pedidos_iguais_compartilham_o_job():
+    p = pipeline(BackendContado(atraso=0.3))
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+
+    primeiro = p.solicitar(sessao, avaliacao, "a")
+    segundo = p.solicitar(sessao, avaliacao, "b")
+    assert segundo == {"status": "pending", "job_id": primeiro["job_id"], "coalesced": True}
+    assert p.aguardar(primeiro["job_id"], 5)["status"] == "done"
+    assert p.backend.chamadas == 1
+    assert p.redis.get(chave_em_andamento(chave_analise(sessao.game_state, sessao.last_action, "local"))) is None
+
+
+def test_limite_por_cliente_so_conta_analises_novas():
+    p = pipeline(limite_por_minuto=2)
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    for i in range(2):
+        sessao.last_action = {**sessao.last_action, "variante": i}
+        p.aguardar(p.solicitar(sessao, avaliacao, "cliente")["job_id"], 5)
+
+    assert p.solicitar(sessao, avaliacao, "cliente")["status"] == "done"  # cache não conta
+    sessao.last_action = {**sessao.last_action, "variante": 2}
+    with pytest.raises(LimiteAnalises):
+        p.solicitar(sessao, avaliacao, "cliente")
+    assert p.solicitar(sessao, avaliacao, "outro cliente")["status"] == "pending"
+
+
+def test_fila_cheia_libera_a_chave():
+    p = pipeline(BackendContado(atraso=0.3), fila_maxima=1)
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    primeiro = p.solicitar(sessao, avaliacao, "a")
+
+    sessao.last_action = {**sessao.last_action, "variante": 1}
+    with pytest.raises(FilaAnalisesCheia):
+        p.solicitar(sessao, avaliacao, "a")
+    assert p.redis.get(chave_em_andamento(chave_analise(sessao.game_state, sessao.last_action, "local"))) is None
+    assert p.aguardar(primeiro["job_id"], 5)["status"] == "done"
+
+
+def test_erro_nao_vai_para_o_cache():
+    p = pipeline(BackendContado(falhas=1))
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    chave = chave_analise(sessao.game_state, sessao.last_action, "local")
+
+    falhou = p.aguardar(p.solicitar(sessao, avaliacao, "a")["job_id"], 5)
+    assert falhou["status"] == "error" and "indisponível" in falhou["error"]
+    assert p.redis.get(chave_resultado(chave)) is None
+    assert p.redis.get(chave_em_andamento(chave)) is None
+
+    nova = p.solicitar(sessao, avaliacao, "a")
+    assert nova["status"] == "pending"
+    assert p.aguardar(nova["job_id"], 5)["status"] == "done"
+
+
+def test_stream_grava_no_cache_e_vira_o_job_da_chave():
+    p = pipeline()
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+
+    cache, pedacos = p.transmitir(sessao, avaliacao, "a")
+    assert cache is None
+    primeiro = next(pedacos)
+    no_meio = p.solicitar(sessao, avaliacao, "b")  # chega enquanto o stream está aberto
+    assert no_meio["status"] == "pending" and no_meio["coalesced"]
+    texto = primeiro + "".join(pedacos)
+
+    assert texto.strip() == BackendLocal().analisar(avaliacao).strip()
+    assert p.consultar(no_meio["job_id"])["status"] == "done"
+    assert p.transmitir(sessao, avaliacao, "c")[0]["cached"] is True
+    assert p.backend.chamadas == 1
+
+
+def test_stream_espera_a_analise_igual_em_andamento():
+    p = pipeline(BackendContado(atraso=0.3))
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+
+    p.solicitar(sessao, avaliacao, "a")
+    cache, pedacos = p.transmitir(sessao, avaliacao, "b")
+    assert cache is None
+    assert "".join(pedacos) == BackendLocal().analisar(avaliacao)
+    assert p.backend.chamadas == 1
+
+
+def test_stream_ocupa_uma_vaga_do_pool():
+    p = pipeline(max_simultaneas=1)
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    _, pedacos = p.transmitir(sessao, avaliacao, "a")
+    next(pedacos)  # stream em andamento segura a única vaga
+
+    sessao.last_action = {**sessao.last_action, "variante": 1}
+    job = p.solicitar(sessao, avaliacao, "a")
+    assert p.aguardar(job["job_id"], 0.3)["status"] == "pending"
+    list(pedacos)
+    assert p.aguardar(job["job_id"], 5)["status"] == "done"
+
+
+def test_stream_respeita_fila_e_limite():
+    p = pipeline(BackendContado(atraso=0.3), fila_maxima=1, limite_por_minuto=2)
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    p.solicitar(sessao, avaliacao, "a")
+
+    sessao.last_action = {**sessao.last_action, "variante": 1}
+    with pytest.raises(FilaAnalisesCheia):
+        p.transmitir(sessao, avaliacao, "a")
+    assert p.redis.get(chave_em_andamento(chave_analise(sessao.game_state, sessao.last_action, "local"))) is None
+
+    sessao.last_action = {**sessao.last_action, "variante": 2}
+    with pytest.raises(LimiteAnalises):
+        p.transmitir(sessao, avaliacao, "a")
+
+
+def test_stream_interrompido_libera_a_chave_sem_cache():
+    p = pipeline()
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    chave = chave_analise(sessao.game_state, sessao.last_action, "local")
+    _, pedacos = p.transmitir(sessao, avaliacao, "a")
+    next(pedacos)
+    pedacos.close()  # cliente desconectou
+
+    assert p.redis.get(chave_em_andamento(chave)) is None
+    assert p.redis.get(chave_resultado(chave)) is None
+    assert p._pendentes == 0
+    assert p.solicitar(sessao, avaliacao, "a")["coalesced"] is False
+
+
+def test_stream_fechado_antes_de_comecar_libera_vaga_e_chave():
+    p = pipeline(fila_maxima=1)
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    chave = chave_analise(sessao.game_state, sessao.last_action, "local")
+    _, pedacos = p.transmitir(sessao, avaliacao, "a")
+    assert p._pendentes == 1
+    pedacos.close()  # cliente desconectou antes do corpo da resposta
+    pedacos.close()
+
+    assert p._pendentes == 0
+    assert p.redis.get(chave_em_andamento(chave)) is None
+    assert p.backend.chamadas == 0
+    assert "".join(p.transmitir(sessao, avaliacao, "a")[1]) == BackendLocal().analisar(avaliacao)
+    assert p._pendentes == 0
+
+
+def test_rota_de_stream_libera_a_vaga_sem_ler_o_corpo(monkeypatch):
+    import src.main as main
+    p = pipeline(fila_maxima=1)
+    store = SessionStore(p.redis)
+    monkeypatch.setattr(main, "store", store)
+    monkeypatch.setattr(main, "analysis_pipeline", p)
+    sessao = nova_sessao()
+    store.criar(sessao)
+
+    with main.app.test_request_context("/api/game/analise/analyze-move/stream", method="POST"):
+        resposta = main.analyze_move_stream("analise")
+    assert resposta.status_code == 200 and p._pendentes == 1
+    resposta.close()  # o servidor fecha a resposta sem ter lido o corpo
+    assert p._pendentes == 0
+
+
+def test_reserva_tenta_de_novo_se_a_chave_some_entre_o_set_e_a_leitura(monkeypatch):
+    p = pipeline()
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    original = p.redis.set
+    recusas = []
+
+    def set_disputado(nome, valor, **opcoes):
+        if opcoes.get("nx") and not recusas:
+            recusas.append(nome)  # outro pedido reservou e já liberou a chave
+            return None
+        return original(nome, valor, **opcoes)
+
+    monkeypatch.setattr(p.redis, "set", set_disputado)
+    job = p.solicitar(sessao, avaliacao, "a")
+    assert recusas and job["coalesced"] is False
+    chave = chave_analise(sessao.game_state, sessao.last_action, "local")
+    assert p.redis.get(chave_em_andamento(chave)) in (job["job_id"].encode(), None)
+    assert p.aguardar(job["job_id"], 5)["status"] == "done"
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Tabelas memoizadas de ataque conferidas contra a fórmula direta."""
+import random
+
+import pytest
+
+from src.attack_table import TabelaAtaque, FAIXA_VITORIA, FAIXA_DERROTA
+
+
+def chance_pela_formula(a, d):
+    if a <= 1:
+        return 0.0
+    return max(0.1, min(0.9, 1 / (1 + (d / a) ** 1.5)))
+
+
+def test_probabilidade_igual_a_formula_inclusive_apos_crescer():
+    tabela = TabelaAtaque(tamanho_inicial=4)
+    for a in range(0, 80):
+        for d in range(0, 80, 3):
+            assert tabela.probabilidade(a, d) == chance_pela_formula(a, d)
+
+
+@pytest.mark.parametrize("faixa", [FAIXA_VITORIA, FAIXA_DERROTA])
+def test_sortear_perda_igual_ao_arredondamento_do_uniforme(faixa):
+    tabela = TabelaAtaque()
+    lo, hi = faixa
+    rng = random.Random(7)
+    for n in range(0, 120):
+        for _ in range(50):
+            r = rng.random()
+            assert tabela.sortear_perda(n, faixa, r) == int(round(n * (lo + (hi - lo) * r))), (n, r)
+
+
+@pytest.mark.parametrize("faixa", [FAIXA_VITORIA, FAIXA_DERROTA])
+def test_distribuicao_perda_soma_um_e_cobre_a_faixa(faixa):
+    tabela = TabelaAtaque()
+    for n in range(1, 60):
+        distribuicao = tabela.distribuicao_perda(n, faixa)
+        assert sum(q for _, q in distribuicao) == pytest.approx(1.0)
+        assert all(q >= 0 for _, q in distribuicao)
+        perdas = [k for k, _ in distribuicao]
+        assert perdas == list(range(perdas[0], perdas[-1] + 1))
+
+
+def test_esperanca_bate_com_a_media_simulada():
+    tabela = TabelaAtaque()
+    a, d = 9, 6
+    esperado = tabela.esperanca(a, d)
+    assert esperado['probabilidade_vitoria'] == chance_pela_formula(a, d)
+
+    rng = random.Random(11)
+    total, amostras = 0, 40000
+    for _ in range(amostras):
+        if rng.random() < esperado['probabilidade_vitoria']:
+            perda = tabela.sortear_perda(d, FAIXA_VITORIA, rng.random())
+            restantes = 1 + max(1, a - perda - 1)
+        else:
+            perda = tabela.sortear_perda(a, FAIXA_DERROTA, rng.random())
+            restantes = max(1, a - perda)
+        total += a - restantes
+    assert total / amostras == pytest.approx(esperado['perda_esperada'], abs=0.05)
+    assert tabela.esperanca(a, d) is esperado  # memoizada
+
+
+def test_matrizes_numpy_iguais_as_consultas_escalares():
+    np = pytest.importorskip("numpy")
+    tabela = TabelaAtaque(tamanho_inicial=4)
+    matriz = tabela.matriz_probabilidade(20, 30)
+    assert matriz[12, 25] == tabela.probabilidade(12, 25)
+
+    base, limiares = tabela.limiares_numpy(40, FAIXA_DERROTA)
+    r = np.linspace(0, 0.999, 37)
+    for n in (0, 1, 7, 40):
+        vetorial = base[n] + (limiares[n] <= r[:, None]).sum(axis=1)
+        assert list(vetorial) == [tabela.sortear_perda(n, FAIXA_DERROTA, x) for x in r]
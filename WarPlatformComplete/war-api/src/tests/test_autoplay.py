@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Agenda do auto-play no servidor e /control concorrente com um turno em andamento."""
+import random
+
+import fakeredis
+import pytest
+
+import src.autoplay as autoplay
+from src.autoplay import CHAVE_AGENDA, EscalonadorAutoPlay, chave_arrendamento
+from src.game_session import GameSession
+from src.session_store import SessionStore
+
+
+@pytest.fixture
+def api(monkeypatch):
+    import src.main as main
+    store = SessionStore(fakeredis.FakeRedis())
+    monkeypatch.setattr(main, "store", store)
+    main.app.config["TESTING"] = True
+    return main.app.test_client(), store
+
+
+def criar_partida(store, status="playing", auto_play=True):
+    random.seed(1)
+    sessao = GameSession("auto")
+    sessao.initialize_game()
+    sessao.auto_play = auto_play
+    sessao.status = status
+    store.criar(sessao)
+    return sessao
+
+
+def escalonador(store):
+    esc = EscalonadorAutoPlay(store)
+    esc.arrendadas.add("auto")
+    store.redis.set(chave_arrendamento("auto"), esc.token)
+    return esc
+
+
+def test_turno_agendado_avanca_e_reagenda(api):
+    _, store = api
+    criar_partida(store)
+    store.redis.zadd(CHAVE_AGENDA, {"auto": 0})
+    esc = escalonador(store)
+
+    esc._executar("auto")
+    assert esc.turnos == 1
+    assert store.carregar("auto").history.total == 2
+    assert store.redis.zscore(CHAVE_AGENDA, "auto") > 0
+
+
+def test_control_agenda_so_depois_de_gravar(api, monkeypatch):
+    cliente, store = api
+    criar_partida(store, status="paused")
+    agendas = []
+    original = autoplay.sincronizar_agenda
+
+    def sincronizar(redis, sessao):
+        agendas.append(SessionStore(redis).carregar(sessao.game_id).status)
+        original(redis, sessao)
+
+    import src.main as main
+    monkeypatch.setattr(main, "sincronizar_agenda", sincronizar)
+    resposta = cliente.post("/api/game/auto/control", json={"action": "resume"})
+    assert resposta.status_code == 200
+    assert agendas == ["playing"]  # uma vez, com a retomada já gravada
+    assert store.redis.zscore(CHAVE_AGENDA, "auto") is not None
+
+
+def test_retomada_durante_turno_agendado_nao_trava_o_auto_play(api, monkeypatch):
+    cliente, store = api
+    criar_partida(store, status="paused")
+    store.redis.zadd(CHAVE_AGENDA, {"auto": 0})  # turno agendado antes da pausa
+    esc = escalonador(store)
+    original = autoplay._jogar_turno
+
+    def turno_com_retomada_no_meio(sessao):
+        continuar = original(sessao)  # ainda vê a partida pausada
+        resposta = cliente.post("/api/game/auto/control", json={"action": "resume"})
+        assert resposta.status_code == 200
+        return continuar
+
+    monkeypatch.setattr(autoplay, "_jogar_turno", turno_com_retomada_no_meio)
+    esc._executar("auto")
+
+    assert store.carregar("auto").status == "playing"
+    assert store.redis.zscore(CHAVE_AGENDA, "auto") is not None
+
+    monkeypatch.setattr(autoplay, "_jogar_turno", original)
+    assert esc._arrendar("auto")
+    esc._executar("auto")
+    assert esc.turnos == 1
+
+
+def test_pausa_tira_da_agenda(api):
+    cliente, store = api
+    criar_partida(store)
+    store.redis.zadd(CHAVE_AGENDA, {"auto": 0})
+    assert cliente.post("/api/game/auto/control", json={"action": "pause"}).status_code == 200
+    assert store.redis.zscore(CHAVE_AGENDA, "auto") is None
+
+    esc = escalonador(store)
+    esc._executar("auto")
+    assert esc.turnos == 0
+    assert store.redis.zscore(CHAVE_AGENDA, "auto") is None
+    assert store.redis.get(chave_arrendamento("auto")) is None
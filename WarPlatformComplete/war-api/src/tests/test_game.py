@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Tabuleiro em vetores (donos/tropas) e índices incrementais do GameState."""
+import pickle
+import random
+
+import pytest
+
+from src.bot import WarBot
+from src.config import TERRITORIOS
+from src.game import GameState, GameLogic, INDICE_TERRITORIO, SEM_DONO
+from src.genetic_algorithm import GeneticAlgorithm
+
+
+def novo_estado(semente=0, num_jogadores=6):
+    bots = [WarBot(i, "110100011") for i in range(num_jogadores)]
+    gs = GameState(random.Random(semente))
+    gs.inicializar_tabuleiro(bots)
+    return gs, bots
+
+
+def test_fachada_territorios_escreve_nos_vetores():
+    gs, _ = novo_estado()
+    nome = TERRITORIOS[5]
+    gs.territorios[nome]['tropas'] = 9
+    gs.territorios[nome]['dono'] = 3
+
+    assert gs.tropas[5] == 9 and gs.donos[5] == 3
+    assert gs.territorios[nome] == {'dono': 3, 'tropas': 9}
+    assert 5 in gs.territorios_por_jogador[3]
+
+
+def test_territorios_dict_e_uma_copia():
+    gs, _ = novo_estado()
+    copia = gs.territorios_dict()
+    copia[TERRITORIOS[0]]['tropas'] = 999
+    assert gs.tropas[0] != 999
+    assert set(copia) == set(TERRITORIOS)
+
+
+def test_sessao_antiga_em_dicionario_e_migrada():
+    gs, _ = novo_estado()
+    antigo = {
+        'territorios': {t: {'dono': gs.donos[i], 'tropas': gs.tropas[i]} for i, t in enumerate(TERRITORIOS)},
+        'jogadores': [], 'rodada_atual': 4, 'historico_perdas': {}, 'tropas_disponiveis': {},
+    }
+    antigo['territorios'][TERRITORIOS[1]]['dono'] = None
+
+    migrado = GameState.__new__(GameState)
+    migrado.__setstate__(antigo)
+
+    assert migrado.donos[1] == SEM_DONO
+    assert migrado.donos[2:] == gs.donos[2:] and migrado.tropas == gs.tropas
+    assert migrado.rodada_atual == 4
+    assert migrado.num_territorios(gs.donos[0]) >= 1
+
+
+def test_partida_semeada_e_reproduzivel():
+    bots = [WarBot(i, gene) for i, gene in enumerate(["110100011", "001010101", "111000110",
+                                                       "100100100", "010011001", "101110111"])]
+    resultados = [GeneticAlgorithm._simular_partida(bots, random.Random(42)) for _ in range(2)]
+    assert resultados[0] == resultados[1]
+
+
+def conferir_indices(gs):
+    """Os índices incrementais batem com os reconstruídos do zero a partir dos vetores."""
+    referencia = GameState.restaurar(gs.donos, gs.tropas)
+
+    def nao_vazios(indice):  # jogadores eliminados podem ficar com entradas vazias (ou zeradas)
+        return {j: v for j, v in indice.items() if (any(v) if isinstance(v, list) else v)}
+
+    for nome in ("territorios_por_jogador", "contagem_continente", "fronteiras_por_jogador"):
+        assert nao_vazios(getattr(gs, nome)) == nao_vazios(getattr(referencia, nome)), nome
+    assert gs.bst == referencia.bst
+    assert gs.vizinhos_inimigos == referencia.vizinhos_inimigos
+    for jogador in referencia.territorios_por_jogador:
+        assert gs.total_tropas(jogador) == referencia.total_tropas(jogador)
+
+
+def test_indices_incrementais_acompanham_ataques_e_redistribuicao():
+    gs, bots = novo_estado(semente=3)
+    rng = random.Random(3)
+    for _ in range(60):
+        for bot in bots:
+            GameLogic.distribuir_tropas(gs, bot.id, GameLogic.calcular_unidades_recebidas(gs, bot.id))
+            jogadas = GameLogic.jogadas_possiveis(gs, bot.id)
+            if jogadas:
+                GameLogic.executar_ataque(gs, *rng.choice(jogadas), rng)
+            GameLogic.redistribuir_tropas(gs, bot.id)
+    conferir_indices(gs)
+
+
+def test_copia_e_pickle_preservam_o_tabuleiro():
+    gs, _ = novo_estado(semente=5)
+    for outro in (gs.copy(), pickle.loads(pickle.dumps(gs))):
+        assert outro.donos == gs.donos and outro.tropas == gs.tropas
+        conferir_indices(outro)
+    assert INDICE_TERRITORIO[TERRITORIOS[7]] == 7
+
+
+def tabuleiro_com(territorios_do_jogador, tropas=5):
+    """Jogador 0 dono dos territórios dados; jogador 1 dono do resto."""
+    donos = [0 if t in territorios_do_jogador else 1 for t in TERRITORIOS]
+    return GameState.restaurar(donos, [tropas] * len(TERRITORIOS))
+
+
+def test_mover_tropas_aceita_destino_conectado_por_territorios_proprios():
+    gs = tabuleiro_com({'Alasca', 'Mackenzie', 'Ottawa'})
+    GameLogic.mover_tropas(gs, 0, 'Alasca', 'Ottawa', 3)  # não vizinhos, ligados por Mackenzie
+    assert gs.get_tropas('Alasca') == 2 and gs.get_tropas('Ottawa') == 8
+    assert gs.total_tropas(0) == 15
+
+
+def test_mover_tropas_recusa_caminho_interrompido_e_quantidades_invalidas():
+    gs = tabuleiro_com({'Alasca', 'Mackenzie', 'Ottawa'})
+    gs.definir_dono(INDICE_TERRITORIO['Mackenzie'], 1)  # corta o caminho e invalida as componentes
+    with pytest.raises(ValueError, match="conectado"):
+        GameLogic.mover_tropas(gs, 0, 'Alasca', 'Ottawa', 1)
+    with pytest.raises(ValueError):
+        GameLogic.mover_tropas(gs, 0, 'Alasca', 'Vancouver', 1)  # território inimigo
+    with pytest.raises(ValueError):
+        GameLogic.mover_tropas(gs, 0, 'Alasca', 'Alasca', 5)  # não pode esvaziar a origem
+
+    gs.definir_dono(INDICE_TERRITORIO['Mackenzie'], 0)
+    GameLogic.mover_tropas(gs, 0, 'Alasca', 'Ottawa', 4)
+    assert gs.get_tropas('Alasca') == 1
+
+
+def test_componentes_tratam_fronteiras_como_mutuas():
+    gs = tabuleiro_com({'Japão', 'Vladivostok'})  # fronteira listada só a partir do Japão
+    assert gs.conectados(0, INDICE_TERRITORIO['Vladivostok'], INDICE_TERRITORIO['Japão'])
+    rotulos = gs.componentes_jogador(0)
+    assert gs.componentes_jogador(0) is rotulos  # reaproveitada enquanto os donos não mudam
+    gs.alterar_tropas(INDICE_TERRITORIO['Japão'], 2)
+    assert gs.componentes_jogador(0) is rotulos
+    gs.definir_dono(INDICE_TERRITORIO['Alasca'], 0)
+    assert gs.componentes_jogador(0) is not rotulos
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Stream SSE das partidas: snapshot, recuperação por ``desde``, deltas ao vivo e fim."""
+import json
+import random
+
+import fakeredis
+import pytest
+
+from src.config import EVENTOS_MAX_RECUPERACAO
+from src.game_events import canal_eventos, mensagem_eventos, transmitir
+from src.game_session import GameSession
+from src.session_store import SessionStore
+
+
+@pytest.fixture
+def store():
+    return SessionStore(fakeredis.FakeRedis())
+
+
+def nova_sessao(game_id="sse", turnos=0):
+    random.seed(5)
+    sessao = GameSession(game_id)
+    sessao.initialize_game()
+    for _ in range(turnos):
+        sessao.execute_turn()
+    return sessao
+
+
+def ler(texto):
+    """(evento, id, dados) de uma mensagem SSE; comentários viram ('ping', None, None)."""
+    if texto.startswith(":"):
+        return "ping", None, None
+    campos = dict(linha.split(": ", 1) for linha in texto.strip().split("\n"))
+    return campos["event"], campos.get("id"), json.loads(campos["data"])
+
+
+def stream(store, game_id="sse", desde=None, duracao=0.5):
+    return transmitir(store, game_id, desde, intervalo_ping=0.02, duracao_maxima=duracao)
+
+
+def proximo(eventos):
+    """Próximo evento que não é ping."""
+    for texto in eventos:
+        evento = ler(texto)
+        if evento[0] != "ping":
+            return evento
+    return None
+
+
+def test_mensagem_publicada_tem_deltas_e_status():
+    sessao = nova_sessao()
+    sessao.history.marcar_publicados()
+    sessao.execute_turn()
+    eventos = sessao.history.marcar_publicados()
+    mensagem = json.loads(mensagem_eventos(sessao, eventos))
+
+    assert [e["turn"] for e in mensagem["events"]] == [1]
+    assert mensagem["events"][0]["changes"]
+    assert mensagem["turn"] == 1 and mensagem["status"] == "playing"
+    assert mensagem["human_turn"] is False and mensagem["auto_play"] is False
+    assert json.loads(mensagem_eventos(sessao, []))["turn"] == 1  # só status: turno atual
+
+
+def test_sem_desde_comeca_pelo_estado_completo(store):
+    store.criar(nova_sessao(turnos=3))
+    evento, id_evento, dados = proximo(stream(store))
+    assert evento == "snapshot" and id_evento == "3" and dados["turn"] == 3
+    assert dados["state"]["total_turns"] == 4
+
+
+def test_desde_reenvia_so_os_turnos_perdidos(store):
+    sessao = nova_sessao(turnos=6)
+    store.criar(sessao)
+    eventos = stream(store, desde=2)
+
+    recebidos = [proximo(eventos) for _ in range(5)]
+    assert [(e, i) for e, i, _ in recebidos] == [("turn", "3"), ("turn", "4"), ("turn", "5"), ("turn", "6"),
+                                                 ("status", None)]
+    esperado = sessao.history.replay(2, 6)["turns"]
+    assert [dados for _, _, dados in recebidos[:4]] == esperado
+    assert recebidos[4][2]["turn"] == 6
+
+
+def test_desde_atual_nao_reenvia_nada(store):
+    store.criar(nova_sessao(turnos=2))
+    textos = list(stream(store, desde=2, duracao=0.1))
+    assert textos and all(ler(t)[0] == "ping" for t in textos)
+
+
+@pytest.mark.parametrize("desde", [-1 - EVENTOS_MAX_RECUPERACAO, 99])
+def test_desde_fora_do_alcance_manda_o_estado_completo(store, desde):
+    store.criar(nova_sessao(turnos=2))
+    assert proximo(stream(store, desde=desde))[0] == "snapshot"
+
+
+def test_turnos_ao_vivo_e_salto_na_sequencia(store):
+    store.criar(nova_sessao(turnos=1))
+    eventos = stream(store, duracao=2)
+    assert proximo(eventos)[0] == "snapshot"  # já inscrito no canal
+
+    store.atualizar("sse", lambda s: s.execute_turns(2))
+    recebidos = [proximo(eventos) for _ in range(3)]
+    assert [(e, i) for e, i, _ in recebidos] == [("turn", "2"), ("turn", "3"), ("status", None)]
+
+    # mensagem que pula turnos (perdida no caminho): estado completo relido do store
+    store.redis.publish(canal_eventos("sse"), json.dumps({"events": [{"turn": 9}], "turn": 9, "status": "playing",
+                                                           "auto_play": False, "speed": "normal",
+                                                           "human_turn": False, "tropas_disponiveis": {}}))
+    evento, id_evento, dados = proximo(eventos)
+    assert evento == "snapshot" and id_evento == "3" and dados["state"]["total_turns"] == 4
+
+
+def test_mudanca_so_de_status_chega_como_evento(store):
+    store.criar(nova_sessao())
+    eventos = stream(store)
+    proximo(eventos)
+
+    store.atualizar("sse", lambda s: setattr(s, "auto_play", True))
+    evento, _, dados = proximo(eventos)
+    assert evento == "status" and dados["auto_play"] is True and dados["turn"] == 0
+
+
+def test_stream_fecha_quando_a_partida_termina(store):
+    store.criar(nova_sessao())
+    eventos = stream(store, duracao=5)
+    proximo(eventos)
+
+    def terminar(sessao):
+        sessao.execute_turn()
+        sessao.status = "finished"
+
+    store.atualizar("sse", terminar)
+    assert [e for e, _, _ in (ler(t) for t in eventos) if e != "ping"] == ["turn", "status"]
+
+    # partida já terminada: só o estado completo
+    assert [ler(t)[0] for t in stream(store, duracao=5)] == ["snapshot"]
+
+
+def test_partida_inexistente(store):
+    assert [ler(t)[0] for t in stream(store, "nenhuma")] == ["error"]
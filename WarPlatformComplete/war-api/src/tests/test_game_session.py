@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Vários turnos de bots por requisição (execute_turns e /next-turns) e /state com ETag."""
+import json
+import random
+
+import fakeredis
+import pytest
+
+from src.game import GameState
+from src.game_session import GameSession
+from src.history import HistoricoPartida, territorios_como_dict
+from src.session_store import SessionStore
+
+
+@pytest.fixture
+def api(monkeypatch):
+    import src.main as main
+    store = SessionStore(fakeredis.FakeRedis())
+    monkeypatch.setattr(main, "store", store)
+    main.app.config["TESTING"] = True
+    return main.app.test_client(), store
+
+
+def nova_sessao(game_id="lote", semente=0, humano=False):
+    random.seed(semente)
+    sessao = GameSession(game_id)
+    if humano:
+        sessao.initialize_with_human()
+    else:
+        sessao.initialize_game()
+    sessao.game_state = GameState(random.Random(semente))  # tabuleiro e dados semeados
+    sessao.game_state.inicializar_tabuleiro(sessao.bots)
+    sessao.history = HistoricoPartida()
+    sessao._save_state_to_history()
+    return sessao
+
+
+def sem_horario(turnos):
+    return [{k: v for k, v in turno.items() if k != "timestamp"} for turno in turnos]
+
+
+def test_deltas_dos_turnos_batem_com_o_historico():
+    sessao = nova_sessao()
+    inicio = len(sessao.history) - 1
+    tabuleiro = territorios_como_dict(*sessao.history.tabuleiro_em(inicio))
+
+    turnos = sessao.execute_turns(12)
+
+    assert [t["turn"] for t in turnos] == list(range(inicio + 1, inicio + 13))
+    assert turnos == sem_horario(sessao.history.replay(inicio, -1)["turns"])
+    for turno in turnos:
+        assert turno["changes"]  # só territórios alterados, e algum sempre muda (reforço)
+        tabuleiro.update(turno["changes"])
+    assert tabuleiro == sessao.game_state.territorios_dict()
+    assert turnos[-1]["last_action"] == sessao.last_action
+    assert turnos[-1]["current_player"] == sessao.current_player_index
+
+
+def test_para_na_vez_do_humano():
+    sessao = nova_sessao(humano=True)
+    assert sessao.execute_turns(10) == []  # começa na vez do humano
+
+    sessao.current_player_index = 1
+    turnos = sessao.execute_turns(50)
+    assert len(turnos) == 5 and sessao.is_human_turn()
+    assert [t["current_player"] for t in turnos] == [2, 3, 4, 5, 0]
+
+
+def test_para_no_fim_da_partida():
+    sessao = nova_sessao(semente=0)
+    jogados = []
+    while sessao.status == "playing":
+        turnos = sessao.execute_turns(100)
+        assert turnos
+        jogados += turnos
+    assert sessao.status == "finished"
+    assert "winner" in jogados[-1]["last_action"]
+    assert sessao.execute_turns(10) == []
+    assert len(jogados) == len(sessao.history) - 1
+
+
+def test_next_turns_grava_uma_vez_e_devolve_os_deltas(api):
+    cliente, store = api
+    store.criar(nova_sessao())
+    versao = store.redis.get("game:lote:version")
+
+    resposta = cliente.post("/api/game/lote/next-turns", json={"turns": 4}).get_json()
+
+    assert resposta["executed"] == 4 and resposta["stopped_reason"] == "limit"
+    assert [t["turn"] for t in resposta["turns"]] == [1, 2, 3, 4]
+    assert resposta["state"]["total_turns"] == 5
+    assert int(store.redis.get("game:lote:version")) == int(versao) + 1
+    gravada = store.carregar("lote")
+    assert len(gravada.history) == 5
+    assert sem_horario(gravada.history.replay(0, -1)["turns"]) == resposta["turns"]
+
+
+def test_next_turns_motivo_da_parada_e_erros(api):
+    cliente, store = api
+    sessao = nova_sessao("humano", humano=True)
+    sessao.current_player_index = 4
+    store.criar(sessao)
+
+    resposta = cliente.post("/api/game/humano/next-turns", json={"turns": 10}).get_json()
+    assert resposta["executed"] == 2 and resposta["stopped_reason"] == "human_turn"
+    assert resposta["state"]["human_turn"] is True
+    assert cliente.post("/api/game/humano/next-turns", json={"turns": 10}).status_code == 400
+
+    for corpo in ({"turns": 0}, {"turns": 1000}, {"turns": "muitos"}):
+        assert cliente.post("/api/game/humano/next-turns", json=corpo).status_code == 400
+
+    fim = nova_sessao("fim", semente=0)
+    while fim.status == "playing" and len(fim.history) < 170:
+        fim.execute_turn()
+    store.criar(fim)
+    resposta = cliente.post("/api/game/fim/next-turns", json={"turns": 100}).get_json()
+    assert resposta["stopped_reason"] == "finished" and resposta["state"]["status"] == "finished"
+
+
+def test_state_json_reaproveita_o_corpo_ate_o_estado_mudar():
+    sessao = nova_sessao()
+    corpo, etag = sessao.state_json()
+    assert json.loads(corpo) == json.loads(json.dumps(sessao.get_state_dict()))
+    assert sessao.state_json()[0] is corpo
+
+    for mudar in (lambda s: setattr(s, "auto_play", True), lambda s: setattr(s, "speed", "fast"),
+                  lambda s: s.execute_turn()):
+        mudar(sessao)
+        novo, nova_etag = sessao.state_json()
+        assert nova_etag != etag and json.loads(novo) == json.loads(json.dumps(sessao.get_state_dict()))
+        etag = nova_etag
+
+
+def test_chave_do_estado_segue_o_conteudo_da_ultima_acao():
+    sessao = nova_sessao()
+    sessao.execute_turn()
+    corpo, etag = sessao.state_json()
+
+    sessao.last_action = dict(sessao.last_action)  # outro dict, mesmo conteúdo
+    assert sessao.state_json()[0] is corpo
+
+    sessao.last_action["winner"] = 3  # alterado no lugar, mesmo id
+    novo, nova_etag = sessao.state_json()
+    assert nova_etag != etag and json.loads(novo)["last_action"]["winner"] == 3
+
+
+def test_state_responde_304_enquanto_nada_muda(api):
+    cliente, store = api
+    store.criar(nova_sessao())
+
+    resposta = cliente.get("/api/game/lote/state")
+    etag = resposta.headers["ETag"]
+    assert resposta.status_code == 200 and resposta.headers["Cache-Control"] == "no-cache"
+    assert resposta.get_json()["total_turns"] == 1
+
+    repetida = cliente.get("/api/game/lote/state", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304 and repetida.data == b""
+
+    cliente.post("/api/game/lote/next-turn")
+    depois = cliente.get("/api/game/lote/state", headers={"If-None-Match": etag})
+    assert depois.status_code == 200 and depois.headers["ETag"] != etag
+    assert depois.get_json()["total_turns"] == 2
+    assert cliente.get("/api/game/nenhum/state").status_code == 404
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Reprodutibilidade do algoritmo genético a partir da semente mestre."""
+import copy
+import random
+
+import pytest
+
+from src import config
+from src.fitness_cache import FitnessCache
+import src.genetic_algorithm as modulo_ag
+from src.genetic_algorithm import GeneticAlgorithm, _simular_partida_semeada
+from src.rng import derivar_semente
+
+
+@pytest.fixture(autouse=True)
+def ag_pequeno(monkeypatch):
+    """População e partidas reduzidas para o teste rodar em segundos."""
+    for modulo in (config, modulo_ag):
+        monkeypatch.setattr(modulo, "NUM_INDIVIDUOS", 12)
+        monkeypatch.setattr(modulo, "NUM_PARTIDAS_SIM", 6)
+        monkeypatch.setattr(modulo, "NUM_GERACOES", 2)
+        monkeypatch.setattr(modulo, "MAX_RODADAS", 30)
+    monkeypatch.setattr(config, "USAR_CACHE_FITNESS", False, raising=False)
+
+
+def evoluir(num_processos, semente=1234):
+    ag = GeneticAlgorithm(num_processos=num_processos, semente=semente)
+    try:
+        ag.gerar_populacao_inicial()
+        ag._evoluir_geracoes(2)
+    finally:
+        ag.encerrar()
+    return [(bot.gene, bot.fitness) for bot in ag.populacao], ag.melhor_fitness_por_geracao
+
+
+def test_populacao_inicial_segue_a_semente():
+    genes = [[bot.gene for bot in GeneticAlgorithm(num_processos=1, semente=7).gerar_populacao_inicial()]
+             for _ in range(2)]
+    assert genes[0] == genes[1]
+
+
+def test_serial_e_paralelo_identicos():
+    assert evoluir(1) == evoluir(2)
+
+
+def test_sementes_diferentes_divergem():
+    assert evoluir(1, semente=1) != evoluir(1, semente=2)
+
+
+def test_derivar_semente_estavel():
+    assert derivar_semente(1, 0, 3) == derivar_semente(1, 0, 3)
+    assert derivar_semente(1, 0, 3) != derivar_semente(1, 0, 4)
+    assert 0 <= derivar_semente("mestre") < 2 ** 64
+
+
+def test_partida_do_plano_reproduzida_isoladamente():
+    ag = GeneticAlgorithm(num_processos=1, semente=99)
+    ag.gerar_populacao_inicial()
+    plano = ag._planejar_partidas()
+    resultados = ag._executar_partidas(plano)
+
+    bots, semente = plano[3]
+    assert semente == derivar_semente(99, 0, 3)
+    assert _simular_partida_semeada([b.gene for b in bots], [b.id for b in bots], semente) == resultados[3]
+
+
+def test_nenhum_sorteio_usa_o_random_global():
+    estado = random.getstate()
+    evoluir(1)
+    assert random.getstate() == estado
+
+
+def test_consulta_ao_cache_nao_altera_o_cache(capsys):
+    cache = FitnessCache(min_partidas=2)
+    ag = GeneticAlgorithm(num_processos=1, semente=5, cache=cache)
+    ag.gerar_populacao_inicial()
+    confiaveis = {bot.gene for bot in ag.populacao[:3]}
+    for gene in confiaveis:
+        for _ in range(2):
+            cache.registrar(gene, True, 10)
+
+    antes = copy.deepcopy(vars(cache))
+    assert all(cache.confiavel(gene) for gene in confiaveis) and not cache.confiavel("000000000")
+    assert vars(cache) == antes
+
+    ag._planejar_partidas()
+    acertos = sum(bot.gene in confiaveis for bot in ag.populacao)
+    assert f"{acertos / len(ag.populacao):.0%} de acertos, {len(ag.populacao) - acertos} genes pendentes" \
+        in capsys.readouterr().out
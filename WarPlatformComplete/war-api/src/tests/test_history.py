@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Histórico em deltas com keyframes: leitura aleatória, replay e entradas persistidas."""
+import random
+from datetime import datetime
+
+from src.game import NUM_TERRITORIOS, SEM_DONO
+from src.history import HistoricoPartida, decodificar_entrada, territorios_como_dict
+
+
+def tabuleiros(n, semente=0):
+    """``n`` tabuleiros sucessivos, cada um alterando poucos territórios do anterior."""
+    rng = random.Random(semente)
+    donos = [rng.randrange(6) for _ in range(NUM_TERRITORIOS)]
+    tropas = [rng.randint(1, 5) for _ in range(NUM_TERRITORIOS)]
+    resultado = []
+    for _ in range(n):
+        for idx in rng.sample(range(NUM_TERRITORIOS), rng.randint(0, 3)):
+            donos[idx] = rng.randrange(6)
+            tropas[idx] = rng.randint(1, 30)
+        resultado.append((list(donos), list(tropas)))
+    return resultado
+
+
+def preencher(historico, estados):
+    for turno, (donos, tropas) in enumerate(estados):
+        historico._registrar_vetores(donos, tropas, turno // 6 + 1, turno % 6,
+                                     {"turno": turno}, datetime(2024, 1, 1, 0, 0, turno % 60))
+
+
+def test_tabuleiro_em_qualquer_turno_a_partir_do_keyframe():
+    estados = tabuleiros(23)
+    historico = HistoricoPartida(intervalo_keyframe=5)
+    preencher(historico, estados)
+
+    assert len(historico) == 23
+    for turno, estado in enumerate(estados):
+        assert historico.tabuleiro_em(turno) == estado
+        assert historico.acao_em(turno) == {"turno": turno}
+    assert historico.tabuleiro_em(-1) == estados[-1]
+    assert [decodificar_entrada(e)["keyframe"] for e in historico.novas] == [t % 5 == 0 for t in range(23)]
+
+
+def test_entradas_guardam_so_o_que_mudou():
+    estados = tabuleiros(12)
+    historico = HistoricoPartida(intervalo_keyframe=100)
+    preencher(historico, estados)
+    for turno in range(1, 12):
+        mudancas = decodificar_entrada(historico.novas[turno])["mudancas"]
+        antes, depois = estados[turno - 1], estados[turno]
+        assert {i for i, _, _ in mudancas} == {i for i in range(NUM_TERRITORIOS)
+                                               if (antes[0][i], antes[1][i]) != (depois[0][i], depois[1][i])}
+
+
+def test_iteracao_e_indice_montam_entradas_completas():
+    estados = tabuleiros(9)
+    historico = HistoricoPartida(intervalo_keyframe=4)
+    preencher(historico, estados)
+    entradas = list(historico)
+    assert len(entradas) == 9
+    for turno, (entrada, (donos, tropas)) in enumerate(zip(entradas, estados)):
+        assert entrada == historico[turno]
+        assert entrada["territories"] == territorios_como_dict(donos, tropas)
+        assert entrada["current_player"] == turno % 6
+
+
+def test_replay_aplica_os_deltas_ate_o_fim():
+    estados = tabuleiros(15, semente=3)
+    historico = HistoricoPartida(intervalo_keyframe=4)
+    preencher(historico, estados)
+
+    replay = historico.replay(2, 13)
+    tabuleiro = replay["territories"]
+    assert tabuleiro == territorios_como_dict(*estados[2])
+    assert [t["turn"] for t in replay["turns"]] == list(range(3, 14))
+    for delta in replay["turns"]:
+        tabuleiro = {**tabuleiro, **delta["changes"]}
+        assert tabuleiro == territorios_como_dict(*estados[delta["turn"]])
+
+
+def test_entradas_persistidas_sao_lidas_pelo_carregador():
+    estados = tabuleiros(20, semente=5)
+    historico = HistoricoPartida(intervalo_keyframe=6)
+    preencher(historico, estados[:14])
+    persistidas = historico.marcar_persistidas()
+    historico.carregador = lambda inicio, fim: persistidas[inicio:fim + 1]
+    preencher(historico, estados[14:])
+
+    assert len(historico.novas) == 6 and len(historico) == 20
+    for turno, estado in enumerate(estados):
+        assert historico.tabuleiro_em(turno) == estado
+
+
+def test_eventos_publicados_trazem_so_as_mudancas():
+    historico = HistoricoPartida()
+    donos = [SEM_DONO] * NUM_TERRITORIOS
+    tropas = [0] * NUM_TERRITORIOS
+    historico._registrar_vetores(donos, tropas, 1, 0, None, datetime(2024, 1, 1))
+    donos[3], tropas[3] = 2, 7
+    historico._registrar_vetores(donos, tropas, 1, 1, {"tipo": "ataque"}, datetime(2024, 1, 1))
+
+    eventos = historico.marcar_publicados()
+    assert historico.eventos == []
+    assert eventos[0]["changes"] == {}
+    assert eventos[1]["changes"] == territorios_como_dict(donos, tropas, [3])
+    assert eventos[1]["last_action"] == {"tipo": "ataque"}
+
+
+def test_historico_antigo_em_lista_e_convertido():
+    estados = tabuleiros(7, semente=9)
+    origem = HistoricoPartida(intervalo_keyframe=3)
+    preencher(origem, estados)
+    convertido = HistoricoPartida.de_lista(list(origem), intervalo_keyframe=3)
+    assert list(convertido) == list(origem)
+    assert convertido.eventos == []
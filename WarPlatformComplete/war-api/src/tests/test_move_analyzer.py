@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Análise local da última jogada: determinística e coerente com a tabela de ataques."""
+import json
+import random
+
+from src.game import GameLogic
+from src.game_session import GameSession
+from src.move_analyzer import avaliar_jogada, resumo_texto, valor_ataque, CLASSIFICACOES
+from src.session_codec import codificar_sessao, decodificar_sessao
+
+
+def nova_sessao(semente=3, turnos=6):
+    random.seed(semente)
+    sessao = GameSession("analise")
+    sessao.initialize_game()
+    for _ in range(turnos):
+        sessao.execute_turn()
+    return sessao
+
+
+def test_avaliacao_e_deterministica():
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    assert avaliacao is not None
+    assert avaliar_jogada(sessao) == avaliacao
+    assert avaliar_jogada(decodificar_sessao(codificar_sessao(sessao))) == avaliacao
+    assert resumo_texto(avaliar_jogada(sessao)) == resumo_texto(avaliacao)
+    json.dumps(avaliacao)  # serializável para a API
+
+
+def test_avaliacoes_de_varias_partidas():
+    for semente in range(8):
+        sessao = nova_sessao(semente, turnos=semente % 4 + 2)
+        avaliacao = avaliar_jogada(sessao, max_alternativas=2)
+        if avaliacao is None:
+            continue
+        assert avaliacao["jogada"] == sessao.last_action
+        assert avaliacao["classificacao"] in CLASSIFICACOES or avaliacao["classificacao"] is None
+        assert len(avaliacao["alternativas"]) <= 2
+        valores = [a["valor_esperado"] for a in avaliacao["alternativas"]]
+        assert valores == sorted(valores, reverse=True)
+        if avaliacao["ataque"] is not None:
+            assert avaliacao["posicao"] >= 1 and avaliacao["opcoes"] >= avaliacao["posicao"]
+        assert resumo_texto(avaliacao).startswith(f"Jogador {avaliacao['jogador']}")
+
+
+def test_valor_ataque_usa_a_tabela_do_jogo():
+    gs = nova_sessao().game_state
+    jogador = next(j for j in range(6) if GameLogic.jogadas_possiveis(gs, j))
+    origem, destino = GameLogic.jogadas_possiveis(gs, jogador)[0]
+    valor = valor_ataque(gs, jogador, origem, destino)
+    esperado = GameLogic.resultado_esperado_ataque(gs, origem, destino)
+    assert valor["probabilidade_vitoria"] == round(esperado["probabilidade_vitoria"], 3)
+    assert valor["perda_esperada"] == round(esperado["perda_esperada"], 3)
+    assert valor["tropas_atacante"] == gs.get_tropas(origem)
+
+
+def test_sem_jogada_nao_ha_avaliacao():
+    random.seed(1)
+    sessao = GameSession("nova")
+    sessao.initialize_game()
+    assert sessao.last_action is None
+    assert avaliar_jogada(sessao) is None
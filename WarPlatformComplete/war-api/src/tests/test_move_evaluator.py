@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Avaliação Monte Carlo dos ataques do humano: resultados exatos e rollouts semeados."""
+import random
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.attack_table import TABELA_ATAQUE
+from src.game import GameLogic, GameState, INDICE_TERRITORIO
+from src.game_session import GameSession
+import src.move_evaluator as move_evaluator
+from src.move_evaluator import avaliar_jogadas, resultados_ataque, ExecutorAvaliacoes, AvaliacoesOcupadas
+
+
+def sessao_com_humano(semente=7):
+    random.seed(semente)
+    sessao = GameSession("avaliacao")
+    sessao.initialize_with_human()
+    sessao.game_state = GameState(random.Random(semente))  # tabuleiro também semeado
+    sessao.game_state.inicializar_tabuleiro(sessao.bots)
+    return sessao
+
+
+def sem_tempo(avaliacao):
+    return {chave: valor for chave, valor in avaliacao.items() if chave != "tempo_ms"}
+
+
+def test_resultados_do_ataque_somam_um():
+    gs = sessao_com_humano().game_state
+    donos, tropas = tuple(gs.donos), tuple(gs.tropas)
+    perdeu = (False,) * 6
+    for origem, destino in GameLogic.jogadas_possiveis(gs, 0):
+        resultados = resultados_ataque(donos, tropas, perdeu, origem, destino)
+        assert sum(peso for _, peso in resultados) == pytest.approx(1.0)
+        vitoria = sum(peso for (novos_donos, _, _), peso in resultados
+                      if novos_donos[INDICE_TERRITORIO[destino]] == 0)
+        assert vitoria == pytest.approx(TABELA_ATAQUE.probabilidade(gs.get_tropas(origem), gs.get_tropas(destino)))
+        for (novos_donos, novas_tropas, _), _ in resultados:
+            assert min(novas_tropas) >= 1
+            assert novas_tropas[INDICE_TERRITORIO[origem]] <= gs.get_tropas(origem)
+
+
+def test_mesma_semente_mesma_avaliacao():
+    sessao = sessao_com_humano()
+    donos, tropas = list(sessao.game_state.donos), list(sessao.game_state.tropas)
+    # tempo zero: só a primeira onda de rollouts, independente da máquina
+    primeira = avaliar_jogadas(sessao, 0, tempo_maximo=0, semente=11)
+    segunda = avaliar_jogadas(sessao, 0, tempo_maximo=0, semente=11)
+
+    assert sem_tempo(primeira) == sem_tempo(segunda)
+    assert sessao.game_state.donos == donos and sessao.game_state.tropas == tropas  # a sessão não muda
+    assert len(primeira["jogadas"]) == len(GameLogic.jogadas_possiveis(sessao.game_state, 0))
+    rendas = [j["renda"] for j in primeira["jogadas"]]
+    assert rendas == sorted(rendas, reverse=True)
+    for jogada in primeira["jogadas"]:
+        assert jogada["ganho_renda"] == pytest.approx(jogada["renda"] - primeira["sem_ataque"]["renda"], abs=0.011)
+        assert 0 <= jogada["probabilidade_vitoria"] <= 1 and jogada["rollouts"] > 0
+
+
+def test_sementes_diferentes_mudam_os_rollouts():
+    sessao = sessao_com_humano()
+    avaliacoes = [sem_tempo(avaliar_jogadas(sessao, 0, tempo_maximo=0, semente=s)) for s in (1, 2)]
+    assert avaliacoes[0]["rollouts"] == avaliacoes[1]["rollouts"]
+    assert avaliacoes[0]["jogadas"] != avaliacoes[1]["jogadas"]
+
+
+def avaliacao_presa(monkeypatch):
+    """Troca ``avaliar_jogadas`` por uma que só termina quando o evento é liberado."""
+    liberar = threading.Event()
+
+    def presa(sessao, jogador, tempo_maximo, semente=None):
+        liberar.wait(5)
+        return {"jogador": jogador}
+
+    monkeypatch.setattr(move_evaluator, "avaliar_jogadas", presa)
+    return liberar
+
+
+def test_executor_devolve_a_mesma_avaliacao():
+    sessao = sessao_com_humano()
+    executor = ExecutorAvaliacoes()
+    resultado = executor.avaliar(sessao, 0, 0, semente=11)
+    assert sem_tempo(resultado) == sem_tempo(avaliar_jogadas(sessao, 0, tempo_maximo=0, semente=11))
+    assert executor.em_andamento == 0
+
+
+def test_executor_limita_vagas_e_tempo(monkeypatch):
+    liberar = avaliacao_presa(monkeypatch)
+    executor = ExecutorAvaliacoes(max_simultaneas=1, timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        executor.avaliar(None)
+    with pytest.raises(AvaliacoesOcupadas):  # a thread que passou do tempo ainda segura a vaga
+        executor.avaliar(None)
+
+    liberar.set()
+    for _ in range(50):
+        if executor.em_andamento == 0:
+            break
+        time.sleep(0.02)
+    assert executor.em_andamento == 0
+    assert executor.avaliar(None, 3) == {"jogador": 3}
+
+
+def test_com_gevent_a_avaliacao_nao_congela_o_loop(monkeypatch):
+    gevent = pytest.importorskip("gevent")
+    liberar = avaliacao_presa(monkeypatch)
+    executor = ExecutorAvaliacoes(max_simultaneas=1, timeout=2)
+    monkeypatch.setattr(ExecutorAvaliacoes, "_usa_gevent", staticmethod(lambda: True))
+    batidas = []
+
+    def relogio():
+        while len(batidas) < 5:
+            batidas.append(time.monotonic())
+            gevent.sleep(0.01)
+        liberar.set()
+
+    outro = gevent.spawn(relogio)
+    assert executor.avaliar(None, 2) == {"jogador": 2}
+    assert len(batidas) == 5  # o outro greenlet rodou (e liberou a avaliação) durante a espera
+    outro.join()
+    gevent.sleep(0)  # callbacks do hub
+    assert executor.em_andamento == 0
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Prompt de análise: prefixo fixo, orçamento de tokens e contagem sem o tiktoken."""
+import math
+import random
+
+import pytest
+
+from src import prompt_builder
+from src.game_session import GameSession
+from src.move_analyzer import avaliar_jogada, resumo_texto
+from src.prompt_builder import (
+    PREFIXO_ANALISE, construir_prompt_analise, contar_tokens, descrever_acao, vetores_do_estado
+)
+
+
+@pytest.fixture
+def estimativa(monkeypatch):
+    """Contagem pela estimativa, mesmo com o tiktoken instalado."""
+    monkeypatch.setattr(prompt_builder, "_codificador", False)
+
+
+def nova_sessao(semente=3, turnos=6):
+    random.seed(semente)
+    sessao = GameSession("prompt")
+    sessao.initialize_game()
+    for _ in range(turnos):
+        sessao.execute_turn()
+    return sessao
+
+
+def test_estimativa_sem_tiktoken(estimativa):
+    assert contar_tokens("") == 0
+    assert contar_tokens("J3 atacou Alasca.") == 1 + 2 + 2 + 1
+    texto = "Fronteiras mais ameaçadas de J0 (território tropas: tropas inimigas vizinhas):"
+    assert contar_tokens(texto) == sum(math.ceil(len(p) / 4) for p in prompt_builder._PALAVRAS.findall(texto))
+
+
+def test_usa_o_codificador_quando_disponivel(monkeypatch):
+    class PorCaractere:
+        def encode(self, texto):
+            return list(texto)
+
+    monkeypatch.setattr(prompt_builder, "_codificador", PorCaractere())
+    assert contar_tokens("abc de") == 6
+
+
+def test_sem_pacote_cai_na_estimativa(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "tiktoken", None)
+    monkeypatch.setattr(prompt_builder, "_codificador", None)
+    assert prompt_builder._tokenizador() is None
+    assert prompt_builder._codificador is False  # não tenta de novo a cada contagem
+    assert contar_tokens("Ásia") == 1
+
+
+@pytest.mark.parametrize("folga", [0, 10, 40, 100, 250, 5000])
+def test_prompt_respeita_o_orcamento(estimativa, folga):
+    sessao = nova_sessao()
+    avaliacao = avaliar_jogada(sessao)
+    obrigatorio = PREFIXO_ANALISE + "Jogada analisada:\n" + resumo_texto(avaliacao).splitlines()[0] + "\n"
+    orcamento = contar_tokens(obrigatorio) + folga
+    prompt = construir_prompt_analise(*vetores_do_estado(sessao.get_state_dict()), sessao.last_action,
+                                      avaliacao, orcamento)
+
+    assert prompt.startswith(obrigatorio)
+    assert contar_tokens(prompt) <= orcamento
+    assert prompt.endswith("\n") and not prompt.endswith("\n\n")
+
+
+def test_primeira_linha_da_jogada_entra_sempre(estimativa):
+    sessao = nova_sessao()
+    acao = sessao.last_action
+    prompt = construir_prompt_analise(*vetores_do_estado(sessao.get_state_dict()), acao, orcamento=1)
+    assert prompt == PREFIXO_ANALISE + "Jogada analisada:\n" + descrever_acao(acao) + "\n"
+
+
+def test_orcamento_maior_inclui_mais_secoes(estimativa):
+    sessao = nova_sessao()
+    donos, tropas = vetores_do_estado(sessao.get_state_dict())
+    curto = construir_prompt_analise(donos, tropas, sessao.last_action, orcamento=contar_tokens(PREFIXO_ANALISE) + 40)
+    longo = construir_prompt_analise(donos, tropas, sessao.last_action, orcamento=5000)
+    assert "Jogadores (territórios/tropas +bônus):" in longo
+    assert "Jogadores (territórios/tropas +bônus):" not in curto
+    assert longo.startswith(curto.rstrip("\n"))
+
+
+def test_prompt_e_deterministico(estimativa):
+    sessao = nova_sessao()
+    donos, tropas = vetores_do_estado(sessao.get_state_dict())
+    avaliacao = avaliar_jogada(sessao)
+    prompts = {construir_prompt_analise(donos, tropas, sessao.last_action, avaliacao) for _ in range(3)}
+    assert len(prompts) == 1
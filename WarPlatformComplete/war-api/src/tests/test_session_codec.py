@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Formato binário das sessões e leitura de sessões antigas em pickle."""
+import pickle
+import random
+
+import pytest
+
+from src.game_session import GameSession
+from src.session_codec import codificar_sessao, decodificar_sessao, eh_sessao_binaria
+from src.session_store import decodificar
+
+
+def nova_sessao(humano=False, turnos=8, semente=0):
+    random.seed(semente)
+    sessao = GameSession(f"teste-{semente}")
+    sessao.initialize_with_human() if humano else sessao.initialize_game()
+    for _ in range(turnos):
+        sessao.execute_turn()
+    return sessao
+
+
+def mesmo_estado(a, b):
+    assert (a.game_id, a.status, a.speed, a.auto_play) == (b.game_id, b.status, b.speed, b.auto_play)
+    assert (a.current_player_index, a.round_number, a.last_action) == \
+           (b.current_player_index, b.round_number, b.last_action)
+    assert [(getattr(x, "is_human", False), x.id, x.gene) for x in a.bots] == \
+           [(getattr(x, "is_human", False), x.id, x.gene) for x in b.bots]
+    gs_a, gs_b = a.game_state, b.game_state
+    assert (gs_a.donos, gs_a.tropas, gs_a.rodada_atual) == (gs_b.donos, gs_b.tropas, gs_b.rodada_atual)
+    assert gs_a.historico_perdas == gs_b.historico_perdas
+    assert gs_a.tropas_disponiveis == gs_b.tropas_disponiveis
+    assert list(a.history) == list(b.history)
+
+
+@pytest.mark.parametrize("humano", [False, True])
+def test_ida_e_volta_preserva_a_sessao(humano):
+    sessao = nova_sessao(humano=humano)
+    dados = codificar_sessao(sessao)
+    assert eh_sessao_binaria(dados)
+
+    copia = decodificar_sessao(dados)
+    mesmo_estado(sessao, copia)
+    assert copia.created_at is None  # metadado frio, fora do estado quente
+    assert codificar_sessao(copia) == dados
+    assert copia.get_state_dict()["players"] == sessao.get_state_dict()["players"]
+
+
+def test_sessao_decodificada_continua_jogando():
+    sessao = nova_sessao(turnos=3)
+    copia = decodificar_sessao(codificar_sessao(sessao))
+    for _ in range(6):
+        copia.execute_turn()
+    assert len(copia.history) == len(sessao.history) + 6
+
+
+def test_tropas_acima_de_16_bits_e_gene_fora_do_padrao():
+    sessao = nova_sessao(turnos=0)
+    sessao.game_state.definir_tropas(0, 70000)
+    sessao.bots[1].gene = "experimental"
+    copia = decodificar_sessao(codificar_sessao(sessao))
+    assert copia.game_state.tropas[0] == 70000
+    assert copia.bots[1].gene == "experimental"
+
+
+def test_dados_invalidos_sao_recusados():
+    with pytest.raises(ValueError):
+        decodificar_sessao(b"XXXX\x03")
+    with pytest.raises(ValueError):
+        decodificar_sessao(b"WARS\x63")
+
+
+def test_sessao_em_pickle_ainda_e_lida():
+    sessao = nova_sessao()
+    dados = pickle.dumps(sessao)
+    assert not eh_sessao_binaria(dados)
+    mesmo_estado(sessao, decodificar(dados))
+    assert decodificar(codificar_sessao(sessao)).game_id == sessao.game_id
+
+
+@pytest.mark.parametrize("versao", [1, 2])
+def test_versoes_binarias_anteriores_nao_sao_mais_lidas(versao):
+    dados = bytearray(codificar_sessao(nova_sessao(turnos=0)))
+    dados[4] = versao
+    with pytest.raises(ValueError, match="Versão"):
+        decodificar_sessao(bytes(dados))
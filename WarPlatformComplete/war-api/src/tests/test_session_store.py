@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Registro de partidas, paginação por cursor e gravação das sessões no Redis."""
+import json
+import random
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+from src.game_events import canal_eventos
+from src.game_session import GameSession
+from src.session_cache import CacheSessoes
+from src.session_store import SessionStore
+
+
+@pytest.fixture
+def store():
+    return SessionStore(fakeredis.FakeRedis())
+
+
+def nova_sessao(game_id, created_at=None):
+    random.seed(game_id)
+    sessao = GameSession(game_id)
+    sessao.initialize_game()
+    sessao.created_at = created_at or datetime.now()
+    return sessao
+
+
+def paginar(store, limite, status=None):
+    ids, cursor, paginas = [], None, 0
+    while True:
+        resumos, cursor = store.listar(limite, cursor, status)
+        ids.extend(r["game_id"] for r in resumos)
+        paginas += 1
+        if cursor is None:
+            return ids, paginas
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3, 4, 7, 50])
+def test_paginacao_nao_repete_nem_pula_horarios_iguais_ou_proximos(store, limite):
+    base = datetime(2024, 5, 1, 12, 0, 0)
+    horarios = [base] * 4 + [base + timedelta(microseconds=1)] * 3 + \
+               [base - timedelta(microseconds=k) for k in (1, 2, 2, 3)] + [base + timedelta(seconds=5)]
+    esperado = []
+    for i, horario in enumerate(horarios):
+        game_id = f"jogo-{i:02d}"
+        store.criar(nova_sessao(game_id, horario))
+        esperado.append((horario, game_id))
+    esperado = [game_id for _, game_id in sorted(esperado, reverse=True)]
+
+    ids, _ = paginar(store, limite)
+    assert ids == esperado
+
+
+def test_paginacao_por_status_e_partidas_expiradas(store):
+    base = datetime(2024, 5, 1)
+    for i in range(6):
+        store.criar(nova_sessao(f"g{i}", base))
+    store.redis.delete("game:g3:summary")  # expirou
+
+    ids, _ = paginar(store, 2, status="playing")
+    assert ids == ["g5", "g4", "g2", "g1", "g0"]
+    assert store.redis.zscore("games:index", "g3") is None
+
+
+def test_cursor_malformado(store):
+    with pytest.raises(ValueError):
+        store.listar(10, "123.0")
+
+
+def contar_codificacoes(monkeypatch):
+    import src.session_store as modulo
+    chamadas = []
+    original = modulo.codificar_sessao
+    monkeypatch.setattr(modulo, "codificar_sessao", lambda s: chamadas.append(1) or original(s))
+    return chamadas
+
+
+def test_atualizar_sem_mudanca_nao_grava(store):
+    store.criar(nova_sessao("parado"))
+    versao = store.redis.get("game:parado:version")
+    sessao, resultado = store.atualizar("parado", lambda s: "ok")
+    assert resultado == "ok" and sessao.game_id == "parado"
+    assert store.redis.get("game:parado:version") == versao
+    assert store.metricas() == {"sem_alteracao": 1}
+
+
+def test_atualizar_codifica_uma_vez_por_gravacao(store, monkeypatch):
+    from src.session_codec import codificar_sessao
+    store.criar(nova_sessao("mudou"))
+    chamadas = contar_codificacoes(monkeypatch)
+
+    def pausar(sessao):
+        sessao.status = "paused"
+
+    sessao, _ = store.atualizar("mudou", pausar)
+    assert len(chamadas) == 1
+    assert store.redis.get("game:mudou") == codificar_sessao(sessao)
+    assert store.redis.zscore("games:index:paused", "mudou") is not None
+    assert store.redis.zscore("games:index:playing", "mudou") is None
+
+    store.atualizar("mudou", lambda s: setattr(s, "status", "playing"))
+    chamadas.clear()
+    sessao, _ = store.atualizar("mudou", lambda s: s.execute_turn())
+    assert len(chamadas) == 1  # turno com histórico novo: só a codificação da gravação
+    assert store.carregar("mudou").round_number == sessao.round_number
+
+
+@pytest.mark.parametrize("cache", [None, CacheSessoes()])
+def test_controle_sem_turno_novo_publica_o_status(cache):
+    store = SessionStore(fakeredis.FakeRedis(), cache=cache)
+    store.criar(nova_sessao("ctrl"))
+    pubsub = store.redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(canal_eventos("ctrl"))
+
+    store.atualizar("ctrl", lambda s: setattr(s, "auto_play", True))
+    store.atualizar("ctrl", lambda s: setattr(s, "speed", "fast"))
+    store.atualizar("ctrl", lambda s: None)  # nada mudou: nada publicado
+    store.atualizar("ctrl", pausar)
+    mensagens = [json.loads(m["data"]) for m in (pubsub.get_message(timeout=0.05) for _ in range(10)) if m]
+
+    assert [(m["events"], m["turn"], m["status"], m["auto_play"], m["speed"]) for m in mensagens] == [
+        ([], 0, "playing", True, "normal"), ([], 0, "playing", True, "fast"), ([], 0, "paused", True, "fast")]
+
+
+@pytest.fixture
+def workers():
+    """Dois workers com cache próprio sobre o mesmo Redis."""
+    redis = fakeredis.FakeRedis()
+    return SessionStore(redis, cache=CacheSessoes()), SessionStore(redis, cache=CacheSessoes())
+
+
+def pausar(sessao):
+    sessao.status = "paused"
+
+
+def test_cache_invalidado_quando_outro_worker_grava(workers):
+    a, b = workers
+    a.criar(nova_sessao("cache"))
+    lida = a.carregar("cache")
+    assert a.carregar("cache") is lida
+    assert a.cache.estatisticas()["acertos"] == 2  # a sessão criada já entra no cache
+
+    b.atualizar("cache", pausar)
+    assert a.carregar("cache").status == "paused"
+    assert a.cache.estatisticas()["invalidadas"] == 1
+
+
+def test_alteracao_nao_muda_a_sessao_ja_lida(workers):
+    a, _ = workers
+    a.criar(nova_sessao("leitor"))
+    lida = a.carregar("leitor")
+    rodada, tropas = lida.round_number, list(lida.game_state.tropas)
+
+    for _ in range(5):
+        a.atualizar("leitor", lambda s: s.execute_turn())
+
+    assert lida.status == "playing"
+    assert (lida.round_number, lida.game_state.tropas) == (rodada, tropas)
+    assert a.carregar("leitor").history.total == lida.history.total + 5
+
+
+def test_alteracao_descartada_por_conflito_nao_fica_no_cache(workers):
+    a, b = workers
+    a.criar(nova_sessao("conflito"))
+    lida = a.carregar("conflito")
+    tentativas = []
+
+    def jogar(sessao):
+        tentativas.append(sessao)
+        if len(tentativas) == 1:
+            b.atualizar("conflito", pausar)  # outro worker grava no meio da transação
+            sessao.game_state.definir_tropas(0, 999)
+        return sessao.status
+
+    sessao, status = a.atualizar("conflito", jogar)
+    assert len(tentativas) == 2 and tentativas[0] is not tentativas[1]
+    assert status == "paused" and sessao.game_state.tropas[0] != 999
+    assert lida.status == "playing" and lida.game_state.tropas[0] != 999
+    assert a.carregar("conflito").game_state.tropas[0] != 999
+    assert a.metricas()["conflitos"] == 1
+
+
+def test_escrita_adiada_grava_os_turnos_acumulados():
+    redis = fakeredis.FakeRedis()
+    store = SessionStore(redis, cache=CacheSessoes(escrita_adiada=True, max_alteracoes=100, max_espera=60))
+    store.criar(nova_sessao("adiada"))
+    versao = redis.get("game:adiada:version")
+    for _ in range(4):
+        sessao, _ = store.atualizar("adiada", lambda s: s.execute_turn())
+    assert redis.get("game:adiada:version") == versao
+    assert store.carregar("adiada").history.total == sessao.history.total
+
+    store.descarregar("adiada")
+    fria = SessionStore(redis).carregar("adiada")
+    assert fria.history.total == sessao.history.total
+    assert fria.game_state.tropas == sessao.game_state.tropas
+    assert redis.llen("game:adiada:history") == sessao.history.total
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Torneio exaustivo entre todos os genótipos de 9 bits (512 genes).
+
+Cada rodada distribui os 512 genes em mesas de 6 jogadores; ao final, as
+estatísticas ficam em matrizes 512 x 512 (partidas, vitórias e territórios de
+cada gene na presença de cada outro), salvas em formato binário ``.npz``. Com
+a tabela pronta, "qual o melhor gene?" vira uma consulta, sem rodar o AG.
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src import config
+from src.genetic_algorithm import _simular_partida_semeada
+from src.rng import criar_rng, derivar_semente, semente_aleatoria
+
+NUM_GENES = 512
+FORMATO_TABELA = 1
+
+
+def gene_texto(codigo):
+    """Converte o inteiro de 9 bits no gene em texto ('010110111')."""
+    return format(int(codigo), "09b")
+
+
+class TorneioGenotipos:
+    """Torneio em rodadas sobre o espaço completo de genes.
+
+    Emparelhamento:
+        - ``"aleatorio"``: a cada rodada os genes são embaralhados e divididos em
+          mesas (round-robin amostrado; a tabela de payoff não tem viés);
+        - ``"suico"``: após as rodadas de aquecimento, genes com desempenho
+          parecido dividem a mesa, refinando a ordem entre os melhores.
+
+    As sementes derivam de (semente, rodada, mesa), então a execução pode ser
+    interrompida e retomada do checkpoint com o mesmo resultado.
+    """
+
+    def __init__(self, semente=None, num_processos=None, motor=None,
+                 emparelhamento="aleatorio", rodadas_aquecimento=10):
+        self.semente = semente if semente is not None else semente_aleatoria()
+        self.num_processos = num_processos if num_processos is not None else config.NUM_PROCESSOS
+        self.motor = motor or config.MOTOR_SIMULACAO
+        self.emparelhamento = emparelhamento
+        self.rodadas_aquecimento = rodadas_aquecimento
+        self.rodadas_concluidas = 0
+
+        forma = (NUM_GENES, NUM_GENES)
+        self.partidas = np.zeros(forma, dtype=np.uint32)
+        self.vitorias = np.zeros(forma, dtype=np.uint32)
+        self.territorios = np.zeros(forma, dtype=np.uint32)
+
+    # ------------------------------------------------------------------
+    # Planejamento
+    # ------------------------------------------------------------------
+    @staticmethod
+    def rodadas_necessarias(erro_padrao=None, taxa_esperada=None):
+        """Rodadas para estimar a taxa de vitória de cada gene com o erro padrão pedido.
+
+        Cada gene joga uma partida por rodada, então ``p(1-p) / erro²`` rodadas
+        bastam (``p`` ~ 1/6 com 6 jogadores por mesa).
+        """
+        erro_padrao = erro_padrao or config.TORNEIO_ERRO_PADRAO
+        p = taxa_esperada or 1 / config.NUM_JOGADORES
+        return math.ceil(p * (1 - p) / erro_padrao ** 2)
+
+    def _mesas_da_rodada(self, rodada):
+        """Distribui os 512 genes em mesas de 6; a última mesa é completada com genes sorteados."""
+        rng = criar_rng(self.semente, rodada, "mesas")
+        genes = list(range(NUM_GENES))
+        if self.emparelhamento == "suico" and rodada >= self.rodadas_aquecimento:
+            forca = self.fitness()
+            ruido = {g: rng.random() for g in genes}  # desempata genes com a mesma força
+            genes.sort(key=lambda g: (forca[g], ruido[g]), reverse=True)
+        else:
+            rng.shuffle(genes)
+
+        tamanho = config.NUM_JOGADORES
+        mesas = [genes[i:i + tamanho] for i in range(0, NUM_GENES, tamanho)]
+        if len(mesas[-1]) < tamanho:
+            ultima = mesas[-1]
+            candidatos = [g for g in genes if g not in ultima]
+            mesas[-1] = ultima + rng.sample(candidatos, tamanho - len(ultima))
+        return mesas
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+    def _jogar_mesas(self, rodada, mesas, executor):
+        """Simula as mesas de uma rodada; retorna (vencedor, territórios por posição) de cada mesa."""
+        sementes = [derivar_semente(self.semente, rodada, mesa) for mesa in range(len(mesas))]
+        if self.motor == "lote":
+            from src.batch_simulator import BatchSimulator
+            saida = BatchSimulator(semente=sementes).simular(mesas)
+            return list(zip(saida["vencedor"].tolist(), saida["territorios_finais"].tolist()))
+
+        genes = [[gene_texto(g) for g in mesa] for mesa in mesas]
+        ids = [list(range(len(mesa))) for mesa in mesas]
+        if executor is None:
+            resultados = map(_simular_partida_semeada, genes, ids, sementes)
+        else:
+            chunksize = max(1, len(mesas) // (self.num_processos * 4))
+            resultados = executor.map(_simular_partida_semeada, genes, ids, sementes, chunksize=chunksize)
+        return [
+            (r["vencedor"], [r["territorios_finais"][pos] for pos in range(len(mesa))])
+            for r, mesa in zip(resultados, mesas)
+        ]
+
+    def _registrar(self, mesas, resultados):
+        """Soma os resultados às matrizes (linha = gene avaliado, coluna = gene presente na mesa)."""
+        for mesa, (vencedor, territorios) in zip(mesas, resultados):
+            presentes = np.array(mesa)
+            for pos, gene in enumerate(mesa):
+                self.partidas[gene, presentes] += 1
+                self.territorios[gene, presentes] += territorios[pos]
+                if pos == vencedor:
+                    self.vitorias[gene, presentes] += 1
+
+    def executar(self, num_rodadas=None, checkpoint=None, checkpoint_a_cada=10):
+        """Joga até ``num_rodadas`` rodadas no total, retomando de onde parou.
+
+        Args:
+            num_rodadas: total de rodadas (padrão: ``rodadas_necessarias()``).
+            checkpoint: caminho ``.npz`` salvo a cada ``checkpoint_a_cada`` rodadas e ao final.
+        """
+        num_rodadas = num_rodadas or self.rodadas_necessarias()
+        executor = None
+        if self.motor != "lote" and self.num_processos > 1:
+            executor = ProcessPoolExecutor(max_workers=self.num_processos)
+
+        inicio = time.time()
+        try:
+            while self.rodadas_concluidas < num_rodadas:
+                rodada = self.rodadas_concluidas
+                mesas = self._mesas_da_rodada(rodada)
+                self._registrar(mesas, self._jogar_mesas(rodada, mesas, executor))
+                self.rodadas_concluidas += 1
+
+                if checkpoint and self.rodadas_concluidas % checkpoint_a_cada == 0:
+                    self.salvar(checkpoint)
+                    decorrido = time.time() - inicio
+                    print(f"  Rodada {self.rodadas_concluidas}/{num_rodadas} ({decorrido:.0f}s) - checkpoint salvo")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if checkpoint:
+                self.salvar(checkpoint)
+        return self
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def taxa_vitoria(self):
+        """Matriz de payoff: taxa de vitória do gene da linha quando o gene da coluna está na mesa."""
+        return np.divide(self.vitorias, self.partidas, out=np.zeros(self.partidas.shape), where=self.partidas > 0)
+
+    def fitness(self):
+        """Fitness de cada gene com a mesma fórmula de WarBot.calcular_fitness."""
+        partidas = np.diagonal(self.partidas).astype(np.float64)
+        jogou = partidas > 0
+        taxa = np.divide(np.diagonal(self.vitorias), partidas, out=np.zeros(NUM_GENES), where=jogou)
+        media_territorios = np.divide(np.diagonal(self.territorios), partidas, out=np.zeros(NUM_GENES), where=jogou)
+        return taxa * 100 + media_territorios * 2
+
+    def ranking(self, top=10):
+        """Lista os ``top`` melhores genes com fitness, taxa de vitória e partidas."""
+        fitness = self.fitness()
+        partidas = np.diagonal(self.partidas)
+        vitorias = np.diagonal(self.vitorias)
+        ordem = np.argsort(-fitness, kind="stable")[:top]
+        return [
+            {
+                "gene": gene_texto(g),
+                "fitness": float(fitness[g]),
+                "taxa_vitoria": float(vitorias[g] / partidas[g]) if partidas[g] else 0.0,
+                "partidas": int(partidas[g]),
+            }
+            for g in ordem
+        ]
+
+    def melhor_gene(self):
+        """Gene de 9 bits com maior fitness na tabela."""
+        return self.ranking(top=1)[0]["gene"]
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    def salvar(self, caminho):
+        """Salva tabela e progresso em ``.npz`` (escrita atômica)."""
+        temporario = f"{caminho}.tmp.npz"
+        np.savez_compressed(
+            temporario,
+            formato=FORMATO_TABELA,
+            semente=np.uint64(self.semente),
+            rodadas_concluidas=self.rodadas_concluidas,
+            emparelhamento=self.emparelhamento,
+            partidas=self.partidas,
+            vitorias=self.vitorias,
+            territorios=self.territorios,
+        )
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho, **kwargs):
+        """Carrega uma tabela/checkpoint salvo por ``salvar``."""
+        with np.load(caminho) as dados:
+            if int(dados["formato"]) != FORMATO_TABELA:
+                raise ValueError(f"Formato de tabela não suportado: {int(dados['formato'])}")
+            torneio = cls(semente=int(dados["semente"]), emparelhamento=str(dados["emparelhamento"]), **kwargs)
+            torneio.rodadas_concluidas = int(dados["rodadas_concluidas"])
+            torneio.partidas = dados["partidas"].copy()
+            torneio.vitorias = dados["vitorias"].copy()
+            torneio.territorios = dados["territorios"].copy()
+        return torneio
+
+
+def main():
+    """Executa (ou retoma) o torneio pela linha de comando."""
+    parser = argparse.ArgumentParser(description="Torneio entre os 512 genes de 9 bits")
+    parser.add_argument("--saida", default=config.TABELA_GENES, help="arquivo .npz da tabela/checkpoint")
+    parser.add_argument("--rodadas", type=int, default=None, help="total de rodadas (padrão: pelo erro padrão)")
+    parser.add_argument("--erro-padrao", type=float, default=config.TORNEIO_ERRO_PADRAO)
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--motor", choices=["escalar", "lote"], default=None)
+    parser.add_argument("--emparelhamento", choices=["aleatorio", "suico"], default="aleatorio")
+    parser.add_argument("--semente", type=int, default=None)
+    args = parser.parse_args()
+
+    opcoes = {"num_processos": args.processos, "motor": args.motor}
+    if os.path.exists(args.saida):
+        torneio = TorneioGenotipos.carregar(args.saida, **opcoes)
+        print(f"Retomando torneio de {args.saida} ({torneio.rodadas_concluidas} rodadas concluídas)")
+    else:
+        torneio = TorneioGenotipos(semente=args.semente, emparelhamento=args.emparelhamento, **opcoes)
+
+    num_rodadas = args.rodadas or TorneioGenotipos.rodadas_necessarias(args.erro_padrao)
+    print(f"Torneio: {NUM_GENES} genes, {num_rodadas} rodadas, semente {torneio.semente}")
+    torneio.executar(num_rodadas, checkpoint=args.saida)
+
+    print("\nMelhores genes:")
+    for i, linha in enumerate(torneio.ranking(top=10)):
+        print(f"  {i + 1}. {linha['gene']} - fitness {linha['fitness']:.2f} "
+              f"(vitórias {linha['taxa_vitoria']:.1%} em {linha['partidas']} partidas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@ import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from main import app
+from main import app, start_background_workers
+
+start_background_workers()
 
 def application(environ, start_response):
     # Corrige crash do EB quando não existe CONTENT_LENGTH
@@ -1,35 +1,126 @@
 // src/components/GameBoard.jsx
 import { useEffect, useMemo, useRef, useState } from 'react'
 import worldMap from '@/assets/world-map.png'
-import { nextTurn, analyzeMove, playerAction, endTurn } from '@/services/gameApi'
+import {
+  nextTurn, nextTurns, analyzeMove, evaluateMoves, playerAction, endTurn, controlGame, getGameState,
+  subscribeGameEvents,
+} from '@/services/gameApi'
 import COORDS from '@/constants/territoryCoords'
 import { cn } from '@/lib/utils'
 import GeneralChat from "@/components/GeneralChat"
 
+const FAST_FORWARD_TURNS = 10
+const POLL_INTERVAL = 3000 // polling de /state só enquanto o stream SSE estiver fora
+const EVALUATION_TOP = 5 // ataques sugeridos no painel de avaliação
+
+// aplica o delta de um turno (evento 'turn' do SSE) ao estado da tela
+function applyTurn(state, turn) {
+  const territories = { ...state.territories, ...turn.changes }
+  const counts = {}
+  const troops = {}
+  Object.values(territories).forEach(({ dono, tropas }) => {
+    if (dono === null || dono === undefined) return
+    counts[dono] = (counts[dono] || 0) + 1
+    troops[dono] = (troops[dono] || 0) + tropas
+  })
+  return {
+    ...state,
+    territories,
+    current_round: turn.round,
+    current_player: turn.current_player,
+    last_action: turn.last_action,
+    total_turns: turn.turn + 1,
+    players: (state.players || []).map(p => ({
+      ...p,
+      territories_count: counts[p.id] || 0,
+      total_troops: troops[p.id] || 0,
+      eliminated: !counts[p.id],
+    })),
+  }
+}
+
 export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
   const [loading, setLoading] = useState(false)
   const [analysis, setAnalysis] = useState('')
-  const [auto, setAuto] = useState(false)
+  const [evaluation, setEvaluation] = useState(null) // avaliação dos ataques do humano no tabuleiro atual
   const [devMode, setDevMode] = useState(false)
   const [selected, setSelected] = useState(null) // território de origem
   const containerRef = useRef(null)
   const [hover, setHover] = useState(null)
 
-  // autoplay
+  // turnos já refletidos na tela (para encaixar os deltas do SSE na sequência)
+  const turnsRef = useRef(gameState?.total_turns ?? 0)
+  useEffect(() => {
+    turnsRef.current = gameState?.total_turns ?? 0
+  }, [gameState])
+
+  // a avaliação vale só para a vez em que foi pedida
+  useEffect(() => {
+    if (!gameState?.human_turn) setEvaluation(null)
+  }, [gameState?.human_turn])
+
+  // estado em tempo real: deltas por SSE; se o stream cair, polling de /state até ele voltar
   useEffect(() => {
-    if (!auto) return
     let alive = true
-    ;(async () => {
-      while (alive && gameState && gameState.status !== 'finished') {
-        setLoading(true)
-        const s = await nextTurn(gameId)
-        setGameState(s.state ?? s)
-        setLoading(false)
-        await new Promise(r => setTimeout(r, 400))
+    let pollTimer = null
+    let unsubscribe = () => {}
+
+    const refresh = async () => {
+      try {
+        const s = await getGameState(gameId)
+        if (alive) setGameState(s)
+      } catch (e) {
+        console.error(e)
       }
-    })()
-    return () => { alive = false }
-  }, [auto]) // eslint-disable-line
+    }
+    const startPolling = () => {
+      if (!pollTimer) pollTimer = setInterval(refresh, POLL_INTERVAL)
+    }
+    const stopPolling = () => {
+      clearInterval(pollTimer)
+      pollTimer = null
+    }
+    const stopIfFinished = (status) => {
+      // partida encerrada: o servidor fecha o stream e não há mais o que ouvir
+      if (status === 'finished') {
+        unsubscribe()
+        stopPolling()
+      }
+    }
+
+    if (typeof EventSource === 'undefined') {
+      startPolling()
+    } else {
+      unsubscribe = subscribeGameEvents(gameId, {
+        onOpen: stopPolling,
+        onError: startPolling,
+        onSnapshot: ({ state }) => {
+          setGameState(state)
+          stopIfFinished(state.status)
+        },
+        onTurn: (turn) => {
+          const have = turnsRef.current
+          if (turn.turn < have) return // já veio na resposta de uma ação nossa
+          if (turn.turn > have) {
+            refresh() // perdemos algum delta: busca o estado completo
+            return
+          }
+          turnsRef.current = turn.turn + 1
+          setGameState(s => (s.total_turns === turn.turn ? applyTurn(s, turn) : s))
+        },
+        onStatus: ({ status, auto_play, speed, human_turn, tropas_disponiveis }) => {
+          // chega também sem turno novo: pausa, auto-play e velocidade mudados em outra aba
+          setGameState(s => ({ ...s, status, auto_play, speed, human_turn, tropas_disponiveis }))
+          stopIfFinished(status)
+        },
+      })
+    }
+    return () => {
+      alive = false
+      unsubscribe()
+      stopPolling()
+    }
+  }, [gameId]) // eslint-disable-line
 
   const playersById = useMemo(() => {
     const dict = {}
@@ -106,6 +197,7 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
         console.error(err)
       } finally {
         setSelected(null)
+        setEvaluation(null)
         setLoading(false)
       }
       return
@@ -121,6 +213,7 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
       console.error(err)
     } finally {
       setSelected(null)
+      setEvaluation(null)
       setLoading(false)
     }
   }
@@ -135,6 +228,19 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
     } finally {
       setLoading(false)
       setSelected(null)
+      setEvaluation(null)
+    }
+  }
+
+  // Monte Carlo dos ataques possíveis no tabuleiro atual (o servidor limita o tempo)
+  async function handleEvaluate() {
+    try {
+      setLoading(true)
+      setEvaluation(await evaluateMoves(gameId, { top: EVALUATION_TOP }))
+    } catch (e) {
+      setEvaluation({ error: String(e?.message || e) })
+    } finally {
+      setLoading(false)
     }
   }
 
@@ -155,6 +261,7 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
                     setLoading(true)
                     const res = await playerAction(gameId, 'deploy', { territorio, tropas })
                     setGameState(res.state ?? res)
+                    setEvaluation(null)
                     alert(`Tropas colocadas em ${territorio}. Restam ${res.remaining ?? '0'} tropas.`)
                   } catch (err) {
                     alert(err.message || 'Erro ao distribuir tropas.')
@@ -184,10 +291,36 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
           </ControlButton>
 
           <ControlButton
-            onClick={() => setAuto(v => !v)}
+            onClick={async () => {
+              // vários turnos de bots numa requisição; o servidor para na vez do humano ou no fim
+              setLoading(true)
+              try {
+                const s = await nextTurns(gameId, FAST_FORWARD_TURNS)
+                setGameState(s.state ?? s)
+              } catch (e) {
+                console.error(e)
+              } finally {
+                setLoading(false)
+              }
+            }}
+            disabled={loading || gameState?.human_turn || (gameState?.status !== 'playing')}
+          >
+            Avançar {FAST_FORWARD_TURNS} turnos ⏩
+          </ControlButton>
+
+          <ControlButton
+            onClick={async () => {
+              // o servidor joga os turnos dos bots sozinho; os turnos chegam pelo SSE
+              try {
+                const res = await controlGame(gameId, 'toggle_auto_play')
+                setGameState(res.state ?? res)
+              } catch (e) {
+                console.error(e)
+              }
+            }}
             disabled={gameState?.status === 'finished'}
           >
-            {auto ? 'Parar auto-play' : 'Auto-play'}
+            {gameState?.auto_play ? 'Parar auto-play' : 'Auto-play'}
           </ControlButton>
 
           <ControlButton
@@ -204,6 +337,16 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
             Analisar jogada
           </ControlButton>
 
+          {gameState.human_turn && (
+            <ControlButton
+              onClick={handleEvaluate}
+              disabled={loading || gameState.status !== 'playing'}
+              intent="indigo"
+            >
+              Avaliar ataques 🎲
+            </ControlButton>
+          )}
+
           {gameState.human_turn && (
             <ControlButton
               onClick={handleEndTurn}
@@ -374,6 +517,42 @@ export default function GameBoard({ gameId, gameState, setGameState, onExit }) {
           </Panel>
         )}
 
+        {gameState.human_turn && evaluation && (
+          <Panel title="Melhores ataques">
+            {evaluation.error ? (
+              <p className="text-sm text-red-400">{evaluation.error}</p>
+            ) : evaluation.jogadas?.length ? (
+              <div className="text-sm space-y-2">
+                <div className="opacity-80">
+                  Renda esperada sem atacar: {evaluation.sem_ataque.renda} tropas/turno
+                </div>
+                <ul className="space-y-1">
+                  {evaluation.jogadas.map(j => (
+                    <li key={`${j.origem}-${j.destino}`}>
+                      <button
+                        type="button"
+                        className={cn('text-left hover:underline', selected === j.origem && 'font-semibold')}
+                        onClick={() => setSelected(j.origem)}
+                      >
+                        {j.origem} → {j.destino}
+                      </button>
+                      <span className="opacity-80">
+                        {' '}· chance {Math.round(j.probabilidade_vitoria * 100)}% · renda{' '}
+                        {j.ganho_renda >= 0 ? '+' : ''}{j.ganho_renda} · eliminação {Math.round(j.eliminacao * 100)}%
+                      </span>
+                    </li>
+                  ))}
+                </ul>
+                <div className="text-xs opacity-60">
+                  {evaluation.rollouts} simulações em {evaluation.tempo_ms} ms; clique num ataque para selecionar a origem.
+                </div>
+              </div>
+            ) : (
+              <p className="text-sm opacity-80">Nenhum ataque possível.</p>
+            )}
+          </Panel>
+        )}
+
         {!!analysis && (
           <Panel title="Análise do Chatbot">
             <p className="text-sm leading-relaxed whitespace-pre-wrap">{analysis}</p>
@@ -1,6 +1,6 @@
 // src/components/GeneralChat.jsx
 import { useState } from "react"
-import { analyzeMove } from "@/services/gameApi"
+import { analyzeMoveStream, chatGeneralStream } from "@/services/gameApi"
 import ReactMarkdown from "react-markdown"
 import generalImg from '../assets/general.png'
 
@@ -19,17 +19,14 @@ export default function GeneralChat({ gameId }) {
     setMessages(m => [...m, userMessage])
     setInput("")
 
+    // a resposta aparece conforme o General "digita" (stream SSE)
+    setMessages(m => [...m, { from: "general", text: "" }])
+    const setReply = (fn) => setMessages(m => [...m.slice(0, -1), { from: "general", text: fn(m[m.length - 1].text) }])
     try {
-      const res = await fetch(`/api/general/chat`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ game_id: gameId, message: text }),
-      })
-      const data = await res.json()
-      const reply = { from: "general", text: data.reply || data.message || "⚠️ Sem resposta." }
-      setMessages(m => [...m, reply])
+      const data = await chatGeneralStream(text, gameId, (token) => setReply(t => t + token))
+      setReply(t => data.reply || t || "⚠️ Sem resposta.")
     } catch (e) {
-      setMessages(m => [...m, { from: "general", text: "❌ Erro ao responder." }])
+      setReply(() => "❌ Erro ao responder.")
     }
   }
 
@@ -41,11 +38,10 @@ export default function GeneralChat({ gameId }) {
     }
     try {
       setMessages(m => [...m, { from: "general", text: "⏳ Analisando jogada..." }])
-      const res = await analyzeMove(gameId)
-      setMessages(m => [
-        ...m.slice(0, -1), // remove o "analisando..."
-        { from: "general", text: res.analysis || res.message || JSON.stringify(res) }
-      ])
+      let text = ""
+      const show = (t) => setMessages(m => [...m.slice(0, -1), { from: "general", text: t }]) // substitui o "analisando..."
+      const res = await analyzeMoveStream(gameId, (token) => show(text += token))
+      show(res.analysis || res.message || JSON.stringify(res))
     } catch (e) {
       setMessages(m => [...m, { from: "general", text: `❌ Erro: ${e.message}` }])
     }
@@ -35,12 +35,103 @@ export const endTurn = (game_id) =>
 
 
 
+// controle da partida no servidor: pause, resume, toggle_auto_play, set_speed ({ speed })
+export const controlGame = (gameId, action, params = {}) =>
+  req(`/game/${gameId}/control`, {
+    method: 'POST',
+    body: JSON.stringify({ action, ...params }),
+  })
+
+// estado completo (o servidor responde 304 via ETag quando nada mudou)
+export const getGameState = (gameId) => req(`/game/${gameId}/state`)
+
 export async function nextTurn(gameId) {
   return req(`/game/${gameId}/next-turn`, { method: 'POST' })
 }
 
-export async function analyzeMove(gameId) {
-  return req(`/game/${gameId}/analyze-move`, { method: 'POST' })
+// avança vários turnos de bots numa requisição (para na vez do humano ou no fim)
+export async function nextTurns(gameId, turns = 10) {
+  return req(`/game/${gameId}/next-turns`, {
+    method: 'POST',
+    body: JSON.stringify({ turns }),
+  })
+}
+
+// a análise roda em segundo plano: se não estiver em cache o servidor devolve 202 + job_id
+// e aqui consultamos o job até terminar (o resultado tem o mesmo formato de antes)
+export async function analyzeMove(gameId, { interval = 1000, timeout = 120000 } = {}) {
+  let res = await req(`/game/${gameId}/analyze-move?wait=5`, { method: 'POST' })
+  const deadline = Date.now() + timeout
+  while (res.status === 'pending') {
+    if (Date.now() > deadline) throw new Error('Análise demorou demais, tente novamente')
+    await new Promise((resolve) => setTimeout(resolve, interval))
+    res = await req(`/analysis/${res.job_id}`)
+  }
+  return res
+}
+
+// avaliação Monte Carlo dos ataques possíveis do humano (só na vez dele)
+export const evaluateMoves = (gameId, { budgetMs, top } = {}) => {
+  const params = new URLSearchParams()
+  if (budgetMs) params.set('budget_ms', budgetMs)
+  if (top) params.set('top', top)
+  return req(`/game/${gameId}/evaluate-moves?${params}`)
+}
+
+
+// stream SSE com os deltas de cada turno (no lugar do polling do estado).
+// O EventSource reconecta sozinho e manda Last-Event-ID: o servidor reenvia só os turnos perdidos.
+// onOpen/onError avisam quando o stream está de pé ou caiu (para ligar/desligar um polling de reserva).
+export function subscribeGameEvents(gameId, { onSnapshot, onTurn, onStatus, onOpen, onError } = {}) {
+  const source = new EventSource(`/api/game/${gameId}/events`)
+  const handle = (fn) => (e) => fn && fn(JSON.parse(e.data))
+  source.addEventListener('snapshot', handle(onSnapshot))
+  source.addEventListener('turn', handle(onTurn))
+  source.addEventListener('status', handle(onStatus))
+  source.addEventListener('open', () => onOpen && onOpen())
+  source.addEventListener('error', () => onError && onError())
+  return () => source.close()
+}
+
+
+// POST que responde em SSE (texto do LLM token a token): chama onToken(texto) a cada pedaço
+// e devolve o corpo do evento 'done'. EventSource só faz GET, então o stream é lido do fetch.
+async function streamText(path, body, onToken) {
+  const r = await fetch(`/api${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(body),
+  })
+  if (!r.ok) {
+    const data = await r.json().catch(() => ({}))
+    throw new Error(data.message || data.error || `API ${r.status}`)
+  }
+  const reader = r.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) throw new Error('Resposta interrompida')
+    buffer += decoder.decode(value, { stream: true })
+    let end
+    while ((end = buffer.indexOf('\n\n')) >= 0) {
+      const block = buffer.slice(0, end)
+      buffer = buffer.slice(end + 2)
+      const event = /^event: (.*)$/m.exec(block)?.[1]
+      const data = /^data: (.*)$/m.exec(block)?.[1]
+      if (!data) continue
+      const payload = JSON.parse(data)
+      if (event === 'token') onToken && onToken(payload.text)
+      else if (event === 'done') return payload
+      else if (event === 'error') throw new Error(payload.message || payload.error)
+    }
+  }
 }
 
+// chat com o General em stream (resposta final: { reply })
+export const chatGeneralStream = (message, gameId, onToken) =>
+  streamText('/general/chat/stream', { game_id: gameId, message }, onToken)
 
+// análise da última jogada em stream (resposta final no formato de analyzeMove)
+export const analyzeMoveStream = (gameId, onToken) =>
+  streamText(`/game/${gameId}/analyze-move/stream`, {}, onToken)